@@ -20,10 +20,32 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 
-from .client import Client, ExportRequest, SeriesInfo
+from .cache import CoverageCache, QueryCache
+from .client import AsyncClient, AsyncExportRequest, Client, ExportRequest, SeriesInfo
 from .config import ServerConfig, register_server
-from .exceptions import DrmsError, DrmsExportError, DrmsOperationNotSupported, DrmsQueryError
-from .json import HttpJsonClient, HttpJsonRequest, JsocInfoConstants
+from .exceptions import (
+    DrmsCircuitOpenError,
+    DrmsError,
+    DrmsExportError,
+    DrmsOperationNotSupported,
+    DrmsQueryError,
+)
+from .json import (
+    AsyncHttpJsonClient,
+    HttpJsonClient,
+    HttpJsonRequest,
+    JsocInfoConstants,
+    ResponseCache,
+    register_json_decoder,
+    set_json_decoder,
+)
+from .metrics import RequestMetrics
+from .mirrors import MirrorSelector
+from .output import register_output
+from .ratelimit import RateLimiter
+from .replay import RecordReplayTransport
+from .retry import CircuitBreaker, RetryPolicy
+from .transport import HttpxTransport, Transport, Urllib3Transport, UrllibTransport
 from .utils import to_datetime
 from .version import version as __version__
 
@@ -46,7 +68,13 @@ def _get_bibtex():
 __citation__ = __bibtex__ = _get_bibtex()
 
 __all__ = [
+    "AsyncClient",
+    "AsyncExportRequest",
+    "AsyncHttpJsonClient",
+    "CircuitBreaker",
     "Client",
+    "CoverageCache",
+    "DrmsCircuitOpenError",
     "DrmsError",
     "DrmsExportError",
     "DrmsOperationNotSupported",
@@ -54,13 +82,27 @@ __all__ = [
     "ExportRequest",
     "HttpJsonClient",
     "HttpJsonRequest",
+    "HttpxTransport",
     "JsocInfoConstants",
+    "MirrorSelector",
+    "QueryCache",
+    "RateLimiter",
+    "RecordReplayTransport",
+    "RequestMetrics",
+    "ResponseCache",
+    "RetryPolicy",
     "SeriesInfo",
     "ServerConfig",
+    "Transport",
+    "Urllib3Transport",
+    "UrllibTransport",
     "__bibtex__",
     "__citation__",
     "__version__",
     "logger",
+    "register_json_decoder",
+    "register_output",
     "register_server",
+    "set_json_decoder",
     "to_datetime",
 ]
@@ -0,0 +1,448 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from drms import logger
+from .json import _module_available
+from .utils import _split_arg, _split_recset
+
+__all__ = ["CoverageCache", "QueryCache"]
+
+
+def _normalize_recset(ds):
+    """
+    Normalize a record set string for cache keys.
+
+    Series names are case-insensitive and whitespace around the filters
+    is not significant.
+    """
+    parts = _split_recset(ds)
+    if parts is None:
+        return ds.strip()
+    series, filters, segs = parts
+    segs = ",".join(_split_arg(segs[1:-1])) if segs else ""
+    return series.lower() + "".join(f"[{f.strip()}]" for f in filters) + (f"{{{segs}}}" if segs else "")
+
+
+def _normalize_names(names, *, ordered=False):
+    """
+    Normalize a keyword, segment or link argument for cache keys.
+    """
+    if names is None:
+        return None
+    names = list(_split_arg(names))
+    return names if ordered else sorted(names)
+
+
+def _query_key(server, ds, *, key=None, seg=None, link=None, pkeys=False, **kwargs):
+    """
+    Create the cache key of a query.
+
+    The order of the keywords, segments and links does not matter, since
+    the columns of cached results are reordered, except for keywords
+    that are combined with the prime keys.
+    """
+    params = {
+        "server": [server.name, server.cgi_baseurl],
+        "ds": _normalize_recset(ds),
+        "key": _normalize_names(key, ordered=pkeys),
+        "seg": _normalize_names(seg),
+        "link": _normalize_names(link),
+        "pkeys": pkeys,
+        **kwargs,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _copy_result(res):
+    if isinstance(res, tuple):
+        return tuple(df.copy() for df in res)
+    return res.copy()
+
+
+def _reorder_result(res, names):
+    """
+    Reorder the columns of cached query results to the requested order.
+
+    ``names`` contains the normalized keyword, segment and link arguments
+    of the query, in the order of the results.
+    """
+    frames = res if isinstance(res, tuple) else (res,)
+    names = [_split_arg(n) for n in names if n is not None]
+    if len(names) != len(frames):
+        return res
+    frames = tuple(
+        df[list(n)] if len(set(n)) == len(n) and sorted(n) == sorted(df.columns) else df
+        for df, n in zip(frames, names, strict=True)
+    )
+    return frames if isinstance(res, tuple) else frames[0]
+
+
+class QueryCache:
+    """
+    Two-tier cache for query results.
+
+    Results of `~drms.client.Client.query` are kept in an in-memory LRU
+    cache and, if a directory is given, in an on-disk store of Parquet
+    files, which is shared by all clients and processes using the same
+    directory. Results are identified by the server, the normalized record
+    set and the query arguments, so the order of the keywords, segments
+    and links does not matter.
+
+    Only pandas results are cached. Since record sets like
+    ``hmi.m_45s[$]`` refer to different records over time, results are
+    only reused until their time to live has expired.
+
+    Parameters
+    ----------
+    directory : str, pathlib.Path or None
+        Directory of the on-disk store, which requires pyarrow. If set to
+        None (default), only the in-memory cache is used.
+    ttl : float
+        Time to live of results in the in-memory cache in seconds.
+        Defaults to 600 seconds.
+    max_entries : int
+        Maximum number of results in the in-memory cache. Defaults to 128.
+    disk_ttl : float
+        Time to live of results in the on-disk store in seconds. Defaults
+        to 1 day.
+    max_size : int
+        Maximum total size of the on-disk store in bytes. If it is
+        exceeded, the least recently used results are removed. Defaults
+        to 1 GiB.
+    """
+
+    def __init__(self, directory=None, *, ttl=600, max_entries=128, disk_ttl=24 * 3600, max_size=1024**3):
+        if directory is not None:
+            if not _module_available("pyarrow"):
+                raise ImportError("The on-disk query cache requires the pyarrow package")
+            directory = Path(directory)
+            directory.mkdir(parents=True, exist_ok=True)
+        self._directory = directory
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self.disk_ttl = float(disk_ttl)
+        self.max_size = int(max_size)
+        self._memory = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<QueryCache: {self._directory or 'memory'}>"
+
+    def __len__(self):
+        return len(self._memory)
+
+    @property
+    def directory(self):
+        """
+        (`pathlib.Path` or None) Directory of the on-disk store.
+        """
+        return self._directory
+
+    @property
+    def stats(self):
+        """
+        (dict) Number of in-memory hits ('memory_hits'), on-disk hits
+        ('disk_hits'), all hits ('hits') and misses ('misses').
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+        return stats
+
+    def reset_stats(self):
+        """
+        Reset the hit and miss counts.
+        """
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def get(self, key):
+        """
+        Get a copy of a cached result, or None if the key is not cached or
+        the result has expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now < entry[0]:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return _copy_result(entry[1])
+                del self._memory[key]
+        res = self._read(key) if self._directory is not None else None
+        with self._lock:
+            if res is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+        self._remember(key, res)
+        return _copy_result(res)
+
+    def put(self, key, res):
+        """
+        Store a query result, i.e. a DataFrame or a tuple of DataFrames.
+        """
+        res = _copy_result(res)
+        self._remember(key, res)
+        if self._directory is not None:
+            self._write(key, res)
+
+    def clear(self):
+        """
+        Remove all cached results.
+        """
+        with self._lock:
+            self._memory.clear()
+        if self._directory is not None:
+            for path in self._directory.iterdir():
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _remember(self, key, res):
+        with self._lock:
+            self._memory[key] = (time.monotonic() + self.ttl, res)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read(self, key):
+        path = self._directory / key
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            # Not cached, which is the common case.
+            return None
+        if time.time() - mtime > self.disk_ttl:
+            return None
+        try:
+            frames = tuple(pd.read_parquet(p) for p in sorted(path.glob("*.parquet")))
+            # Record the access for LRU eviction, keeping the time the
+            # result was stored.
+            os.utime(path, (time.time(), mtime))
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not read query result from cache: {e}")
+            return None
+        if not frames:
+            return None
+        return frames if len(frames) > 1 else frames[0]
+
+    def _write(self, key, res):
+        frames = res if isinstance(res, tuple) else (res,)
+        tmp_dir = None
+        try:
+            # Write to a temporary directory first, so that other processes
+            # never see partially written results.
+            tmp_dir = Path(tempfile.mkdtemp(dir=self._directory, suffix=".tmp"))
+            for i, df in enumerate(frames):
+                df.to_parquet(tmp_dir / f"{i}.parquet", engine="pyarrow")
+            shutil.rmtree(self._directory / key, ignore_errors=True)
+            tmp_dir.replace(self._directory / key)
+        except (OSError, ValueError, TypeError) as e:
+            logger.debug(f"Could not write query result to cache: {e}")
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self._directory.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            try:
+                accessed = path.stat().st_atime
+                size = sum(p.stat().st_size for p in path.iterdir())
+            except OSError:
+                continue
+            entries.append((accessed, size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+
+
+class _Coverage:
+    """
+    Cached records of a series and the time ranges they cover.
+    """
+
+    def __init__(self, frames, times):
+        self.intervals = []
+        self.frames = frames
+        self.times = times
+        self.created = time.monotonic()
+
+    def missing(self, start, end):
+        gaps = []
+        for s, e in self.intervals:
+            if e <= start:
+                continue
+            if s >= end:
+                break
+            if s > start:
+                gaps.append((start, s))
+            start = max(start, e)
+        if start < end:
+            gaps.append((start, end))
+        return gaps
+
+    def add_interval(self, start, end):
+        intervals = []
+        for s, e in self.intervals:
+            if e < start or s > end:
+                intervals.append((s, e))
+            else:
+                start, end = min(s, start), max(e, end)
+        intervals.append((start, end))
+        self.intervals = sorted(intervals)
+
+
+def _in_ranges(times, ranges):
+    mask = np.zeros(len(times), dtype=bool)
+    for start, end in ranges:
+        mask |= (times >= np.datetime64(start)) & (times < np.datetime64(end))
+    return mask
+
+
+class CoverageCache:
+    """
+    Cache of query results indexed by the time ranges they cover.
+
+    Queries of record sets whose first filter is a time range of the
+    first prime key, e.g. ``hmi.m_45s[2024.01.01/7d]``, are split into
+    the time ranges that are already cached and the missing ones. Only
+    the missing time ranges are requested from the server, and the
+    result is combined from the cached and the new records in record
+    order. Records are cached separately for each series, set of other
+    filters and set of requested keywords, segments and links.
+
+    Parameters
+    ----------
+    ttl : float or None
+        Number of seconds after which the cached records of a series are
+        removed, e.g. because new records may have been added or records
+        may have been reprocessed. If set to None, records do not expire.
+        Defaults to 1 hour.
+    max_records : int
+        Maximum total number of cached records. If it is exceeded, the
+        least recently used record sets are removed. Defaults to
+        1,000,000 records.
+    """
+
+    def __init__(self, *, ttl=3600, max_records=1_000_000):
+        self.ttl = None if ttl is None else float(ttl)
+        self.max_records = int(max_records)
+        self._coverages = OrderedDict()
+        self._stats = {"records_returned": 0, "records_fetched": 0}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<CoverageCache: {len(self)} record sets>"
+
+    def __len__(self):
+        return len(self._coverages)
+
+    @property
+    def stats(self):
+        """
+        (dict) Number of records returned by queries using the cache
+        ('records_returned') and of records fetched from the server
+        ('records_fetched').
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        """
+        Reset the record counts.
+        """
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def clear(self):
+        """
+        Remove all cached records.
+        """
+        with self._lock:
+            self._coverages.clear()
+
+    def _get(self, key):
+        coverage = self._coverages.get(key)
+        if coverage is not None and self.ttl is not None and time.monotonic() - coverage.created > self.ttl:
+            del self._coverages[key]
+            return None
+        return coverage
+
+    def missing(self, key, start, end):
+        """
+        Return the time ranges between ``start`` and ``end`` that are not
+        cached, as list of ``(start, end)`` tuples.
+        """
+        with self._lock:
+            coverage = self._get(key)
+            return [(start, end)] if coverage is None else coverage.missing(start, end)
+
+    def add(self, key, gaps, frames, times):
+        """
+        Add the records of the time ranges that were fetched.
+
+        ``gaps`` is the list of ``(start, end)`` tuples returned by
+        `missing`, ``frames`` is a tuple of DataFrames with the keywords,
+        segments and links of the records fetched for these time ranges
+        and ``times`` is an array of their prime key times. Only the
+        fetched time ranges are marked as cached, even if the cached
+        records expired or were removed in the meantime. Records in parts
+        of the time ranges that are already cached, e.g. by a concurrent
+        query, are skipped.
+        """
+        times = np.asarray(times, dtype="datetime64[ns]")
+        with self._lock:
+            self._stats["records_fetched"] += len(times)
+            coverage = self._get(key)
+            if coverage is None:
+                coverage = self._coverages[key] = _Coverage(tuple(f.iloc[:0] for f in frames), times[:0])
+            # Only keep records in time ranges that are still missing.
+            missing = [gap for start, end in gaps for gap in coverage.missing(start, end)]
+            idx = np.flatnonzero(_in_ranges(times, missing))
+            frames = tuple(f.iloc[idx] for f in frames)
+            coverage.frames = tuple(
+                pd.concat([f for f in (old, new) if len(f) > 0] or [old])
+                for old, new in zip(coverage.frames, frames, strict=True)
+            )
+            coverage.times = np.concatenate([coverage.times, times[idx]])
+            for start, end in gaps:
+                coverage.add_interval(start, end)
+            self._coverages.move_to_end(key)
+            total = sum(len(c.times) for c in self._coverages.values())
+            while total > self.max_records and len(self._coverages) > 1:
+                _, evicted = self._coverages.popitem(last=False)
+                total -= len(evicted.times)
+
+    def select(self, key, start, end):
+        """
+        Get the cached records between ``start`` and ``end``, sorted by
+        time, as tuple of DataFrames, or None if the time range is not
+        completely cached.
+        """
+        with self._lock:
+            coverage = self._get(key)
+            if coverage is None or coverage.missing(start, end):
+                return None
+            self._coverages.move_to_end(key)
+            idx = np.flatnonzero(_in_ranges(coverage.times, [(start, end)]))
+            idx = idx[np.argsort(coverage.times[idx], kind="stable")]
+            self._stats["records_returned"] += len(idx)
+            return tuple(f.iloc[idx] for f in coverage.frames)
@@ -1,24 +1,50 @@
 import os
 import re
+import math
 import time
 import shutil
-import socket
+import asyncio
+import threading
+import contextlib
 from pathlib import Path
+from functools import partial
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.error import URLError, HTTPError
 from urllib.parse import urljoin
-from urllib.request import urlopen
 
 import numpy as np
 import pandas as pd
 
 from drms import logger
-from drms.utils import create_request_with_header
-from .exceptions import DrmsExportError, DrmsOperationNotSupported, DrmsQueryError
-from .json import HttpJsonClient
-from .utils import _extract_series_name, _pd_to_numeric_coerce, _split_arg
-
-__all__ = ["Client", "ExportRequest", "SeriesInfo"]
+from .exceptions import DrmsCircuitOpenError, DrmsExportError, DrmsOperationNotSupported, DrmsQueryError
+from .json import AsyncHttpJsonClient, HttpJsonClient
+from .cache import _query_key, _reorder_result, _normalize_names
+from .output import _get_output, _numeric_values, _time_values
+from .utils import (
+    _extract_series_name,
+    _format_time,
+    _parse_time_range,
+    _split_arg,
+    _split_recset,
+    _split_time_suffix,
+    _to_numeric,
+    to_datetime,
+)
+
+__all__ = ["AsyncClient", "AsyncExportRequest", "Client", "ExportRequest", "SeriesInfo"]
+
+# Special keywords with integer values.
+_special_keywords = {"*recnum*", "*sunum*", "*size*"}
+
+# Column dtypes of numeric keyword types, see Client.query(typed=True).
+_keyword_dtypes = {
+    "short": "Int16",
+    "int": "Int32",
+    "longlong": "Int64",
+    "float": "float32",
+    "double": "float64",
+}
 
 
 class SeriesInfo:
@@ -116,6 +142,11 @@ class ExportRequest:
 
     Use :func:`Client.export` or :func:`Client.export_from_id` to create
     an instance.
+
+    If several mirrors are configured for the server, all status requests
+    and file downloads are sent to the mirror that accepted the export
+    request, without failing over to other mirrors. Requests created
+    with `Client.export_from_id` use the primary mirror.
     """
 
     _status_code_ok = 0
@@ -123,8 +154,12 @@ class ExportRequest:
     _status_codes_pending = (1, 2, _status_code_notfound)
     _status_codes_ok_or_pending = (_status_code_ok, *_status_codes_pending)
 
-    def __init__(self, d, client):
+    def __init__(self, d, client, *, mirror=None):
         self._client = client
+        # CGI and download base URLs of the mirror that has the export.
+        if mirror is None:
+            mirror = (client._server.cgi_baseurl, client._server.http_download_baseurl)
+        self._cgi_baseurl, self._download_baseurl = mirror
         self._requestid = None
         self._status = None
         self._download_urls_cache = None
@@ -147,7 +182,7 @@ class ExportRequest:
 
     def _update_status(self, *, d=None):
         if d is None and self._requestid is not None:
-            d = self._client._json.exp_status(self._requestid)
+            d = self._client._json.exp_status(self._requestid, base_url=self._cgi_baseurl)
         self._d = d
         self._d_time = time.time()
         self._status = int(self._d.get("status", self._status))
@@ -160,6 +195,15 @@ class ExportRequest:
             # Use None if the requestid is empty (url_quick + as-is)
             self._requestid = None
 
+    def _ensure_finished(self):
+        """
+        Wait for the request to finish, or raise if it has failed.
+        """
+        if self.has_finished(skip_update=True):
+            self._raise_on_error()
+        else:
+            self.wait()
+
     def _raise_on_error(self, *, notfound_ok=True):
         if self._status in self._status_codes_ok_or_pending:
             if self._status != self._status_code_notfound or notfound_ok:
@@ -199,7 +243,7 @@ class ExportRequest:
             res["fpath"] = [f"{data_dir}/{filename}" for filename in res.filename]
 
         if self.method.startswith("url"):
-            baseurl = self._client._server.http_download_baseurl
+            baseurl = self._download_baseurl
         else:
             raise RuntimeError(f"Download is not supported for export method {self.method}")
 
@@ -228,6 +272,34 @@ class ExportRequest:
             i += 1
         return new_fname
 
+    @staticmethod
+    def _download_dir(directory):
+        out_dir = Path(directory).absolute()
+        if not out_dir.is_dir():
+            raise OSError(f"Download directory {out_dir} does not exist")
+        return out_dir
+
+    def _download_selection(self, index, fname_from_rec):
+        """
+        Select the files to be downloaded by `download`.
+        """
+        if np.isscalar(index):
+            index = [int(index)]
+        elif index is not None:
+            index = list(index)
+
+        if fname_from_rec is None:
+            # For 'url_quick', generate local filenames from record strings.
+            if self.method == "url_quick":
+                fname_from_rec = True
+
+        # self.urls contains the same records as self.data, except for the tar
+        # methods, where self.urls only contains one entry, the TAR file.
+        data = self.urls
+        if index is not None and self.tarfile is None:
+            data = data.iloc[index].copy()
+        return data, fname_from_rec
+
     @property
     def id(self):
         """
@@ -275,10 +347,7 @@ class ExportRequest:
         """
         (string) Common directory of the requested files on the server.
         """
-        if self.has_finished(skip_update=True):
-            self._raise_on_error()
-        else:
-            self.wait()
+        self._ensure_finished()
         data_dir = self._d.get("dir")
         return data_dir if data_dir else None
 
@@ -290,10 +359,7 @@ class ExportRequest:
         Returns a pandas.DataFrame containing the records and filenames
         of the export request (DataFrame columns: 'record', 'filename').
         """
-        if self.has_finished(skip_update=True):
-            self._raise_on_error()
-        else:
-            self.wait()
+        self._ensure_finished()
         return self._parse_data(self._d.get("data"))
 
     @property
@@ -301,10 +367,7 @@ class ExportRequest:
         """
         (string) Filename, if a TAR file was requested.
         """
-        if self.has_finished(skip_update=True):
-            self._raise_on_error()
-        else:
-            self.wait()
+        self._ensure_finished()
         data_tarfile = self._d.get("tarfile")
         return data_tarfile if data_tarfile else None
 
@@ -313,10 +376,7 @@ class ExportRequest:
         """
         (string) Filename of textfile containing record keywords.
         """
-        if self.has_finished(skip_update=True):
-            self._raise_on_error()
-        else:
-            self.wait()
+        self._ensure_finished()
         data_keywords = self._d.get("keywords")
         return data_keywords if data_keywords else None
 
@@ -326,7 +386,7 @@ class ExportRequest:
         (string) URL of the export request.
         """
         data_dir = self.dir
-        http_baseurl = self._client._server.http_download_baseurl
+        http_baseurl = self._download_baseurl
         if data_dir is None or http_baseurl is None:
             return None
         if data_dir.startswith("/"):
@@ -532,28 +592,12 @@ class ExportRequest:
             local location of each downloaded file (DataFrame columns:
             'record', 'url' and 'download').
         """
-        out_dir = Path(directory).absolute()
-        if not out_dir.is_dir():
-            raise OSError(f"Download directory {out_dir} does not exist")
-
-        if np.isscalar(index):
-            index = [int(index)]
-        elif index is not None:
-            index = list(index)
+        out_dir = self._download_dir(directory)
 
         # Wait until the export request has finished.
         self.wait()
 
-        if fname_from_rec is None:
-            # For 'url_quick', generate local filenames from record strings.
-            if self.method == "url_quick":
-                fname_from_rec = True
-
-        # self.urls contains the same records as self.data, except for the tar
-        # methods, where self.urls only contains one entry, the TAR file.
-        data = self.urls
-        if index is not None and self.tarfile is None:
-            data = data.iloc[index].copy()
+        data, fname_from_rec = self._download_selection(index, fname_from_rec)
         ndata = len(data)
 
         downloads = []
@@ -572,14 +616,18 @@ class ExportRequest:
             logger.info(f"Downloading file {int(i + 1)} of {int(ndata)}...")
             logger.info(f"    record: {di.record}")
             logger.info(f"    filename: {di.filename}")
-            try:
-                timeout = socket.getdefaulttimeout() or timeout
+
+            def fetch(url=di.url, fpath_tmp=fpath_tmp):
                 with (
-                    urlopen(create_request_with_header(di.url), timeout=timeout) as response,
+                    self._client._json.limiter,
+                    self._client._json._urlopen(url, timeout=timeout, failover=False) as response,
                     open(fpath_tmp, "wb") as out_file,
                 ):
                     shutil.copyfileobj(response, out_file)
-            except (HTTPError, URLError):
+
+            try:
+                self._client._json.retry_policy.call(fetch, di.url)
+            except (HTTPError, URLError, DrmsCircuitOpenError):
                 fpath_new = None
                 logger.info("    -> Error: Could not download file")
             else:
@@ -593,50 +641,72 @@ class ExportRequest:
         return res
 
 
-class Client:
+class _ClientBase:
     """
-    Client for remote DRMS server access.
-
-    Parameters
-    ----------
-    server : str or drms.config.ServerConfig
-        Registered server ID or ServerConfig instance.
-        Defaults to JSOC.
-    email : str or None
-        Default email address used data export requests.
+    Methods shared by `Client` and `AsyncClient` that build requests and
+    parse responses without communicating with the server.
     """
 
-    def __init__(self, server="jsoc", *, email=None):
-        self._json = HttpJsonClient(server)
-        self._info_cache = {}
-        self.email = email  # use property for email validation
-
-    def __repr__(self):
-        return f"<Client: {self._server.name}>"
-
-    def _convert_numeric_keywords(self, ds, kdf, *, skip_conversion=None):
-        si = self.info(ds)
-        int_keys = list(si.keywords[si.keywords.is_integer].index)
-        num_keys = list(si.keywords[si.keywords.is_numeric].index)
-        num_keys += ["*recnum*", "*sunum*", "*size*"]
+    @staticmethod
+    def _convert_numeric_keywords(si, kdf, *, skip_conversion=None):
+        int_keys = set(si.keywords.index[si.keywords.is_integer])
+        num_keys = set(si.keywords.index[si.keywords.is_numeric])
+        num_keys |= _special_keywords
         if skip_conversion is None:
             skip_conversion = []
         elif isinstance(skip_conversion, str):
             skip_conversion = [skip_conversion]
-        for k in kdf:
-            if k in skip_conversion:
-                continue
-            # pandas apparently does not support hexadecimal strings, so
-            # we need a special treatment for integer strings that start
-            # with '0x', like QUALITY. The following to_numeric call is
-            # still necessary as the results are still Python objects.
-            if k in int_keys and kdf[k].dtype is np.dtype(object):
-                idx = kdf[k].str.startswith("0x")
-                if idx.any():
-                    k_idx = kdf.columns.get_loc(k)
-                    kdf.loc[idx, kdf.columns[k_idx]] = kdf.loc[idx, kdf.columns[k_idx]].apply(int, base=16)
-            if k in num_keys:
-                kdf[k] = _pd_to_numeric_coerce(kdf[k])
+        # pandas does not support hexadecimal strings, so integer keywords
+        # are also checked for values that start with '0x', like QUALITY.
+        converted = {
+            k: _to_numeric(kdf[k], parse_hex=k in int_keys) for k in kdf if k in num_keys and k not in skip_conversion
+        }
+        for k, values in converted.items():
+            kdf[k] = values
+
+    @staticmethod
+    def _keyword_type(si, name, *, skip_conversion=None):
+        """
+        Get the type of a keyword, or None if it is not converted.
+        """
+        if skip_conversion is not None and name in _split_arg(skip_conversion):
+            return None
+        if name in _special_keywords:
+            return "longlong"
+        return si.keywords.type.get(name)
+
+    @classmethod
+    def _typed_keyword_values(cls, si, name, values, *, skip_conversion=None):
+        """
+        Convert the values of a keyword to the dtype of its keyword type.
+
+        Values of keywords with other types, e.g. strings, are returned
+        unchanged.
+        """
+        kind = cls._keyword_type(si, name, skip_conversion=skip_conversion)
+        if kind == "time":
+            return _time_values(values)
+        dtype = _keyword_dtypes.get(kind)
+        if dtype is None:
+            return values
+        res = _numeric_values(values, kind)
+        try:
+            return res.astype(dtype).array
+        except (TypeError, ValueError, OverflowError):
+            # e.g. values that do not fit into the dtype
+            return res.to_numpy()
+
+    @staticmethod
+    def _encode_as_category(values, kind, categorical, *, typed=True):
+        """
+        Check if a keyword is encoded as categorical column, i.e. if it is
+        not converted to numbers (or times, if ``typed`` is True) and has
+        few distinct values.
+        """
+        if not categorical or kind in _keyword_dtypes or (typed and kind == "time"):
+            return False
+        max_ratio = 0.5 if categorical is True else float(categorical)
+        return len(values) > 0 and len(set(values)) <= max_ratio * len(values)
 
     @staticmethod
     def _raise_query_error(d, *, status=None):
@@ -651,17 +721,11 @@ class Client:
         msg += f" [status={status}]"
         raise DrmsQueryError(msg)
 
-    def _generate_filenamefmt(self, sname):
+    @staticmethod
+    def _filenamefmt_from_info(si):
         """
-        Generate filename format string for export requests.
+        Generate filename format string from series details.
         """
-        try:
-            si = self.info(sname)
-        except Exception as e:  # NOQA: BLE001
-            # Cannot generate filename format for unknown series.
-            logger.warning(f"Cannot generate filename format for unknown series '{sname}' with {e}")
-            return None
-
         pkfmt_list = []
         for k in si.primekeys:
             if si.keywords.loc[k].is_time:
@@ -675,43 +739,33 @@ class Client:
 
     # Some regular expressions used to parse export request queries.
     _re_export_recset = re.compile(r"^\s*([\w\.]+)\s*(\[.*\])?\s*(?:\{([\w\s\.,]*)\})?\s*$")
+
     _re_export_recset_pkeys = re.compile(r"\[([^\[^\]]*)\]")
+
     _re_export_recset_slist = re.compile(r"[\s,]+")
 
-    @staticmethod
-    def _parse_export_recset(rs):
+    @classmethod
+    def _parse_export_recset(cls, rs):
         """
         Parse export request record set.
         """
         if rs is None:
             return None, None, None
-        m = Client._re_export_recset.match(rs)
+        m = cls._re_export_recset.match(rs)
         if not m:
             return None, None, None
         sname, pkeys, segs = m.groups()
         if pkeys is not None:
-            pkeys = Client._re_export_recset_pkeys.findall(pkeys)
+            pkeys = cls._re_export_recset_pkeys.findall(pkeys)
         if segs is not None:
-            segs = Client._re_export_recset_slist.split(segs)
+            segs = cls._re_export_recset_slist.split(segs)
         return sname, pkeys, segs
 
-    def _filename_from_export_record(self, rs, *, old_fname=None):
+    @staticmethod
+    def _filename_from_info(si, pkeys, segs, *, old_fname=None):
         """
-        Generate a filename from an export request record.
+        Generate a filename from parsed export record primekeys and segments.
         """
-        sname, pkeys, segs = self._parse_export_recset(rs)
-        if sname is None:
-            return None
-
-        # We need to identify time primekeys and change the time strings to
-        # make them suitable for filenames.
-        try:
-            si = self.info(sname)
-        except Exception as e:  # NOQA: BLE001
-            # Cannot generate filename for unknown series.
-            logger.warning(f"Cannot generate filename format for unknown series '{sname}' with {e}")
-            return None
-
         if pkeys is not None:
             n = len(pkeys)
             if n != len(si.primekeys):
@@ -767,8 +821,8 @@ class Client:
     # Export scaling types, from (internal) series "jsoc.Color_Tables"
     _export_scaling_names = ("LOG", "MINMAX", "MINMAXGIVEN", "SQRT", "mag")
 
-    @staticmethod
-    def _validate_export_protocol_args(protocol_args):
+    @classmethod
+    def _validate_export_protocol_args(cls, protocol_args):
         """
         Validate export protocol arguments.
         """
@@ -781,90 +835,51 @@ class Client:
             ct_key = "CT"
             ct = protocol_args.get(ct_key)
         if ct is not None:
-            ll = [s.lower() for s in Client._export_color_table_names]
+            ll = [s.lower() for s in cls._export_color_table_names]
             try:
                 i = ll.index(ct.lower())
             except ValueError as e:
                 msg = f"{ct} is not a valid color table, "
                 msg += "available color tables: {}".format(
-                    ", ".join([str(s) for s in Client._export_color_table_names]),
+                    ", ".join([str(s) for s in cls._export_color_table_names]),
                 )
                 raise ValueError(msg) from e
-            protocol_args[ct_key] = Client._export_color_table_names[i]
+            protocol_args[ct_key] = cls._export_color_table_names[i]
 
         scaling = protocol_args.get("scaling")
         if scaling is not None:
-            ll = [s.lower() for s in Client._export_scaling_names]
+            ll = [s.lower() for s in cls._export_scaling_names]
             try:
                 i = ll.index(scaling.lower())
             except ValueError as e:
                 msg = f"{scaling} is not a valid scaling type,"
-                msg += "available scaling types: {}".format(", ".join([str(s) for s in Client._export_scaling_names]))
+                msg += "available scaling types: {}".format(", ".join([str(s) for s in cls._export_scaling_names]))
                 raise ValueError(msg) from e
-            protocol_args["scaling"] = Client._export_scaling_names[i]
+            protocol_args["scaling"] = cls._export_scaling_names[i]
 
-    @property
-    def _server(self):
-        """
-        (ServerConfig) Remote server configuration.
-        """
-        return self._json.server
-
-    @property
-    def email(self):
+    @classmethod
+    def _parse_series(cls, d, *, full=False):
         """
-        (string) Default email address used for data export requests.
+        Parse the result of a show_series request.
         """
-        return self._email
-
-    @email.setter
-    def email(self, value):
-        if value is not None and not self.check_email(value):
-            raise ValueError("Email address is invalid or not registered")
-        self._email = value
+        status = d.get("status")
+        if status != 0:
+            cls._raise_query_error(d)
+        if full:
+            keys = ("name", "primekeys", "note")
+            if not d["names"]:
+                return pd.DataFrame(columns=keys)
+            recs = [(it["name"], _split_arg(it["primekeys"]), it["note"]) for it in d["names"]]
+            return pd.DataFrame(recs, columns=keys)
+        if not d["names"]:
+            return []
+        return [it["name"] for it in d["names"]]
 
-    def series(self, regex=None, *, full=False):
+    @staticmethod
+    def _parse_series_wrapper(d, *, full=False):
         """
-        List available data series.
-
-        Parameters
-        ----------
-        regex : str or None, optional
-            Regular expression, used to select a subset of the
-            available series. If set to None, a list of all available
-            series is returned.
-        full : bool
-            If True, return a pandas.DataFrame containing additional
-            series information, like description and primekeys. If
-            False (default), the result is a list containing only the
-            series names.
-
-        Returns
-        -------
-        result : list or pandas.DataFrame
-            List of series names or DataFrame containing name,
-            primekeys and a description of the selected series (see
-            parameter ``full``).
+        Parse the result of a show_series_wrapper request.
         """
-        if not self._server.check_supported("series"):
-            raise DrmsOperationNotSupported("Server does not support series list access")
-        if self._server.url_show_series_wrapper is None:
-            # No wrapper CGI available, use the regular version.
-            d = self._json.show_series(ds_filter=regex)
-            status = d.get("status")
-            if status != 0:
-                self._raise_query_error(d)
-            if full:
-                keys = ("name", "primekeys", "note")
-                if not d["names"]:
-                    return pd.DataFrame(columns=keys)
-                recs = [(it["name"], _split_arg(it["primekeys"]), it["note"]) for it in d["names"]]
-                return pd.DataFrame(recs, columns=keys)
-            if not d["names"]:
-                return []
-            return [it["name"] for it in d["names"]]
-        # Use show_series_wrapper instead of the regular version.
-        d = self._json.show_series_wrapper(ds_filter=regex, info=full)
         if full:
             keys = ("name", "note")
             if not d["seriesList"]:
@@ -877,74 +892,1891 @@ class Client:
             return pd.DataFrame(recs, columns=keys)
         return d["seriesList"]
 
-    def info(self, ds):
+    @staticmethod
+    def _info_name(ds):
+        name = _extract_series_name(ds)
+        return name.lower() if name is not None else None
+
+    @staticmethod
+    def _query_cache_key(server, ds, *, key, seg, link, skip_conversion, pkeys, **kwargs):
         """
-        Get information about the content of a data series.
+        Create the `~drms.cache.QueryCache` key of a `query`.
+        """
+        return _query_key(
+            server,
+            ds,
+            key=key,
+            seg=seg,
+            link=link,
+            pkeys=pkeys,
+            skip_conversion=_normalize_names(skip_conversion),
+            **kwargs,
+        )
 
-        Parameters
-        ----------
-        ds : str
-            Name of the data series.
+    @classmethod
+    def _split_time_range(cls, ds):
+        """
+        Split a record set whose first filter is a time range into the
+        series name, the start and end of the time range, the time zone
+        suffix and the remaining filters and segments.
 
-        Returns
-        -------
-        result : `SeriesInfo`
-            SeriesInfo instance containing information about the data
-            series.
+        Returns None for other record sets.
         """
-        if not self._server.check_supported("info"):
-            raise DrmsOperationNotSupported("Server does not support series info access")
-        name = _extract_series_name(ds)
-        if name is not None:
-            name = name.lower()
-        if name in self._info_cache:
-            return self._info_cache[name]
-        d = self._json.series_struct(name)
-        status = d.get("status")
-        if status != 0:
-            self._raise_query_error(d)
-        si = SeriesInfo(d, name=name)
-        if name is not None:
-            self._info_cache[name] = si
-        return si
+        parts = cls._chunk_parts(ds)
+        if parts is None or not parts[1]:
+            return None
+        series, filters, segments = parts
+        time_range = _parse_time_range(filters[0])
+        if time_range is None:
+            return None
+        return series, *time_range, "".join(f"[{f}]" for f in filters[1:]) + segments
 
-    def keys(self, ds):
+    @staticmethod
+    def _coverage_recset(time_range, gap):
         """
-        Get a list of keywords that are available for a series. Use the
-        :func:`info` method for more details.
+        Create the record set of a part of a time range.
+        """
+        series, _, _, suffix, tail = time_range
+        start, end = gap
+        return f"{series}[{_format_time(start, suffix)}/{(end - start).total_seconds():g}s]{tail}"
 
-        Parameters
-        ----------
-        ds : str
-            Name of the data series.
+    @staticmethod
+    def _coverage_key(server, time_range, pkey, *, key, seg, link, rec_index, typed, skip_conversion=None):
+        """
+        Return the keywords that are requested for a `_coverage_query`,
+        which include the prime key, and the `~drms.cache.CoverageCache`
+        key of the cached records.
+
+        Typed records are cached with the dtypes of their keyword types,
+        so the keywords skipped by the conversion are part of their key.
+        Other records are cached as strings and converted when they are
+        returned.
+        """
+        series, _, _, suffix, tail = time_range
+        fetch_key = _split_arg(key) if key is not None else []
+        if pkey not in fetch_key:
+            fetch_key = [*fetch_key, pkey]
+        cache_key = _query_key(
+            server,
+            f"{series}{tail}",
+            key=fetch_key,
+            seg=seg,
+            link=link,
+            suffix=suffix,
+            rec_index=rec_index,
+            typed=typed,
+            skip_conversion=_normalize_names(skip_conversion) if typed else None,
+        )
+        return fetch_key, cache_key
 
-        Returns
-        -------
-        result : list
-            List of keywords available for the selected series.
+    @staticmethod
+    def _coverage_add(cache, cache_key, time_range, gaps, pkey, results):
+        """
+        Add the `_parse_query_result` results of the missing parts of a time
+        range to the cache and return the records of the time range, or
+        None if they are not completely cached.
+        """
+        _, start, end, _, _ = time_range
+        if results:
+            results = [r if isinstance(r, tuple) else (r,) for r in results]
+            frames = tuple(
+                pd.concat([f for f in chunk_frames if len(f) > 0] or list(chunk_frames[:1]))
+                for chunk_frames in zip(*results, strict=True)
+            )
+            times = frames[0][pkey] if pkey in frames[0] else pd.Series([], dtype=object)
+            if times.dtype.kind != "M":
+                times = to_datetime(times, force=True)
+            if times.isna().any():
+                # Records without a valid time cannot be assigned to a time
+                # range, so the results are not cached.
+                return frames if gaps == [(start, end)] else None
+            cache.add(cache_key, gaps, frames, times.to_numpy())
+        return cache.select(cache_key, start, end)
+
+    @classmethod
+    def _coverage_result(cls, frames, *, key, seg, link, si, skip_conversion, categorical, rec_index):
         """
-        si = self.info(ds)
-        return list(si.keywords.index)
+        Select the requested columns of the records returned by a
+        `_coverage_query` and convert them like `_concat_query_results`.
+        """
+        frames = frames if isinstance(frames, tuple) else (frames,)
+        requested = [_split_arg(key) if key is not None else None]
+        requested += [_split_arg(names) for names in (seg, link) if names is not None]
+        res = tuple(frame[list(req)] for frame, req in zip(frames, requested, strict=True) if req is not None)
+        if not res:
+            return None
+        return cls._concat_query_results(
+            [res],
+            rec_index=rec_index,
+            si=si if key is not None else None,
+            skip_conversion=skip_conversion,
+            categorical=categorical,
+        )
 
-    def pkeys(self, ds):
+    @staticmethod
+    def _chunk_categorical(categorical, output):
         """
-        Get a list of primekeys that are available for a series. Use the
-        :func:`info` method for more details.
+        Get the ``categorical`` argument for the chunks of a chunked query.
 
-        Parameters
+        Pandas chunks are encoded after the concatenation. For other
+        formats, candidate columns are encoded in all chunks, so that
+        the chunks have the same schema.
+        """
+        if output == "pandas" or not categorical:
+            return False
+        return 1.0
+
+    @staticmethod
+    def _number_chunk(res, offset, *, rec_index, output="pandas"):
+        """
+        Continue the index of the previous chunk in the DataFrames of a
+        chunk returned by `iter_query`.
+
+        Returns the number of records in the chunk.
+        """
+        frames = () if res is None else res if isinstance(res, tuple) else (res,)
+        num_rows = len if output == "pandas" else _get_output(output)[2]
+        num_records = num_rows(frames[0]) if frames else 0
+        if not rec_index:
+            for frame in frames:
+                if isinstance(frame, pd.DataFrame):
+                    frame.index = pd.RangeIndex(offset, offset + len(frame))
+        return num_records
+
+    @staticmethod
+    def _chunk_parts(ds):
+        """
+        Split a record set that can be chunked along its first prime key
+        into its parts, see `~drms.utils._split_recset`.
+
+        Returns None if the first filter is not a plain time range, e.g.
+        if it uses a step, a list or an SQL expression.
+        """
+        parts = _split_recset(ds)
+        if parts is None:
+            return None
+        filters = parts[1]
+        if filters and any(c in filters[0] for c in "@,?!=#$^"):
+            return None
+        return parts
+
+    @staticmethod
+    def _chunk_prime_key(si):
+        """
+        Return the first prime key of a series if it is a time keyword.
+        """
+        if not si.primekeys:
+            return None
+        pkey = si.primekeys[0]
+        if pkey not in si.keywords.index or not si.keywords.is_time[pkey]:
+            return None
+        return pkey
+
+    @classmethod
+    def _time_chunks(cls, ds, count, first, last, chunk_records):
+        """
+        Split a record set into consecutive time ranges of equal duration.
+
+        The time ranges cover the time of the first and of the last record
+        of the record set, given as rs_list results with a single record,
+        and are chosen such that each range contains about
+        ``chunk_records`` records. Returns None if the record set cannot be
+        split.
+        """
+        series, filters, segments = cls._chunk_parts(ds)
+        try:
+            t_first, suffix = _split_time_suffix(first["keywords"][0]["values"][0])
+            t_last, _ = _split_time_suffix(last["keywords"][0]["values"][0])
+        except (KeyError, IndexError):
+            return None
+        t_first = to_datetime(t_first, force=True)
+        t_last = to_datetime(t_last, force=True)
+        if pd.isna(t_first) or pd.isna(t_last):
+            return None
+        span = (t_last - t_first).total_seconds()
+        if span <= 0:
+            return None
+        # Half-open time ranges of whole seconds, the last one including
+        # the time of the last record.
+        duration = math.floor(span / math.ceil(count / chunk_records)) + 1
+        num_chunks = math.floor(span / duration) + 1
+        tail = "".join(f"[{f}]" for f in filters[1:]) + segments
+        logger.info(f"Splitting query into {num_chunks} chunks of {duration} seconds")
+        return [
+            f"{series}[{_format_time(t_first + pd.Timedelta(seconds=i * duration), suffix)}/{duration}s]{tail}"
+            for i in range(num_chunks)
+        ]
+
+    @classmethod
+    def _concat_query_results(
+        cls,
+        results,
+        *,
+        rec_index,
+        si=None,
+        skip_conversion=None,
+        categorical=False,
+        output="pandas",
+    ):
+        """
+        Concatenate the `_parse_query_result` results of consecutive record
+        set chunks.
+
+        Numeric keywords are converted and encoded as categorical columns
+        after the concatenation, so that the result does not depend on the
+        chunks.
+        """
+        if results[0] is None:
+            return None
+        results = [r if isinstance(r, tuple) else (r,) for r in results]
+        if output != "pandas":
+            _, concat, _ = _get_output(output)
+            res = [concat(list(tables)) for tables in zip(*results, strict=True)]
+            return res[0] if len(res) == 1 else tuple(res)
+        res = []
+        for frames in zip(*results, strict=True):
+            # Empty chunks are dropped to keep the dtypes of the others.
+            frames = [f for f in frames if len(f) > 0] or list(frames[:1])
+            res.append(pd.concat(frames, ignore_index=not rec_index))
+        if si is not None:
+            cls._convert_numeric_keywords(si, res[0], skip_conversion=skip_conversion)
+        if categorical:
+            # Only columns of strings are left with an object dtype.
+            for name in res[0]:
+                values = res[0][name]
+                if values.dtype == np.dtype(object) and cls._encode_as_category(values.tolist(), None, categorical):
+                    res[0][name] = values.astype("category")
+        return res[0] if len(res) == 1 else tuple(res)
+
+    @staticmethod
+    def _add_pkeys(key, pk):
+        """
+        Prepend primekeys to a list of keywords.
+        """
+        key = _split_arg(key) if key is not None else []
+        key = [k for k in key if k not in pk]
+        return pk + key
+
+    @classmethod
+    def _parse_query_result(
+        cls,
+        lres,
+        *,
+        key,
+        seg,
+        link,
+        rec_index,
+        si=None,
+        skip_conversion=None,
+        typed=False,
+        categorical=False,
+        output="pandas",
+    ):
+        """
+        Create the DataFrames returned by `query` from a successful rs_list
+        result.
+
+        Numeric keywords are converted if a `SeriesInfo` instance is given,
+        or created with the dtypes of their keyword types if ``typed`` is
+        True.
+        """
+        if output != "pandas":
+            return cls._parse_query_output(
+                lres,
+                output,
+                key=key,
+                seg=seg,
+                link=link,
+                rec_index=rec_index,
+                si=si,
+                skip_conversion=skip_conversion,
+                categorical=categorical,
+            )
+        res = []
+        if key is not None:
+            if "keywords" in lres:
+                names = [it["name"] for it in lres["keywords"]]
+                values = [it["values"] for it in lres["keywords"]]
+                if typed and si is not None:
+                    values = [
+                        cls._typed_keyword_values(si, name, v, skip_conversion=skip_conversion)
+                        for name, v in zip(names, values, strict=True)
+                    ]
+                if categorical:
+                    kinds = [
+                        None if si is None else cls._keyword_type(si, name, skip_conversion=skip_conversion)
+                        for name in names
+                    ]
+                    values = [
+                        pd.Categorical(v) if cls._encode_as_category(v, kind, categorical, typed=typed) else v
+                        for v, kind in zip(values, kinds, strict=True)
+                    ]
+                res_key = pd.DataFrame.from_dict(OrderedDict(zip(names, values, strict=False)))
+            else:
+                res_key = pd.DataFrame()
+            if si is not None and not typed:
+                cls._convert_numeric_keywords(si, res_key, skip_conversion=skip_conversion)
+            res.append(res_key)
+
+        if seg is not None:
+            if "segments" in lres:
+                names = [it["name"] for it in lres["segments"]]
+                values = [it["values"] for it in lres["segments"]]
+                res_seg = pd.DataFrame.from_dict(OrderedDict(zip(names, values, strict=False)))
+            else:
+                res_seg = pd.DataFrame()
+            res.append(res_seg)
+
+        if link is not None:
+            if "links" in lres:
+                names = [it["name"] for it in lres["links"]]
+                values = [it["values"] for it in lres["links"]]
+                res_link = pd.DataFrame.from_dict(OrderedDict(zip(names, values, strict=False)))
+            else:
+                res_link = pd.DataFrame()
+            res.append(res_link)
+
+        if rec_index:
+            index = [it["name"] for it in lres["recinfo"]]
+            for r in res:
+                r.index = index
+
+        if len(res) == 0:
+            return None
+        if len(res) == 1:
+            return res[0]
+        return tuple(res)
+
+    @classmethod
+    def _since_state(cls, ds, si, state, cursor):
+        """
+        Return the series name, the cursor keyword, the last cursor value
+        and the identifiers of the records with this value of a
+        `query_since` state.
+        """
+        if cursor == "recnum":
+            cursor_key = "*recnum*"
+        elif cursor == "pkey":
+            cursor_key = cls._chunk_prime_key(si)
+            if cursor_key is None:
+                raise ValueError("The cursor 'pkey' requires a time prime key, use cursor='recnum' instead")
+        else:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        series = _extract_series_name(ds)
+        if state is None:
+            return series, cursor_key, None, []
+        if state.get("series", "").lower() != series.lower() or state.get("cursor") != cursor_key:
+            raise ValueError("The query state belongs to a different series or cursor")
+        return series, cursor_key, state.get("last"), state.get("seen", [])
+
+    @staticmethod
+    def _since_id_keys(si, cursor_key):
+        """
+        Return the keywords that tell apart records with the same cursor
+        value in `query_since`, i.e. the other prime keys of the series.
+        Record numbers are unique, so no other keywords are needed.
+        """
+        if cursor_key == "*recnum*":
+            return []
+        return [k for k in si.primekeys or [] if k != cursor_key]
+
+    @staticmethod
+    def _add_cursor_key(key, cursor_keys):
+        """
+        Add the cursor keywords of `query_since` to the requested keywords.
+        """
+        names = _split_arg(key) if key is not None else []
+        missing = [k for k in cursor_keys if k not in names]
+        return [*names, *missing] if missing else key
+
+    @classmethod
+    def _since_recset(cls, ds, cursor_key, last):
+        """
+        Restrict a record set to the records after the last cursor value,
+        if possible.
+        """
+        if last is None:
+            return ds
+        if cursor_key == "*recnum*":
+            parts = _split_recset(ds)
+            if parts is None:
+                return ds
+            series, filters, segments = parts
+            return f"{series}{''.join(f'[{f}]' for f in filters)}[? recnum > {int(last)} ?]{segments}"
+        time_range = cls._split_time_range(ds)
+        if time_range is None:
+            return ds
+        series, start, end, suffix, tail = time_range
+        t_last, last_suffix = _split_time_suffix(last)
+        t_last = to_datetime(t_last, force=True)
+        # Time ranges in other time zones are not shortened, since the
+        # offset between time zones is unknown.
+        if last_suffix != suffix or pd.isna(t_last) or t_last <= start:
+            return ds
+        duration = max((end - t_last).total_seconds(), 1)
+        return f"{series}[{last}/{duration:g}s]{tail}"
+
+    @staticmethod
+    def _since_records(lres, cursor_key, last, seen=(), id_keys=(), *, drop=()):
+        """
+        Remove the records of an rs_list result that are not newer than
+        the last cursor value and return the result, the new last cursor
+        value and the identifiers of the records with this value.
+
+        Records with the same time as the last cursor value are kept, if
+        their values of the ``id_keys`` keywords are not in ``seen``.
+        Records with missing cursor values are removed. The keywords in
+        ``drop`` are removed from the result.
+        """
+        columns = {it["name"]: it["values"] for it in lres.get("keywords", [])}
+        values = columns.get(cursor_key, [])
+        id_columns = [columns.get(k, [None] * len(values)) for k in id_keys]
+        ids = list(zip(*id_columns, strict=True)) if id_columns else [()] * len(values)
+        if cursor_key == "*recnum*":
+            order = _to_numeric(pd.Series(values, dtype=object)).to_numpy(dtype=float)
+            bound = None if last is None else float(last)
+        else:
+            order = to_datetime(pd.Series(values, dtype=object), force=True).to_numpy()
+            bound = None if last is None else np.datetime64(to_datetime(_split_time_suffix(last)[0], force=True))
+        if bound is None:
+            keep = ~pd.isna(order)
+        else:
+            # Missing cursor values are never greater or equal.
+            keep = order > bound
+            if cursor_key != "*recnum*":
+                seen_ids = {tuple(it) for it in seen}
+                keep |= (order == bound) & np.array([it not in seen_ids for it in ids], dtype=bool)
+        idx = np.flatnonzero(keep)
+        if len(idx) > 0:
+            newest = order[idx].max()
+            at_last = idx[order[idx] == newest]
+            if cursor_key == "*recnum*":
+                last = int(newest)
+            else:
+                new_seen = [list(ids[i]) for i in at_last]
+                seen = [*seen, *new_seen] if bound is not None and newest == bound else new_seen
+                last = values[at_last[0]]
+        seen = [list(it) for it in seen]
+
+        res = dict(lres, count=len(idx))
+        for group in ("keywords", "segments", "links"):
+            if group in lres:
+                res[group] = [
+                    {k: [v[i] for i in idx] if isinstance(v, list) else v for k, v in it.items()}
+                    for it in lres[group]
+                    if not (group == "keywords" and it["name"] in drop)
+                ]
+        if "recinfo" in lres:
+            res["recinfo"] = [lres["recinfo"][i] for i in idx]
+        return res, last, seen
+
+    @classmethod
+    def _parse_query_output(
+        cls,
+        lres,
+        output,
+        *,
+        key,
+        seg,
+        link,
+        rec_index,
+        si=None,
+        skip_conversion=None,
+        categorical=False,
+    ):
+        """
+        Create the tables returned by `query` for output formats other
+        than pandas.
+
+        Keywords are converted according to their keyword types if a
+        `SeriesInfo` instance is given.
+        """
+        table, _, _ = _get_output(output)
+        res = []
+        for group, requested in [("keywords", key), ("segments", seg), ("links", link)]:
+            if requested is None:
+                continue
+            items = lres.get(group, [])
+            names = [it["name"] for it in items]
+            columns = [it["values"] for it in items]
+            if group == "keywords" and si is not None:
+                kinds = [cls._keyword_type(si, name, skip_conversion=skip_conversion) for name in names]
+            else:
+                kinds = [None] * len(names)
+            if group == "keywords" and categorical:
+                kinds = [
+                    "category" if cls._encode_as_category(values, kind, categorical) else kind
+                    for values, kind in zip(columns, kinds, strict=True)
+                ]
+            if rec_index:
+                names.insert(0, "record")
+                columns.insert(0, [it["name"] for it in lres["recinfo"]])
+                kinds.insert(0, None)
+            res.append(table(names, columns, kinds))
+        if len(res) == 0:
+            return None
+        if len(res) == 1:
+            return res[0]
+        return tuple(res)
+
+    @staticmethod
+    def _parse_check_address(res):
+        status = res.get("status")
+        return status is not None and int(status) == 2
+
+    @classmethod
+    def _parse_rs_list(cls, lres, **kwargs):
+        """
+        Check the status of an rs_list result and create the DataFrames of
+        `_parse_query_result`.
+        """
+        if lres.get("status") != 0:
+            cls._raise_query_error(lres)
+        return cls._parse_query_result(lres, **kwargs)
+
+    @property
+    def _server(self):
+        """
+        (ServerConfig) Remote server configuration.
+        """
+        return self._json.server
+
+    def _check_query(self, output):
+        """
+        Check that the server supports queries and that the output format
+        is available.
+        """
+        if not self._server.check_supported("query"):
+            raise DrmsOperationNotSupported("Server does not support DRMS queries")
+        if output != "pandas":
+            _get_output(output)  # raises for unknown or unavailable formats
+
+    def _add_series_info(self, d, name):
+        """
+        Create a `SeriesInfo` from a series_struct result and cache it.
+        """
+        status = d.get("status")
+        if status != 0:
+            self._raise_query_error(d)
+        si = SeriesInfo(d, name=name)
+        if name is not None:
+            self._info_cache[name] = si
+        return si
+
+    def _cached_query(self, ds, *, output, **kwargs):
+        """
+        Look up a query in the `~drms.cache.QueryCache`.
+
+        Returns the cache key, or None if the query is not cached, and the
+        cached result, or None if there is none.
+        """
+        if self._query_cache is None or output != "pandas":
+            return None, None
+        cache_key = self._query_cache_key(self._server, ds, **kwargs)
+        return cache_key, self._query_cache.get(cache_key)
+
+    def _coverage_time_range(self, ds, *, n, output):
+        """
+        Return the `_split_time_range` parts of a record set, if the query
+        uses the `~drms.cache.CoverageCache`, or None.
+        """
+        if self._coverage_cache is None or output != "pandas" or n is not None:
+            return None
+        return self._split_time_range(ds)
+
+    def _coverage_gaps(self, time_range, pkey, *, key, seg, link, rec_index, typed, skip_conversion):
+        """
+        Return the keywords requested for a `_coverage_query`, the
+        `~drms.cache.CoverageCache` key and the time ranges that are not
+        cached.
+        """
+        _, start, end, _, _ = time_range
+        fetch_key, cache_key = self._coverage_key(
+            self._server,
+            time_range,
+            pkey,
+            key=key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            typed=typed,
+            skip_conversion=skip_conversion,
+        )
+        return fetch_key, cache_key, self._coverage_cache.missing(cache_key, start, end)
+
+    @classmethod
+    def _chunk_args(cls, si, *, key, seg, link, rec_index, skip_conversion, typed, categorical, output):
+        """
+        Return the arguments of `_query_chunk` and of
+        `_concat_query_results` for the chunks of a chunked `query`.
+
+        Typed chunks are created with the final dtypes, other chunks are
+        converted after the concatenation.
+        """
+        typed_chunks = typed or output != "pandas"
+        chunk_args = {
+            "key": key,
+            "seg": seg,
+            "link": link,
+            "rec_index": rec_index,
+            "si": si if typed_chunks else None,
+            "skip_conversion": skip_conversion,
+            "typed": typed,
+            "categorical": cls._chunk_categorical(categorical, output),
+            "output": output,
+        }
+        concat_args = {
+            "rec_index": rec_index,
+            "si": None if typed_chunks else si,
+            "skip_conversion": skip_conversion,
+            "categorical": categorical,
+            "output": output,
+        }
+        return chunk_args, concat_args
+
+    @classmethod
+    def _since_request(cls, ds, si, *, key, state, cursor):
+        """
+        Return the record set and the keywords of the rs_list request of
+        `query_since` and the cursor, which is passed to `_since_result`.
+        """
+        series, cursor_key, last, seen = cls._since_state(ds, si, state, cursor)
+        id_keys = cls._since_id_keys(si, cursor_key)
+        fetch_key = cls._add_cursor_key(key, [cursor_key, *id_keys])
+        recset = cls._since_recset(ds, cursor_key, last)
+        return recset, fetch_key, (series, cursor_key, last, seen, id_keys)
+
+    @classmethod
+    def _since_result(cls, lres, since, *, key, fetch_key, **kwargs):
+        """
+        Create the result and the new state of `query_since` from the
+        rs_list result of a `_since_request`.
+        """
+        series, cursor_key, last, seen, id_keys = since
+        if lres.get("status") != 0:
+            cls._raise_query_error(lres)
+        lres, last, seen = cls._since_records(
+            lres, cursor_key, last, seen, id_keys, drop=set(_split_arg(fetch_key)) - set(_split_arg(key) or [])
+        )
+        res = cls._parse_query_result(lres, key=key, **kwargs)
+        return res, {"series": series, "cursor": cursor_key, "last": last, "seen": seen}
+
+
+class Client(_ClientBase):
+    """
+    Client for remote DRMS server access.
+
+    Parameters
+    ----------
+    server : str or drms.config.ServerConfig
+        Registered server ID or ServerConfig instance.
+        Defaults to JSOC.
+    email : str or None
+        Default email address used data export requests.
+    pool_size : int
+        Maximum number of idle keep-alive connections kept open per
+        host. Defaults to 10.
+    idle_timeout : float
+        Number of seconds after which idle keep-alive connections are
+        closed instead of being reused. Defaults to 60 seconds.
+    retry_policy : `~drms.retry.RetryPolicy` or None
+        Policy used to retry failed requests and downloads. If set to
+        None (default), a `~drms.retry.RetryPolicy` with default settings
+        is used.
+    cache : `~drms.json.ResponseCache` or None
+        Persistent cache for series lists and series information, which
+        is shared between processes. If set to None (default), no
+        persistent cache is used.
+    transport : `~drms.transport.Transport` or None
+        Custom transport used to send HTTP requests, e.g. a
+        `~drms.transport.HttpxTransport` or a
+        `~drms.replay.RecordReplayTransport`. See
+        `~drms.json.HttpJsonClient`.
+    metrics_hook : callable or None
+        Function that is called with a `~drms.metrics.RequestMetrics`
+        instance for every HTTP request and file download, containing
+        phase timings, byte counts and the runtime reported by the
+        server. See `~drms.json.HttpJsonClient`.
+    query_cache : `~drms.cache.QueryCache` or None
+        Cache for the results of `query`, which returns repeated queries
+        without sending requests to the server. If set to None (default),
+        query results are not cached.
+    coverage_cache : `~drms.cache.CoverageCache` or None
+        Cache for the records returned by `query` for time ranges, e.g.
+        ``hmi.m_45s[2024.01.01/7d]``. Queries of overlapping time ranges
+        only request the records of the time ranges that are not cached
+        yet. If set to None (default), records are not cached.
+    """
+
+    def __init__(
+        self,
+        server="jsoc",
+        *,
+        email=None,
+        pool_size=10,
+        idle_timeout=60,
+        retry_policy=None,
+        cache=None,
+        transport=None,
+        metrics_hook=None,
+        query_cache=None,
+        coverage_cache=None,
+    ):
+        self._json = HttpJsonClient(
+            server,
+            pool_size=pool_size,
+            idle_timeout=idle_timeout,
+            retry_policy=retry_policy,
+            cache=cache,
+            transport=transport,
+            metrics_hook=metrics_hook,
+        )
+        self._info_cache = {}
+        self._query_cache = query_cache
+        self._coverage_cache = coverage_cache
+        self.email = email  # use property for email validation
+
+    def __repr__(self):
+        return f"<Client: {self._server.name}>"
+
+    def _generate_filenamefmt(self, sname):
+        """
+        Generate filename format string for export requests.
+        """
+        try:
+            si = self.info(sname)
+        except Exception as e:  # NOQA: BLE001
+            # Cannot generate filename format for unknown series.
+            logger.warning(f"Cannot generate filename format for unknown series '{sname}' with {e}")
+            return None
+        return self._filenamefmt_from_info(si)
+
+    def _filename_from_export_record(self, rs, *, old_fname=None):
+        """
+        Generate a filename from an export request record.
+        """
+        sname, pkeys, segs = self._parse_export_recset(rs)
+        if sname is None:
+            return None
+
+        # We need to identify time primekeys and change the time strings to
+        # make them suitable for filenames.
+        try:
+            si = self.info(sname)
+        except Exception as e:  # NOQA: BLE001
+            # Cannot generate filename for unknown series.
+            logger.warning(f"Cannot generate filename format for unknown series '{sname}' with {e}")
+            return None
+        return self._filename_from_info(si, pkeys, segs, old_fname=old_fname)
+
+    @property
+    def email(self):
+        """
+        (string) Default email address used for data export requests.
+        """
+        return self._email
+
+    @email.setter
+    def email(self, value):
+        if value is not None and not self.check_email(value):
+            raise ValueError("Email address is invalid or not registered")
+        self._email = value
+
+    def probe_mirrors(self, *, timeout=10):
+        """
+        Measure the latency of all mirrors configured for the server.
+
+        Requests are routed to the fastest healthy mirror, see
+        `~drms.config.ServerConfig`. Mirrors are also measured by regular
+        requests, so calling this is optional.
+
+        Parameters
+        ----------
+        timeout : float
+            Timeout in seconds for each mirror.
+        """
+        self._json.probe_mirrors(timeout=timeout)
+
+    def series(self, regex=None, *, full=False):
+        """
+        List available data series.
+
+        Parameters
+        ----------
+        regex : str or None, optional
+            Regular expression, used to select a subset of the
+            available series. If set to None, a list of all available
+            series is returned.
+        full : bool
+            If True, return a pandas.DataFrame containing additional
+            series information, like description and primekeys. If
+            False (default), the result is a list containing only the
+            series names.
+
+        Returns
+        -------
+        result : list or pandas.DataFrame
+            List of series names or DataFrame containing name,
+            primekeys and a description of the selected series (see
+            parameter ``full``).
+        """
+        if not self._server.check_supported("series"):
+            raise DrmsOperationNotSupported("Server does not support series list access")
+        if self._server.url_show_series_wrapper is None:
+            # No wrapper CGI available, use the regular version.
+            d = self._json.show_series(ds_filter=regex)
+            return self._parse_series(d, full=full)
+        # Use show_series_wrapper instead of the regular version.
+        d = self._json.show_series_wrapper(ds_filter=regex, info=full)
+        return self._parse_series_wrapper(d, full=full)
+
+    def info(self, ds):
+        """
+        Get information about the content of a data series.
+
+        Parameters
+        ----------
+        ds : str
+            Name of the data series.
+
+        Returns
+        -------
+        result : `SeriesInfo`
+            SeriesInfo instance containing information about the data
+            series.
+        """
+        if not self._server.check_supported("info"):
+            raise DrmsOperationNotSupported("Server does not support series info access")
+        name = self._info_name(ds)
+        if name in self._info_cache:
+            return self._info_cache[name]
+        d = self._json.series_struct(name)
+        return self._add_series_info(d, name)
+
+    def keys(self, ds):
+        """
+        Get a list of keywords that are available for a series. Use the
+        :func:`info` method for more details.
+
+        Parameters
+        ----------
+        ds : str
+            Name of the data series.
+
+        Returns
+        -------
+        result : list
+            List of keywords available for the selected series.
+        """
+        si = self.info(ds)
+        return list(si.keywords.index)
+
+    def pkeys(self, ds):
+        """
+        Get a list of primekeys that are available for a series. Use the
+        :func:`info` method for more details.
+
+        Parameters
+        ----------
+        ds : str
+            Name of the data series.
+
+        Returns
+        -------
+        result : list
+            List of primekeys available for the selected series.
+        """
+        si = self.info(ds)
+        return list(si.primekeys)
+
+    def query(
+        self,
+        ds,
+        *,
+        key=None,
+        seg=None,
+        link=None,
+        convert_numeric=True,
+        skip_conversion=None,
+        typed=False,
+        categorical=False,
+        pkeys=False,
+        rec_index=False,
+        n=None,
+        chunk_records=None,
+        max_workers=4,
+        output="pandas",
+    ):
+        """
+        Query keywords, segments and/or links of a record set. At least one of
+        the parameters key, seg, link or pkeys needs to be specified.
+
+        Parameters
+        ----------
+        ds : str
+            Record set query.
+        key : str, List[str] or None
+            List of requested keywords, optional. If set to None
+            (default), no keyword results will be returned, except
+            when pkeys is True.
+        seg : str, List[str] or None
+            List of requested segments, optional. If set to None
+            (default), no segment results will be returned.
+        link : str, List[str] or None
+            List of requested Links, optional. If set to None
+            (default), no link results will be returned.
+        convert_numeric : bool
+            Convert keywords with numeric types from string to
+            numbers. This may result in NaNs for invalid/missing
+            values. Default is True.
+        skip_conversion : List[str] or None
+            List of keywords names to be skipped when performing a
+            numeric conversion. Default is None.
+        typed : bool
+            If True, keyword columns are created directly with dtypes
+            derived from the keyword types of the series: nullable
+            ``Int16``, ``Int32`` and ``Int64`` for short, int and
+            longlong keywords, ``float32`` and ``float64`` for float and
+            double keywords and ``datetime64`` for time keywords. Invalid
+            and missing values become ``<NA>``, NaN or NaT. String
+            keywords and keywords in ``skip_conversion`` are kept as
+            strings. Default is False.
+        categorical : bool or float
+            If True, string keywords with few distinct values (at most
+            half the number of records), like INSTRUME or WAVE_STR, are
+            stored as ``category`` columns, which needs much less memory
+            than columns of Python strings. A float sets the maximum
+            ratio of distinct values to records. Other output formats
+            use dictionary encoded (Arrow) or Categorical (Polars)
+            columns. Default is False.
+        pkeys : bool
+            If True, all primekeys of the series are added to the
+            ``key`` parameter.
+        rec_index : bool
+            If True, record names are used as index for the resulting
+            DataFrames.
+        n : int or None
+            Limits the number of records returned by the query. For
+            positive
+            values, the first n records of the record set are
+            returned, for negative values the last abs(n) records. If
+            set to None (default), no limit is applied.
+        chunk_records : int or None
+            If set, record sets with more than ``chunk_records`` records
+            are split along their first prime key into consecutive time
+            ranges of about ``chunk_records`` records each. The chunks
+            are queried concurrently and concatenated in order, which
+            gives the same result as a single query. This requires a
+            time prime key and a record set whose first filter is empty
+            or a time range without a step, e.g. ``[2014.01.01/365d]``;
+            other record sets and queries with ``n`` are sent as a single
+            request. If set to None (default), record sets are never
+            split.
+        max_workers : int
+            Maximum number of chunks that are queried concurrently.
+            Default is 4.
+        output : str
+            Format of the results. If set to 'pandas' (default), pandas
+            DataFrames are returned. Other formats are 'arrow'
+            (`pyarrow.Table`), 'polars' (`polars.DataFrame`), 'numpy'
+            (NumPy structured array) and 'dict' (dictionary of NumPy
+            arrays), which are created directly from the server
+            response, with column types derived from the keyword types
+            like for ``typed=True`` (unless ``convert_numeric`` is
+            False). NumPy integer columns with missing values are
+            float64. Record names are added as first column 'record', if
+            ``rec_index`` is True. Further formats can be added with
+            `~drms.output.register_output`.
+
+        Returns
+        -------
+        res_key : pandas.DataFrame, optional
+            Keyword query results. This DataFrame is only returned,
+            if key is not None or pkeys is set to True.
+        res_seg : pandas.DataFrame, optional
+            Segment query results. This DataFrame is only returned,
+            if seg is not None.
+        res_link : pandas.DataFrame, optional
+            Link query results. This DataFrame is only returned,
+            if link is not None.
+        """
+        self._check_query(output)
+        cache_key, res = self._cached_query(
+            ds,
+            key=key,
+            seg=seg,
+            link=link,
+            convert_numeric=convert_numeric,
+            skip_conversion=skip_conversion,
+            typed=typed,
+            categorical=categorical,
+            pkeys=pkeys,
+            rec_index=rec_index,
+            n=n,
+            output=output,
+        )
+        if res is not None:
+            return _reorder_result(res, [key, seg, link])
+        if pkeys:
+            key = self._add_pkeys(key, self.pkeys(ds))
+
+        time_range = self._coverage_time_range(ds, n=n, output=output)
+        pkey = self._chunk_prime_key(self.info(ds)) if time_range is not None else None
+        chunks = None
+        if pkey is None and chunk_records is not None and n is None:
+            chunks = self._query_chunks(ds, chunk_records)
+        if pkey is not None:
+            res = self._coverage_query(
+                time_range,
+                pkey,
+                key=key,
+                seg=seg,
+                link=link,
+                convert_numeric=convert_numeric,
+                skip_conversion=skip_conversion,
+                typed=typed,
+                categorical=categorical,
+                rec_index=rec_index,
+                chunk_records=chunk_records,
+                max_workers=max_workers,
+            )
+        elif chunks is not None:
+            si = self.info(ds) if (convert_numeric or typed) and key is not None else None
+            chunk_args, concat_args = self._chunk_args(
+                si,
+                key=key,
+                seg=seg,
+                link=link,
+                rec_index=rec_index,
+                skip_conversion=skip_conversion,
+                typed=typed,
+                categorical=categorical,
+                output=output,
+            )
+            with ThreadPoolExecutor(max_workers=int(max_workers)) as executor:
+                results = list(executor.map(partial(self._query_chunk, **chunk_args), chunks))
+            res = self._concat_query_results(results, **concat_args)
+        else:
+            lres = self._json.rs_list(ds, key=key, seg=seg, link=link, recinfo=rec_index, n=n)
+            si = self.info(ds) if (convert_numeric or typed) and key is not None else None
+            res = self._parse_rs_list(
+                lres,
+                key=key,
+                seg=seg,
+                link=link,
+                rec_index=rec_index,
+                si=si,
+                skip_conversion=skip_conversion,
+                typed=typed,
+                categorical=categorical,
+                output=output,
+            )
+        if cache_key is not None:
+            self._query_cache.put(cache_key, res)
+        return res
+
+    def _coverage_query(
+        self,
+        time_range,
+        pkey,
+        *,
+        key,
+        seg,
+        link,
+        convert_numeric,
+        skip_conversion,
+        typed,
+        categorical,
+        rec_index,
+        chunk_records,
+        max_workers,
+    ):
+        """
+        Query a time range with the `~drms.cache.CoverageCache`, requesting
+        only the records of time ranges that are not cached.
+        """
+        series, start, end, _, _ = time_range
+        si = self.info(series)
+        fetch_key, cache_key, gaps = self._coverage_gaps(
+            time_range,
+            pkey,
+            key=key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            typed=typed,
+            skip_conversion=skip_conversion,
+        )
+        recsets = [self._coverage_recset(time_range, gap) for gap in gaps]
+        if chunk_records is not None:
+            recsets = [chunk for ds in recsets for chunk in self._query_chunks(ds, chunk_records) or [ds]]
+        query_chunk = partial(
+            self._query_chunk,
+            key=fetch_key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            si=si if typed else None,
+            skip_conversion=skip_conversion,
+            typed=typed,
+        )
+        with ThreadPoolExecutor(max_workers=int(max_workers)) as executor:
+            results = list(executor.map(query_chunk, recsets))
+        frames = self._coverage_add(self._coverage_cache, cache_key, time_range, gaps, pkey, results)
+        if frames is None:
+            # The cached records have expired or were removed in the meantime,
+            # or cannot be combined with the fetched records.
+            frames = query_chunk(self._coverage_recset(time_range, (start, end)))
+        return self._coverage_result(
+            frames,
+            key=key,
+            seg=seg,
+            link=link,
+            si=si if convert_numeric and not typed else None,
+            skip_conversion=skip_conversion,
+            categorical=categorical,
+            rec_index=rec_index,
+        )
+
+    def _query_chunks(self, ds, chunk_records):
+        """
+        Split a record set into time chunks for `query`, or return None
+        if it is not split.
+        """
+        if self._chunk_parts(ds) is None:
+            return None
+        pkey = self._chunk_prime_key(self.info(ds))
+        if pkey is None:
+            return None
+        count = self._json.rs_summary(ds).get("count")
+        if count is None or count <= chunk_records:
+            return None
+        first = self._json.rs_list(ds, key=pkey, n=1)
+        last = self._json.rs_list(ds, key=pkey, n=-1)
+        return self._time_chunks(ds, count, first, last, chunk_records)
+
+    def _query_chunk(
+        self,
+        ds,
+        *,
+        key,
+        seg,
+        link,
+        rec_index,
+        si=None,
+        skip_conversion=None,
+        typed=False,
+        categorical=False,
+        output="pandas",
+    ):
+        lres = self._json.rs_list(ds, key=key, seg=seg, link=link, recinfo=rec_index)
+        return self._parse_rs_list(
+            lres,
+            key=key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            si=si,
+            skip_conversion=skip_conversion,
+            typed=typed,
+            categorical=categorical,
+            output=output,
+        )
+
+    def iter_query(
+        self,
+        ds,
+        *,
+        key=None,
+        seg=None,
+        link=None,
+        convert_numeric=True,
+        skip_conversion=None,
+        typed=False,
+        categorical=False,
+        pkeys=False,
+        rec_index=False,
+        chunk_records=10000,
+        output="pandas",
+    ):
+        """
+        Query a record set in chunks, yielding the results chunk by chunk.
+
+        The record set is split into consecutive time ranges of about
+        ``chunk_records`` records each, like in `query`. While the caller
+        processes a chunk, the next chunk is fetched in the background,
+        so that at most two chunks are held in memory at any time. Empty
+        chunks are skipped. Record sets that cannot be split are fetched
+        in a single chunk.
+
+        Parameters
+        ----------
+        ds : str
+            Record set query.
+        key, seg, link, skip_conversion, typed, categorical, pkeys, rec_index, output
+            See `query`.
+        convert_numeric : bool
+            Convert keywords with numeric types from string to numbers.
+            The conversion is applied to each chunk separately, so
+            the dtype of a keyword can differ between chunks, e.g. if a
+            chunk contains only missing values. Default is True.
+        chunk_records : int
+            Approximate number of records per chunk. Default is 10000.
+
+        Yields
+        ------
+        result : pandas.DataFrame or tuple of pandas.DataFrame
+            Query results of a chunk, like the results of `query`. If
+            ``rec_index`` is False, the index of each chunk continues the
+            index of the previous one.
+        """
+        self._check_query(output)
+        if pkeys:
+            key = self._add_pkeys(key, self.pkeys(ds))
+
+        chunks = self._query_chunks(ds, chunk_records) or [ds]
+        si = self.info(ds) if (convert_numeric or typed) and key is not None else None
+        query_chunk = partial(
+            self._query_chunk,
+            key=key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            si=si,
+            skip_conversion=skip_conversion,
+            typed=typed,
+            categorical=categorical,
+            output=output,
+        )
+        offset = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(query_chunk, chunks[0])
+            for i in range(len(chunks)):
+                res = future.result()
+                if i + 1 < len(chunks):
+                    future = executor.submit(query_chunk, chunks[i + 1])
+                num_records = self._number_chunk(res, offset, rec_index=rec_index, output=output)
+                if num_records == 0 and len(chunks) > 1:
+                    continue
+                offset += num_records
+                yield res
+
+    def query_since(
+        self,
+        ds,
+        *,
+        key=None,
+        seg=None,
+        link=None,
+        state=None,
+        cursor="pkey",
+        convert_numeric=True,
+        skip_conversion=None,
+        typed=False,
+        categorical=False,
+        rec_index=False,
+        output="pandas",
+    ):
+        """
+        Query the records of a record set that are newer than the records
+        returned by a previous call.
+
+        This is meant for pipelines that poll a series, e.g. with a
+        trailing time window like ``hmi.m_720s[2024.01.01_12:00_TAI/1d]``.
+        The returned state contains the last record seen, either its
+        first prime key or its record number, and is passed to the next
+        call, which only returns newer records. If the first filter of the
+        record set is a time range and ``cursor`` is 'pkey', only the part
+        of the time range after the last record is requested. If
+        ``cursor`` is 'recnum', a ``[? recnum > N ?]`` filter is added to
+        the record set, which also finds reprocessed records. Other
+        record sets are requested completely and the records that were
+        already seen are removed from the result. Records with the same
+        time as the last record, e.g. of other wavelengths, are told apart
+        by their other prime keys, so they are returned exactly once.
+        Records with missing cursor values are not returned.
+
+        Parameters
+        ----------
+        ds : str
+            Record set query.
+        key, seg, link, convert_numeric, skip_conversion, typed, categorical, rec_index, output
+            See `query`.
+        state : dict or None
+            State returned by the previous call. If set to None (default),
+            all records of the record set are returned.
+        cursor : {'pkey', 'recnum'}
+            Use the first prime key, which must be a time keyword, or the
+            record number ('*recnum*') to find newer records. Default is
+            'pkey'.
+
+        Returns
+        -------
+        result : pandas.DataFrame or tuple of pandas.DataFrame
+            Query results of the new records, like the results of `query`.
+        state : dict
+            State of the query, which is passed to the next call. It only
+            contains strings, numbers and lists and can be serialized, e.g.
+            with `json.dumps`, to resume polling after a restart.
+        """
+        self._check_query(output)
+        si = self.info(ds)
+        recset, fetch_key, since = self._since_request(ds, si, key=key, state=state, cursor=cursor)
+        lres = self._json.rs_list(recset, key=fetch_key, seg=seg, link=link, recinfo=rec_index)
+        return self._since_result(
+            lres,
+            since,
+            key=key,
+            fetch_key=fetch_key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            si=si if (convert_numeric or typed) and key is not None else None,
+            skip_conversion=skip_conversion,
+            typed=typed,
+            categorical=categorical,
+            output=output,
+        )
+
+    def check_email(self, email):
+        """
+        Check if the email address is registered for data export.
+
+        You can register your email for data exports from JSOC on the
+        `JSOC email registration <http://jsoc.stanford.edu/ajax/register_email.html>`__
+        webpage.
+
+        Parameters
+        ----------
+        email : str
+            Email address to be checked.
+
+        Returns
+        -------
+        result : bool
+            True if the email address is valid and registered, False
+            otherwise.
+        """
+        if not self._server.check_supported("email"):
+            raise DrmsOperationNotSupported("Server does not support user emails")
+        res = self._json.check_address(email)
+        return self._parse_check_address(res)
+
+    def export(
+        self,
+        ds,
+        *,
+        method="url_quick",
+        protocol="as-is",
+        protocol_args=None,
+        filenamefmt=None,
+        n=None,
+        email=None,
+        requester=None,
+        process=None,
+    ):
+        """
+        Submit a data export request.
+
+        A registered email address is required for data exports. You
+        can register your email address for data exports from JSOC on
+        the `JSOC email registration
+        <http://jsoc.stanford.edu/ajax/register_email.html>`__
+        webpage.
+
+        An interactive webinterface and additional information is
+        available on the `JSOC data export
+        <http://jsoc.stanford.edu/ajax/exportdata.html>`__ webpage.
+
+        Note that export requests that were submitted using the
+        webinterface can be accessed using the :func:`export_from_id`
+        method.
+
+        Parameters
+        ----------
+        ds : str
+            Data export record set query.
+        method : str
+            Export method. Supported methods are: 'url_quick', 'url'
+            and 'url-tar'. Default is 'url_quick'.
+        protocol : str
+            Export protocol. Supported protocols are: 'as-is', 'fits',
+            'jpg', 'mpg' and 'mp4'. Default is 'as-is'.
+        protocol_args : dict
+            Extra protocol arguments for protocols 'jpg', 'mpg' and
+            'mp4'. Valid arguments are: 'ct', 'scaling', 'min', 'max'
+            and 'size'. See the JSOC data export webpage for more
+            details.
+        filenamefmt : str, None or bool
+            Custom filename format string for exported files. This is
+            ignored for 'url_quick'/'as-is' data exports. If set to
+            None (default), the format string will be generated using
+            the primekeys of the data series. If set to False, the
+            filename format string will be omitted in the export
+            request.
+        n : int or None
+            Limits the number of records requested. For positive
+            values, the first n records of the record set are returned,
+            for negative values the last abs(n) records. If set to None
+            (default), no limit is applied.
+        email : str or None
+            Registered email address. If email is None (default), the
+            current default email address is used, which in this case
+            has to be set before calling export() by using the
+            :attr:`Client.email` attribute.
+        process : `dict`, None
+            Dictionary of processing commands. Each entry is also a `dict`
+            containing all of the applicable options for that processing
+            command. Note that only the name of the process, and not the
+            arguments, are validated by the `~drms.client.Client`. In the case of invalid
+            or malformed processing arguments, JSOC may still return
+            an unprocessed image without the export request failing.
+        requester : str, None or bool
+            Export user ID. Default is None, in which case the user
+            name is determined from the email address. If set to False,
+            the requester argument will be omitted in the export
+            request.
+
+        Returns
+        -------
+        result : `ExportRequest`
+        """
+        if not self._server.check_supported("export"):
+            raise DrmsOperationNotSupported("Server does not support export requests")
+        if email is None:
+            if self._email is None:
+                raise ValueError("The email argument is required, when no default email address was set.")
+            email = self._email
+
+        if filenamefmt is None:
+            sname = _extract_series_name(ds)
+            filenamefmt = self._generate_filenamefmt(sname)
+        elif filenamefmt is False:
+            filenamefmt = None
+
+        if protocol.lower() in ["jpg", "mpg", "mp4"]:
+            self._validate_export_protocol_args(protocol_args)
+
+        mirror = self._json._export_mirror()
+        d = self._json.exp_request(
+            ds,
+            email,
+            method=method,
+            protocol=protocol,
+            protocol_args=protocol_args,
+            filenamefmt=filenamefmt,
+            n=n,
+            requester=requester,
+            process=process,
+            base_url=mirror[0],
+        )
+        return ExportRequest(d, client=self, mirror=mirror)
+
+    def export_from_id(self, requestid):
+        """
+        Create an `ExportRequest` instance from an existing requestid.
+
+        Parameters
         ----------
-        ds : str
-            Name of the data series.
+        requestid : str
+            Export request ID.
+
+        Returns
+        -------
+        result : `ExportRequest`
+        """
+        if not self._server.check_supported("export"):
+            raise DrmsOperationNotSupported("Server does not support export requests")
+        return ExportRequest._create_from_id(requestid, client=self)
+
+
+class AsyncExportRequest(ExportRequest):
+    """
+    Class for handling data export requests with asyncio.
+
+    This mirrors `ExportRequest`, but all methods that communicate with
+    the server are coroutines. Properties that depend on the final
+    export status, like `data`, `urls` or `dir`, can only be used after
+    the request has finished, e.g. after ``await request.wait()``
+    returned True.
+
+    Use :func:`AsyncClient.export` or :func:`AsyncClient.export_from_id`
+    to create an instance.
+    """
+
+    # Block size used when writing downloaded files.
+    _download_blocksize = 64 * 1024
+    # Serializes choosing the names of downloaded files in worker threads.
+    _rename_lock = threading.Lock()
+
+    @classmethod
+    async def _create_from_id(cls, requestid, client):
+        d = await client._json.exp_status(requestid)
+        return cls(d, client)
+
+    def __repr__(self):
+        idstr = str(None) if self._requestid is None else (f"{self._requestid}")
+        return f"<AsyncExportRequest: id={idstr}, status={int(self._status)}>"
+
+    async def _fetch_status(self):
+        if self._requestid is not None:
+            self._update_status(d=await self._client._json.exp_status(self._requestid, base_url=self._cgi_baseurl))
+
+    def _ensure_finished(self):
+        if self._status in self._status_codes_pending:
+            raise DrmsExportError("Export request has not finished yet, use 'await wait()' first.")
+        self._raise_on_error()
+
+    async def has_finished(self, *, skip_update=False):
+        """
+        Check if the export request has finished.
+
+        See `ExportRequest.has_finished`.
+        """
+        pending = self._status in self._status_codes_pending
+        if not pending:
+            return True
+        if not skip_update:
+            await self._fetch_status()
+            pending = self._status in self._status_codes_pending
+        return not pending
+
+    async def has_succeeded(self, *, skip_update=False):
+        """
+        Check if the export request has finished successfully.
+
+        See `ExportRequest.has_succeeded`.
+        """
+        if not await self.has_finished(skip_update=skip_update):
+            return False
+        return self._status == self._status_code_ok
+
+    async def has_failed(self, *, skip_update=False):
+        """
+        Check if the export request has finished unsuccessfully.
+
+        See `ExportRequest.has_failed`.
+        """
+        if not await self.has_finished(skip_update=skip_update):
+            return False
+        return self._status not in self._status_codes_ok_or_pending
+
+    async def wait(self, *, timeout=None, sleep=5, retries_notfound=5):
+        """
+        Wait for the server to process the export request.
+
+        Unlike `ExportRequest.wait`, this does not block the event loop
+        while waiting between status updates.
+
+        See `ExportRequest.wait` for a description of the parameters.
+        """
+        if timeout is not None:
+            t_start = time.time()
+            timeout = float(timeout)
+        if sleep is not None:
+            sleep = float(sleep)
+        retries_notfound = int(retries_notfound)
+
+        # We are done, if the request has already finished.
+        if await self.has_finished(skip_update=True):
+            self._raise_on_error()
+            return True
+
+        while True:
+            idstr = str(None) if self._requestid is None else (f"{self._requestid}")
+            logger.info(f"Export request pending. [id={idstr}, status={self._status}]")
+
+            # Use the user-provided sleep value or the server's wait value.
+            # In case neither is available, wait for 5 seconds.
+            wait_secs = self._d.get("wait", 5) if sleep is None else sleep
+
+            # Consider the time that passed since the last status update.
+            wait_secs -= time.time() - self._d_time
+            if wait_secs < 0:
+                wait_secs = 0
+
+            if timeout is not None:
+                # Return, if we would time out while sleeping.
+                if t_start + timeout + wait_secs - time.time() < 0:
+                    return False
+
+            logger.info(f"Waiting for {round(wait_secs)} seconds...")
+            await asyncio.sleep(wait_secs)
+
+            if await self.has_finished():
+                self._raise_on_error()
+                return True
+            if self._status == self._status_code_notfound:
+                # Raise exception, if no retries are left.
+                if retries_notfound <= 0:
+                    self._raise_on_error(notfound_ok=False)
+                logger.info(f"Request not found on server, {retries_notfound} retries left.")
+                retries_notfound -= 1
+
+    @classmethod
+    def _open_part_file(cls, fpath):
+        """
+        Create and open the temporary file of a download.
+
+        The file is created exclusively, so that concurrent downloads of
+        files with the same name do not clash. It is unbuffered, so that
+        closing it does not write to the disk.
+        """
+        fname = f"{cls._next_available_filename(fpath)}.part"
+        new_fname = fname
+        i = 1
+        while True:
+            try:
+                return open(new_fname, "xb", buffering=0)
+            except FileExistsError:  # NOQA: PERF203
+                new_fname = f"{fname}.{int(i)}"
+                i += 1
+
+    @classmethod
+    def _rename_part_file(cls, fpath_tmp, fpath):
+        """
+        Rename the temporary file of a finished download to the next
+        available filename.
+        """
+        with cls._rename_lock:
+            fpath_new = cls._next_available_filename(fpath)
+            Path(fpath_tmp).rename(fpath_new)
+        return fpath_new
+
+    @staticmethod
+    def _truncate(out_file):
+        out_file.seek(0)
+        out_file.truncate()
+
+    async def _download_file(self, di, filename, out_dir, timeout, semaphore):
+        fpath = Path(out_dir) / filename
+        async with semaphore:
+            # Files are written in worker threads, to not block the event loop.
+            out_file = await asyncio.to_thread(self._open_part_file, fpath)
+            fpath_tmp = out_file.name
+            logger.info(f"Downloading file {di.filename} [record: {di.record}]")
+
+            async def fetch():
+                # Start over, if a previous attempt failed halfway.
+                await asyncio.to_thread(self._truncate, out_file)
+                async with (
+                    self._client._json.limiter,
+                    await self._client._json._urlopen(di.url, timeout=timeout, failover=False) as response,
+                ):
+                    while block := await response.read(self._download_blocksize):
+                        await asyncio.to_thread(out_file.write, block)
+
+            try:
+                with out_file:
+                    await self._client._json.retry_policy.acall(fetch, di.url)
+            except (HTTPError, URLError, DrmsCircuitOpenError):
+                await asyncio.to_thread(Path(fpath_tmp).unlink, missing_ok=True)
+                logger.info(f"    -> Error: Could not download file {di.filename}")
+                return None
+            fpath_new = await asyncio.to_thread(self._rename_part_file, fpath_tmp, fpath)
+            logger.info(f"    -> {os.path.relpath(fpath_new)}")
+            return fpath_new
+
+    async def download(self, directory, *, index=None, fname_from_rec=None, timeout=60, max_concurrent=4):
+        """
+        Download data files concurrently.
+
+        See `ExportRequest.download` for a description of the parameters
+        and the result.
+
+        Parameters
+        ----------
+        max_concurrent : int
+            Maximum number of files that are downloaded at the same time.
+            Defaults to 4.
+        """
+        out_dir = await asyncio.to_thread(self._download_dir, directory)
+
+        # Wait until the export request has finished.
+        await self.wait()
+
+        data, fname_from_rec = self._download_selection(index, fname_from_rec)
+        filenames = []
+        for i in range(len(data)):
+            di = data.iloc[i]
+            filename = None
+            if fname_from_rec:
+                filename = await self._client._filename_from_export_record(di.record, old_fname=di.filename)
+            filenames.append(di.filename if filename is None else filename)
+
+        semaphore = asyncio.Semaphore(int(max_concurrent))
+        downloads = await asyncio.gather(
+            *[self._download_file(data.iloc[i], filenames[i], out_dir, timeout, semaphore) for i in range(len(data))],
+        )
+
+        res = data[["record", "url"]].copy()
+        res["download"] = list(downloads)
+        return res
+
+
+class AsyncClient(_ClientBase):
+    """
+    Client for remote DRMS server access with asyncio.
+
+    This provides the same methods as `Client`, but all methods that
+    communicate with the server are coroutines, so that a single event
+    loop can run many queries and exports concurrently.
+
+    Parameters
+    ----------
+    server : str or drms.config.ServerConfig
+        Registered server ID or ServerConfig instance.
+        Defaults to JSOC.
+    email : str or None
+        Default email address used data export requests. Unlike for
+        `Client`, the address is not verified until it is first used for
+        an export request.
+    pool_size : int
+        Maximum number of idle keep-alive connections kept open per
+        host. Defaults to 10.
+    idle_timeout : float
+        Number of seconds after which idle keep-alive connections are
+        closed instead of being reused. Defaults to 60 seconds.
+    retry_policy : `~drms.retry.RetryPolicy` or None
+        Policy used to retry failed requests and downloads. If set to
+        None (default), a `~drms.retry.RetryPolicy` with default settings
+        is used.
+    cache : `~drms.json.ResponseCache` or None
+        Persistent cache for series lists and series information, which
+        is shared between processes. If set to None (default), no
+        persistent cache is used.
+    metrics_hook : callable or None
+        Function that is called with a `~drms.metrics.RequestMetrics`
+        instance for every HTTP request and file download.
+    query_cache : `~drms.cache.QueryCache` or None
+        Cache for the results of `query`. See `Client`.
+    coverage_cache : `~drms.cache.CoverageCache` or None
+        Cache for the records of time range queries. See `Client`.
+    """
+
+    def __init__(
+        self,
+        server="jsoc",
+        *,
+        email=None,
+        pool_size=10,
+        idle_timeout=60,
+        retry_policy=None,
+        cache=None,
+        metrics_hook=None,
+        query_cache=None,
+        coverage_cache=None,
+    ):
+        self._json = AsyncHttpJsonClient(
+            server,
+            pool_size=pool_size,
+            idle_timeout=idle_timeout,
+            retry_policy=retry_policy,
+            cache=cache,
+            metrics_hook=metrics_hook,
+        )
+        self._info_cache = {}
+        self._query_cache = query_cache
+        self._coverage_cache = coverage_cache
+        self.email = email
+
+    def __repr__(self):
+        return f"<AsyncClient: {self._server.name}>"
+
+    @property
+    def email(self):
+        """
+        (string) Default email address used for data export requests.
+        """
+        return self._email
+
+    @email.setter
+    def email(self, value):
+        self._email = value
+        self._email_verified = value is None
+
+    async def probe_mirrors(self, *, timeout=10):
+        """
+        Measure the latency of all mirrors configured for the server.
+
+        See `Client.probe_mirrors`.
+        """
+        await self._json.probe_mirrors(timeout=timeout)
+
+    async def _generate_filenamefmt(self, sname):
+        """
+        Generate filename format string for export requests.
+        """
+        try:
+            si = await self.info(sname)
+        except Exception as e:  # NOQA: BLE001
+            # Cannot generate filename format for unknown series.
+            logger.warning(f"Cannot generate filename format for unknown series '{sname}' with {e}")
+            return None
+        return self._filenamefmt_from_info(si)
+
+    async def _filename_from_export_record(self, rs, *, old_fname=None):
+        """
+        Generate a filename from an export request record.
+        """
+        sname, pkeys, segs = self._parse_export_recset(rs)
+        if sname is None:
+            return None
+        try:
+            si = await self.info(sname)
+        except Exception as e:  # NOQA: BLE001
+            # Cannot generate filename for unknown series.
+            logger.warning(f"Cannot generate filename format for unknown series '{sname}' with {e}")
+            return None
+        return self._filename_from_info(si, pkeys, segs, old_fname=old_fname)
 
-        Returns
-        -------
-        result : list
-            List of primekeys available for the selected series.
+    async def series(self, regex=None, *, full=False):
         """
-        si = self.info(ds)
+        List available data series.
+
+        See `Client.series`.
+        """
+        if not self._server.check_supported("series"):
+            raise DrmsOperationNotSupported("Server does not support series list access")
+        if self._server.url_show_series_wrapper is None:
+            d = await self._json.show_series(ds_filter=regex)
+            return self._parse_series(d, full=full)
+        d = await self._json.show_series_wrapper(ds_filter=regex, info=full)
+        return self._parse_series_wrapper(d, full=full)
+
+    async def info(self, ds):
+        """
+        Get information about the content of a data series.
+
+        See `Client.info`.
+        """
+        if not self._server.check_supported("info"):
+            raise DrmsOperationNotSupported("Server does not support series info access")
+        name = self._info_name(ds)
+        if name in self._info_cache:
+            return self._info_cache[name]
+        d = await self._json.series_struct(name)
+        return self._add_series_info(d, name)
+
+    async def keys(self, ds):
+        """
+        Get a list of keywords that are available for a series.
+
+        See `Client.keys`.
+        """
+        si = await self.info(ds)
+        return list(si.keywords.index)
+
+    async def pkeys(self, ds):
+        """
+        Get a list of primekeys that are available for a series.
+
+        See `Client.pkeys`.
+        """
+        si = await self.info(ds)
         return list(si.primekeys)
 
-    def query(
+    async def query(
         self,
         ds,
         *,
@@ -953,140 +2785,309 @@ class Client:
         link=None,
         convert_numeric=True,
         skip_conversion=None,
+        typed=False,
+        categorical=False,
         pkeys=False,
         rec_index=False,
         n=None,
+        chunk_records=None,
+        max_workers=4,
+        output="pandas",
     ):
         """
-        Query keywords, segments and/or links of a record set. At least one of
-        the parameters key, seg, link or pkeys needs to be specified.
-
-        Parameters
-        ----------
-        ds : str
-            Record set query.
-        key : str, List[str] or None
-            List of requested keywords, optional. If set to None
-            (default), no keyword results will be returned, except
-            when pkeys is True.
-        seg : str, List[str] or None
-            List of requested segments, optional. If set to None
-            (default), no segment results will be returned.
-        link : str, List[str] or None
-            List of requested Links, optional. If set to None
-            (default), no link results will be returned.
-        convert_numeric : bool
-            Convert keywords with numeric types from string to
-            numbers. This may result in NaNs for invalid/missing
-            values. Default is True.
-        skip_conversion : List[str] or None
-            List of keywords names to be skipped when performing a
-            numeric conversion. Default is None.
-        pkeys : bool
-            If True, all primekeys of the series are added to the
-            ``key`` parameter.
-        rec_index : bool
-            If True, record names are used as index for the resulting
-            DataFrames.
-        n : int or None
-            Limits the number of records returned by the query. For
-            positive
-            values, the first n records of the record set are
-            returned, for negative values the last abs(n) records. If
-            set to None (default), no limit is applied.
+        Query keywords, segments and/or links of a record set.
 
-        Returns
-        -------
-        res_key : pandas.DataFrame, optional
-            Keyword query results. This DataFrame is only returned,
-            if key is not None or pkeys is set to True.
-        res_seg : pandas.DataFrame, optional
-            Segment query results. This DataFrame is only returned,
-            if seg is not None.
-        res_link : pandas.DataFrame, optional
-            Link query results. This DataFrame is only returned,
-            if link is not None.
+        The results are created and the query cache is accessed in a
+        worker thread, so that large results do not block the event loop.
+        See `Client.query`.
         """
-        if not self._server.check_supported("query"):
-            raise DrmsOperationNotSupported("Server does not support DRMS queries")
+        self._check_query(output)
+        cache_key, res = await asyncio.to_thread(
+            self._cached_query,
+            ds,
+            key=key,
+            seg=seg,
+            link=link,
+            convert_numeric=convert_numeric,
+            skip_conversion=skip_conversion,
+            typed=typed,
+            categorical=categorical,
+            pkeys=pkeys,
+            rec_index=rec_index,
+            n=n,
+            output=output,
+        )
+        if res is not None:
+            return _reorder_result(res, [key, seg, link])
         if pkeys:
-            pk = self.pkeys(ds)
-            key = _split_arg(key) if key is not None else []
-            key = [k for k in key if k not in pk]
-            key = pk + key
+            key = self._add_pkeys(key, await self.pkeys(ds))
+
+        time_range = self._coverage_time_range(ds, n=n, output=output)
+        pkey = self._chunk_prime_key(await self.info(ds)) if time_range is not None else None
+        chunks = None
+        if pkey is None and chunk_records is not None and n is None:
+            chunks = await self._query_chunks(ds, chunk_records)
+        if pkey is not None:
+            res = await self._coverage_query(
+                time_range,
+                pkey,
+                key=key,
+                seg=seg,
+                link=link,
+                convert_numeric=convert_numeric,
+                skip_conversion=skip_conversion,
+                typed=typed,
+                categorical=categorical,
+                rec_index=rec_index,
+                chunk_records=chunk_records,
+                max_workers=max_workers,
+            )
+        elif chunks is not None:
+            si = await self.info(ds) if (convert_numeric or typed) and key is not None else None
+            chunk_args, concat_args = self._chunk_args(
+                si,
+                key=key,
+                seg=seg,
+                link=link,
+                rec_index=rec_index,
+                skip_conversion=skip_conversion,
+                typed=typed,
+                categorical=categorical,
+                output=output,
+            )
+            semaphore = asyncio.Semaphore(int(max_workers))
+            results = await asyncio.gather(
+                *(self._query_chunk(chunk, semaphore=semaphore, **chunk_args) for chunk in chunks)
+            )
+            res = await asyncio.to_thread(self._concat_query_results, results, **concat_args)
+        else:
+            lres = await self._json.rs_list(ds, key=key, seg=seg, link=link, recinfo=rec_index, n=n)
+            si = await self.info(ds) if (convert_numeric or typed) and key is not None else None
+            res = await asyncio.to_thread(
+                self._parse_rs_list,
+                lres,
+                key=key,
+                seg=seg,
+                link=link,
+                rec_index=rec_index,
+                si=si,
+                skip_conversion=skip_conversion,
+                typed=typed,
+                categorical=categorical,
+                output=output,
+            )
+        if cache_key is not None:
+            await asyncio.to_thread(self._query_cache.put, cache_key, res)
+        return res
 
-        lres = self._json.rs_list(ds, key=key, seg=seg, link=link, recinfo=rec_index, n=n)
-        status = lres.get("status")
-        if status != 0:
-            self._raise_query_error(lres)
+    async def _coverage_query(
+        self,
+        time_range,
+        pkey,
+        *,
+        key,
+        seg,
+        link,
+        convert_numeric,
+        skip_conversion,
+        typed,
+        categorical,
+        rec_index,
+        chunk_records,
+        max_workers,
+    ):
+        """
+        Query a time range with the `~drms.cache.CoverageCache`, see
+        `Client._coverage_query`.
+        """
+        series, start, end, _, _ = time_range
+        si = await self.info(series)
+        fetch_key, cache_key, gaps = self._coverage_gaps(
+            time_range,
+            pkey,
+            key=key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            typed=typed,
+            skip_conversion=skip_conversion,
+        )
+        recsets = [self._coverage_recset(time_range, gap) for gap in gaps]
+        if chunk_records is not None:
+            chunks = await asyncio.gather(*(self._query_chunks(ds, chunk_records) for ds in recsets))
+            recsets = [chunk for ds, ds_chunks in zip(recsets, chunks, strict=True) for chunk in ds_chunks or [ds]]
+        query_chunk = partial(
+            self._query_chunk,
+            key=fetch_key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            si=si if typed else None,
+            skip_conversion=skip_conversion,
+            typed=typed,
+            semaphore=asyncio.Semaphore(int(max_workers)),
+        )
+        results = await asyncio.gather(*(query_chunk(chunk) for chunk in recsets))
+        frames = await asyncio.to_thread(
+            self._coverage_add, self._coverage_cache, cache_key, time_range, gaps, pkey, results
+        )
+        if frames is None:
+            # The cached records have expired or were removed in the meantime,
+            # or cannot be combined with the fetched records.
+            frames = await query_chunk(self._coverage_recset(time_range, (start, end)))
+        return await asyncio.to_thread(
+            self._coverage_result,
+            frames,
+            key=key,
+            seg=seg,
+            link=link,
+            si=si if convert_numeric and not typed else None,
+            skip_conversion=skip_conversion,
+            categorical=categorical,
+            rec_index=rec_index,
+        )
 
-        res = []
-        if key is not None:
-            if "keywords" in lres:
-                names = [it["name"] for it in lres["keywords"]]
-                values = [it["values"] for it in lres["keywords"]]
-                res_key = pd.DataFrame.from_dict(OrderedDict(zip(names, values, strict=False)))
-            else:
-                res_key = pd.DataFrame()
-            if convert_numeric:
-                self._convert_numeric_keywords(ds, res_key, skip_conversion=skip_conversion)
-            res.append(res_key)
+    async def _query_chunks(self, ds, chunk_records):
+        """
+        Split a record set into time chunks for `query`, see
+        `Client._query_chunks`.
+        """
+        if self._chunk_parts(ds) is None:
+            return None
+        pkey = self._chunk_prime_key(await self.info(ds))
+        if pkey is None:
+            return None
+        count = (await self._json.rs_summary(ds)).get("count")
+        if count is None or count <= chunk_records:
+            return None
+        first, last = await asyncio.gather(
+            self._json.rs_list(ds, key=pkey, n=1),
+            self._json.rs_list(ds, key=pkey, n=-1),
+        )
+        return self._time_chunks(ds, count, first, last, chunk_records)
 
-        if seg is not None:
-            if "segments" in lres:
-                names = [it["name"] for it in lres["segments"]]
-                values = [it["values"] for it in lres["segments"]]
-                res_seg = pd.DataFrame.from_dict(OrderedDict(zip(names, values, strict=False)))
-            else:
-                res_seg = pd.DataFrame()
-            res.append(res_seg)
+    async def _query_chunk(self, ds, *, key, seg, link, rec_index, semaphore=None, **kwargs):
+        """
+        Query a chunk of a record set, see `Client._query_chunk`.
 
-        if link is not None:
-            if "links" in lres:
-                names = [it["name"] for it in lres["links"]]
-                values = [it["values"] for it in lres["links"]]
-                res_link = pd.DataFrame.from_dict(OrderedDict(zip(names, values, strict=False)))
-            else:
-                res_link = pd.DataFrame()
-            res.append(res_link)
+        The request waits for ``semaphore``, if given, and the result is
+        created in a worker thread.
+        """
+        async with semaphore or contextlib.nullcontext():
+            lres = await self._json.rs_list(ds, key=key, seg=seg, link=link, recinfo=rec_index)
+        return await asyncio.to_thread(
+            self._parse_rs_list, lres, key=key, seg=seg, link=link, rec_index=rec_index, **kwargs
+        )
 
-        if rec_index:
-            index = [it["name"] for it in lres["recinfo"]]
-            for r in res:
-                r.index = index
+    async def iter_query(
+        self,
+        ds,
+        *,
+        key=None,
+        seg=None,
+        link=None,
+        convert_numeric=True,
+        skip_conversion=None,
+        typed=False,
+        categorical=False,
+        pkeys=False,
+        rec_index=False,
+        chunk_records=10000,
+        output="pandas",
+    ):
+        """
+        Query a record set in chunks, yielding the results chunk by chunk.
 
-        if len(res) == 0:
-            return None
-        if len(res) == 1:
-            return res[0]
-        return tuple(res)
+        This is an asynchronous generator, use it with ``async for``. See
+        `Client.iter_query`.
+        """
+        self._check_query(output)
+        if pkeys:
+            key = self._add_pkeys(key, await self.pkeys(ds))
+
+        chunks = await self._query_chunks(ds, chunk_records) or [ds]
+        si = await self.info(ds) if (convert_numeric or typed) and key is not None else None
+        query_chunk = partial(
+            self._query_chunk,
+            key=key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            si=si,
+            skip_conversion=skip_conversion,
+            typed=typed,
+            categorical=categorical,
+            output=output,
+        )
+        offset = 0
+        task = asyncio.ensure_future(query_chunk(chunks[0]))
+        try:
+            for i in range(len(chunks)):
+                res = await task
+                if i + 1 < len(chunks):
+                    task = asyncio.ensure_future(query_chunk(chunks[i + 1]))
+                num_records = self._number_chunk(res, offset, rec_index=rec_index, output=output)
+                if num_records == 0 and len(chunks) > 1:
+                    continue
+                offset += num_records
+                yield res
+        finally:
+            task.cancel()
+
+    async def query_since(
+        self,
+        ds,
+        *,
+        key=None,
+        seg=None,
+        link=None,
+        state=None,
+        cursor="pkey",
+        convert_numeric=True,
+        skip_conversion=None,
+        typed=False,
+        categorical=False,
+        rec_index=False,
+        output="pandas",
+    ):
+        """
+        Query the records of a record set that are newer than the records
+        returned by a previous call.
+
+        See `Client.query_since`.
+        """
+        self._check_query(output)
+        si = await self.info(ds)
+        recset, fetch_key, since = self._since_request(ds, si, key=key, state=state, cursor=cursor)
+        lres = await self._json.rs_list(recset, key=fetch_key, seg=seg, link=link, recinfo=rec_index)
+        return await asyncio.to_thread(
+            self._since_result,
+            lres,
+            since,
+            key=key,
+            fetch_key=fetch_key,
+            seg=seg,
+            link=link,
+            rec_index=rec_index,
+            si=si if (convert_numeric or typed) and key is not None else None,
+            skip_conversion=skip_conversion,
+            typed=typed,
+            categorical=categorical,
+            output=output,
+        )
 
-    def check_email(self, email):
+    async def check_email(self, email):
         """
         Check if the email address is registered for data export.
 
-        You can register your email for data exports from JSOC on the
-        `JSOC email registration <http://jsoc.stanford.edu/ajax/register_email.html>`__
-        webpage.
-
-        Parameters
-        ----------
-        email : str
-            Email address to be checked.
-
-        Returns
-        -------
-        result : bool
-            True if the email address is valid and registered, False
-            otherwise.
+        See `Client.check_email`.
         """
         if not self._server.check_supported("email"):
             raise DrmsOperationNotSupported("Server does not support user emails")
-        res = self._json.check_address(email)
-        status = res.get("status")
-        return status is not None and int(status) == 2
+        res = await self._json.check_address(email)
+        return self._parse_check_address(res)
 
-    def export(
+    async def export(
         self,
         ds,
         *,
@@ -1102,86 +3103,34 @@ class Client:
         """
         Submit a data export request.
 
-        A registered email address is required for data exports. You
-        can register your email address for data exports from JSOC on
-        the `JSOC email registration
-        <http://jsoc.stanford.edu/ajax/register_email.html>`__
-        webpage.
-
-        An interactive webinterface and additional information is
-        available on the `JSOC data export
-        <http://jsoc.stanford.edu/ajax/exportdata.html>`__ webpage.
-
-        Note that export requests that were submitted using the
-        webinterface can be accessed using the :func:`export_from_id`
-        method.
-
-        Parameters
-        ----------
-        ds : str
-            Data export record set query.
-        method : str
-            Export method. Supported methods are: 'url_quick', 'url'
-            and 'url-tar'. Default is 'url_quick'.
-        protocol : str
-            Export protocol. Supported protocols are: 'as-is', 'fits',
-            'jpg', 'mpg' and 'mp4'. Default is 'as-is'.
-        protocol_args : dict
-            Extra protocol arguments for protocols 'jpg', 'mpg' and
-            'mp4'. Valid arguments are: 'ct', 'scaling', 'min', 'max'
-            and 'size'. See the JSOC data export webpage for more
-            details.
-        filenamefmt : str, None or bool
-            Custom filename format string for exported files. This is
-            ignored for 'url_quick'/'as-is' data exports. If set to
-            None (default), the format string will be generated using
-            the primekeys of the data series. If set to False, the
-            filename format string will be omitted in the export
-            request.
-        n : int or None
-            Limits the number of records requested. For positive
-            values, the first n records of the record set are returned,
-            for negative values the last abs(n) records. If set to None
-            (default), no limit is applied.
-        email : str or None
-            Registered email address. If email is None (default), the
-            current default email address is used, which in this case
-            has to be set before calling export() by using the
-            :attr:`Client.email` attribute.
-        process : `dict`, None
-            Dictionary of processing commands. Each entry is also a `dict`
-            containing all of the applicable options for that processing
-            command. Note that only the name of the process, and not the
-            arguments, are validated by the `~drms.client.Client`. In the case of invalid
-            or malformed processing arguments, JSOC may still return
-            an unprocessed image without the export request failing.
-        requester : str, None or bool
-            Export user ID. Default is None, in which case the user
-            name is determined from the email address. If set to False,
-            the requester argument will be omitted in the export
-            request.
+        See `Client.export`.
 
         Returns
         -------
-        result : `ExportRequest`
+        result : `AsyncExportRequest`
         """
         if not self._server.check_supported("export"):
             raise DrmsOperationNotSupported("Server does not support export requests")
         if email is None:
             if self._email is None:
                 raise ValueError("The email argument is required, when no default email address was set.")
+            if not self._email_verified:
+                if not await self.check_email(self._email):
+                    raise ValueError("Email address is invalid or not registered")
+                self._email_verified = True
             email = self._email
 
         if filenamefmt is None:
             sname = _extract_series_name(ds)
-            filenamefmt = self._generate_filenamefmt(sname)
+            filenamefmt = await self._generate_filenamefmt(sname)
         elif filenamefmt is False:
             filenamefmt = None
 
         if protocol.lower() in ["jpg", "mpg", "mp4"]:
             self._validate_export_protocol_args(protocol_args)
 
-        d = self._json.exp_request(
+        mirror = self._json._export_mirror()
+        d = await self._json.exp_request(
             ds,
             email,
             method=method,
@@ -1191,22 +3140,16 @@ class Client:
             n=n,
             requester=requester,
             process=process,
+            base_url=mirror[0],
         )
-        return ExportRequest(d, client=self)
+        return AsyncExportRequest(d, client=self, mirror=mirror)
 
-    def export_from_id(self, requestid):
+    async def export_from_id(self, requestid):
         """
-        Create an `ExportRequest` instance from an existing requestid.
-
-        Parameters
-        ----------
-        requestid : str
-            Export request ID.
+        Create an `AsyncExportRequest` instance from an existing requestid.
 
-        Returns
-        -------
-        result : `ExportRequest`
+        See `Client.export_from_id`.
         """
         if not self._server.check_supported("export"):
             raise DrmsOperationNotSupported("Server does not support export requests")
-        return ExportRequest._create_from_id(requestid, client=self)
+        return await AsyncExportRequest._create_from_id(requestid, client=self)
@@ -1,5 +1,10 @@
+import weakref
+import threading
 from urllib.parse import urljoin
 
+from .mirrors import MirrorSelector
+from .ratelimit import RateLimiter
+
 __all__ = ["ServerConfig", "register_server"]
 
 
@@ -27,6 +32,34 @@ class ServerConfig:
         url_show_series_wrapper
         encoding
         http_download_baseurl
+        json_decoder
+        rate_limit
+        rate_burst
+        max_in_flight
+        max_url_length
+        cgi_mirrors
+        http_download_mirrors
+
+    The optional ``json_decoder`` entry selects the JSON decoder backend
+    used for this server (see `drms.json.set_json_decoder`).
+
+    The optional numeric entries ``rate_limit`` (requests per second),
+    ``rate_burst`` and ``max_in_flight`` (concurrent requests) configure
+    the `~drms.ratelimit.RateLimiter` of the server, which is shared by
+    all clients, threads and asyncio tasks using this configuration.
+
+    Requests whose URL is longer than the optional ``max_url_length``
+    entry (default 8000 characters) are sent as form-encoded POST
+    requests (see `drms.json.HttpJsonClient`).
+
+    Several mirrors of a server can be configured by passing a list of
+    base URLs as ``cgi_baseurl`` or ``http_download_baseurl`` (or as
+    ``cgi_mirrors`` and ``http_download_mirrors``). The first base URL is
+    used to build the request URLs, which clients then route to the
+    fastest healthy mirror, failing over to the other mirrors if a
+    request fails (see `mirror_selector`). Exports are pinned to the
+    mirror that accepted the export request; their files are downloaded
+    from the download mirror at the same position in the list.
 
     Parameters
     ----------
@@ -53,7 +86,17 @@ class ServerConfig:
         "url_show_series_wrapper",
         "encoding",
         "http_download_baseurl",
+        "json_decoder",
+        "rate_limit",
+        "rate_burst",
+        "max_in_flight",
+        "max_url_length",
+        "cgi_mirrors",
+        "http_download_mirrors",
     )
+    _limit_keys = ("rate_limit", "rate_burst", "max_in_flight")
+    _numeric_keys = (*_limit_keys, "max_url_length")
+    _mirror_keys = {"cgi_mirrors": "cgi_baseurl", "http_download_mirrors": "http_download_baseurl"}
 
     def __init__(self, config=None, **kwargs):
         self._d = d = config.copy() if config is not None else {}
@@ -66,6 +109,15 @@ class ServerConfig:
         if "name" not in d:
             raise ValueError('Server config entry "name" is missing')
 
+        # A list of base URLs configures mirrors, the first one is the
+        # primary base URL.
+        for mirror_key, base_key in self._mirror_keys.items():
+            if isinstance(d.get(base_key), (list, tuple)):
+                d[mirror_key] = d[base_key]
+            if d.get(mirror_key) is not None:
+                d[mirror_key] = self._check_mirrors(mirror_key, d[mirror_key])
+                d[base_key] = d[mirror_key][0]
+
         # encoding defaults to latin1
         if "encoding" not in d:
             d["encoding"] = "latin1"
@@ -74,7 +126,9 @@ class ServerConfig:
         # the specific URL entry is not already set.
         if "cgi_baseurl" in d:
             cgi_baseurl = d["cgi_baseurl"]
-            cgi_keys = [k for k in self._valid_keys if k.startswith("cgi") and k != "cgi_baseurl"]
+            cgi_keys = [
+                k for k in self._valid_keys if k.startswith("cgi") and k != "cgi_baseurl" and k not in self._mirror_keys
+            ]
             for k in cgi_keys:
                 url_key = f"url{k[3:]}"
                 cgi_value = d.get(k)
@@ -93,13 +147,84 @@ class ServerConfig:
         return object.__getattribute__(self, name)
 
     def __setattr__(self, name, value):
-        if name in self._valid_keys:
+        if name in self._numeric_keys:
+            if value is not None and not isinstance(value, (int, float)):
+                raise ValueError(f"{name} config value must be a number or None")
+            self._d[name] = value
+            limiter = _limiters.get(self)
+            if limiter is not None and name in self._limit_keys:
+                limiter.configure(**self._limiter_args())
+        elif name in self._mirror_keys:
+            self._d[name] = self._check_mirrors(name, value)
+            _selectors.get(self, {}).pop(name, None)
+        elif name in self._valid_keys:
             if not isinstance(value, str):
                 raise ValueError(f"{name} config value must be a string")
             self._d[name] = value
         else:
             object.__setattr__(self, name, value)
 
+    @staticmethod
+    def _check_mirrors(name, value):
+        if isinstance(value, str) or not all(isinstance(v, str) for v in value) or not value:
+            raise ValueError(f"{name} config value must be a non-empty list of strings")
+        return list(value)
+
+    def _limiter_args(self):
+        d = self._d
+        return {"rate": d.get("rate_limit"), "burst": d.get("rate_burst"), "max_in_flight": d.get("max_in_flight")}
+
+    @property
+    def limiter(self):
+        """
+        (`~drms.ratelimit.RateLimiter`) Rate limiter for requests to this
+        server.
+
+        Copies of this configuration get their own limiter.
+        """
+        with _limiters_lock:
+            limiter = _limiters.get(self)
+            if limiter is None:
+                limiter = _limiters[self] = RateLimiter(**self._limiter_args())
+        return limiter
+
+    def mirror_selector(self, role):
+        """
+        Get the `~drms.mirrors.MirrorSelector` for the mirrors of a role.
+
+        Selectors are created on first use and shared by all clients
+        using this configuration.
+
+        Parameters
+        ----------
+        role : {'cgi', 'http_download'}
+            'cgi' for the DRMS CGIs, 'http_download' for export file
+            downloads.
+
+        Returns
+        -------
+        `~drms.mirrors.MirrorSelector` or None
+            None, if less than two mirrors are configured for the role.
+        """
+        key = f"{role}_mirrors"
+        if key not in self._mirror_keys:
+            raise ValueError(f"Invalid mirror role: {role!r}")
+        mirrors = self._d.get(key)
+        if mirrors is None or len(mirrors) < 2:
+            return None
+        with _limiters_lock:
+            selectors = _selectors.setdefault(self, {})
+            selector = selectors.get(key)
+            if selector is None:
+                selector = selectors[key] = MirrorSelector(mirrors)
+        return selector
+
+    def mirror_selectors(self):
+        """
+        List the mirror selectors of all roles with several mirrors.
+        """
+        return [s for s in (self.mirror_selector("cgi"), self.mirror_selector("http_download")) if s is not None]
+
     def copy(self):
         return ServerConfig(self._d)
 
@@ -137,6 +262,13 @@ def register_server(config):
 # Registered servers
 _server_configs = {}
 
+# Rate limiters of server configs, created on first use
+_limiters = weakref.WeakKeyDictionary()
+_limiters_lock = threading.Lock()
+
+# Mirror selectors of server configs, created on first use
+_selectors = weakref.WeakKeyDictionary()
+
 # Register public JSOC DRMS server.
 register_server(
     ServerConfig(
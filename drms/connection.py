@@ -0,0 +1,668 @@
+import io
+import ssl
+import time
+import socket
+import asyncio
+import threading
+import http.client
+from collections import deque
+from urllib.error import URLError, HTTPError
+from urllib.parse import urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass, urlopen
+
+from drms import logger
+from .utils import create_request_with_header
+
+__all__ = ["AsyncPoolManager", "ConnectionPool", "PoolManager"]
+
+# HTTP status codes that are followed as redirects, like urllib does.
+_redirect_codes = (301, 302, 303, 307, 308)
+
+
+class PooledResponse:
+    """
+    File-like HTTP response that hands its connection back to the pool.
+
+    The underlying connection is returned to its `ConnectionPool` as soon as
+    the response body has been read completely. Responses that are closed
+    before being fully read close their connection instead, because it
+    cannot be reused for another request.
+
+    Use `PoolManager.urlopen` to create an instance.
+    """
+
+    def __init__(self, response, url, conn, pool, timings=None):
+        self._response = response
+        self._conn = conn
+        self._pool = pool
+        # Connection timings, see `ConnectionPool.request`.
+        self.timings = timings
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def __repr__(self):
+        return f"<PooledResponse: {self.status} {self.url}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _release(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self._response.will_close:
+            conn.close()
+        else:
+            self._pool._put_conn(conn)
+
+    def getcode(self):
+        return self.status
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        data = self._response.read(amt)
+        if self._response.isclosed():
+            self._release()
+        return data
+
+    def close(self):
+        if self._conn is None:
+            return
+        if self._response.isclosed():
+            self._release()
+        else:
+            # The body was not consumed, so the connection is in an
+            # undefined state and must not be reused.
+            conn, self._conn = self._conn, None
+            self._response.close()
+            conn.close()
+
+
+class ConnectionPool:
+    """
+    Pool of persistent (keep-alive) HTTP connections to a single host.
+
+    Use `PoolManager` to create an instance.
+
+    Parameters
+    ----------
+    scheme : str
+        URL scheme, either 'http' or 'https'.
+    host : str
+        Host name.
+    port : int or None
+        Port number. If set to None (default), the default port for the
+        scheme is used.
+    maxsize : int
+        Maximum number of idle connections that are kept open.
+    idle_timeout : float
+        Idle connections that have not been used for this many seconds
+        are closed instead of being reused.
+    """
+
+    def __init__(self, scheme, host, port=None, *, maxsize=10, idle_timeout=60):
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {scheme}")
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = int(maxsize)
+        self.idle_timeout = float(idle_timeout)
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<ConnectionPool: {self.scheme}://{self.host}{'' if self.port is None else f':{self.port}'}>"
+
+    @property
+    def num_idle(self):
+        """
+        (int) Number of idle connections currently held by the pool.
+        """
+        return len(self._idle)
+
+    def _new_conn(self, timeout):
+        conn_cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return conn_cls(self.host, self.port, timeout=timeout)
+
+    @staticmethod
+    def _connect(conn):
+        """
+        Connect a new connection, measuring the DNS lookup and connect
+        (including TLS handshake) durations.
+        """
+        timings = {"reused": False, "dns": 0.0}
+
+        def create_connection(address, *args, **kwargs):
+            host, port = address
+            t_start = time.perf_counter()
+            addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            timings["dns"] = time.perf_counter() - t_start
+            error = None
+            for *_, sockaddr in addresses:
+                try:
+                    return socket.create_connection(sockaddr[:2], *args, **kwargs)
+                except OSError as e:  # NOQA: PERF203
+                    error = e
+            raise error
+
+        conn._create_connection = create_connection
+        t_start = time.perf_counter()
+        conn.connect()
+        timings["connect"] = time.perf_counter() - t_start - timings["dns"]
+        return timings
+
+    def _get_conn(self, timeout):
+        """
+        Return an idle connection or open a new one.
+
+        The second return value is True, if the connection is reused.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                # Most recently used connections first, they are the least
+                # likely to have been dropped by the server.
+                conn, last_used = self._idle.pop()
+                if now - last_used < self.idle_timeout:
+                    conn.timeout = timeout
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+                    return conn, True
+                conn.close()
+        return self._new_conn(timeout), False
+
+    def _put_conn(self, conn):
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def clear(self):
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+
+    def request(self, method, url, *, headers=None, body=None, timeout=60):
+        """
+        Send a request using a pooled connection.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        url : str
+            Full URL; scheme and host have to match the pool.
+        headers : dict or None
+            Request headers.
+        body : bytes or None
+            Request body.
+        timeout : float
+            Socket timeout in seconds.
+
+        Returns
+        -------
+        result : `PooledResponse`
+            The response. Its ``timings`` attribute is a dictionary that
+            contains whether the connection was ``reused`` and, for new
+            connections, the ``dns`` and ``connect`` durations in seconds.
+        """
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        headers = headers or {}
+
+        conn, reused = self._get_conn(timeout)
+        timings = {"reused": True}
+        try:
+            if not reused:
+                timings = self._connect(conn)
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError) as e:
+            conn.close()
+            if not reused:
+                raise URLError(e) from e
+            # The server dropped the idle keep-alive connection; try again
+            # once with a new connection.
+            logger.debug(f"Stale connection to {self.host}, reconnecting")
+            conn = self._new_conn(timeout)
+            try:
+                timings = self._connect(conn)
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+            except OSError as e2:
+                conn.close()
+                raise URLError(e2) from e2
+        except OSError as e:
+            conn.close()
+            raise URLError(e) from e
+        return PooledResponse(response, url, conn, self, timings)
+
+
+class PoolManager:
+    """
+    Keep-alive connection pools for all hosts used by a client.
+
+    One `ConnectionPool` is created for each scheme, host and port
+    combination, so that the DRMS CGIs and the export download server of
+    a ``ServerConfig`` each get their own set of reusable connections.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of idle connections kept open per host.
+        Defaults to 10.
+    idle_timeout : float
+        Idle connections that have not been used for this many seconds
+        are closed instead of being reused. Defaults to 60 seconds.
+    max_redirects : int
+        Maximum number of HTTP redirects that are followed.
+    """
+
+    def __init__(self, *, maxsize=10, idle_timeout=60, max_redirects=5):
+        self.maxsize = int(maxsize)
+        self.idle_timeout = float(idle_timeout)
+        self.max_redirects = int(max_redirects)
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<PoolManager: {len(self._pools)} pools>"
+
+    def connection_pool(self, url):
+        """
+        Get the `ConnectionPool` for the host of a URL.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme.lower(), parts.hostname, parts.port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(*key, maxsize=self.maxsize, idle_timeout=self.idle_timeout)
+                self._pools[key] = pool
+        return pool
+
+    def clear(self):
+        """
+        Close all idle connections of all pools.
+        """
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.clear()
+
+    @staticmethod
+    def _uses_proxy(url):
+        parts = urlsplit(url)
+        return parts.scheme in getproxies() and not proxy_bypass(parts.hostname or "")
+
+    def urlopen(self, url, *, timeout=60, headers=None, data=None):
+        """
+        Open a URL, reusing a keep-alive connection if possible.
+
+        This mirrors :func:`urllib.request.urlopen`: redirects are followed
+        and HTTP error codes raise `~urllib.error.HTTPError`. Requests that
+        have to go through a proxy configured in the environment are handed
+        to urllib directly.
+
+        Parameters
+        ----------
+        url : str
+            URL to be opened.
+        timeout : float
+            Socket timeout in seconds.
+        headers : dict or None
+            Additional request headers. The drms User-Agent is always set.
+        data : bytes or None
+            If not None, the request is sent as a POST with this body.
+
+        Returns
+        -------
+        result : `PooledResponse` or `http.client.HTTPResponse`
+        """
+        request = create_request_with_header(url)
+        for k, v in (headers or {}).items():
+            request.add_header(k, v)
+        if self._uses_proxy(url):
+            request.data = data
+            return urlopen(request, timeout=timeout)
+
+        method = "GET" if data is None else "POST"
+        for _ in range(self.max_redirects + 1):
+            request_headers = dict(request.header_items())
+            if data is not None:
+                request_headers.setdefault("Content-type", "application/x-www-form-urlencoded")
+            response = self.connection_pool(url).request(
+                method,
+                url,
+                headers=request_headers,
+                body=data,
+                timeout=timeout,
+            )
+            location = response.headers.get("Location")
+            if response.status in _redirect_codes and location:
+                response.read()
+                url = urljoin(url, location)
+                request.full_url = url
+                if response.status == 303 or (response.status in (301, 302) and method == "POST"):
+                    # Like urllib, repeat redirected POSTs as GET requests.
+                    method, data = "GET", None
+                continue
+            if response.status >= 400:
+                raise HTTPError(url, response.status, response.reason, response.headers, response)
+            return response
+        raise HTTPError(url, response.status, "Too many redirects", response.headers, response)
+
+
+class AsyncPooledResponse:
+    """
+    HTTP response of an `AsyncPoolManager` request.
+
+    The body is read with the coroutine `read`. Like `PooledResponse`, the
+    connection is handed back to the pool as soon as the body has been
+    read completely.
+
+    Use `AsyncPoolManager.urlopen` to create an instance.
+    """
+
+    # Size of the blocks read from the socket.
+    _blocksize = 64 * 1024
+
+    def __init__(self, url, status, reason, headers, reader, writer, release, *, timeout=60, timings=None):
+        # Connection timings, see `AsyncPoolManager.urlopen`.
+        self.timings = timings
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._reader = reader
+        self._writer = writer
+        self._release_cb = release
+        self._timeout = timeout
+        self._chunked = "chunked" in headers.get("Transfer-Encoding", "").lower()
+        length = headers.get("Content-Length")
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        self._chunk_left = 0
+        self._done = False
+        self._will_close = headers.get("Connection", "").lower() == "close" or (
+            self._remaining is None and not self._chunked
+        )
+        if self._remaining == 0 or status in (204, 304):
+            self._finish()
+
+    def __repr__(self):
+        return f"<AsyncPooledResponse: {self.status} {self.url}>"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def _finish(self):
+        self._done = True
+        if self._writer is None:
+            return
+        reader, writer, self._reader, self._writer = self._reader, self._writer, None, None
+        if self._will_close:
+            writer.close()
+        else:
+            self._release_cb(reader, writer)
+
+    async def _io(self, aw):
+        # The timeout applies to each socket read, like for blocking sockets.
+        return await asyncio.wait_for(aw, self._timeout)
+
+    async def _read_block(self, amt):
+        """
+        Read up to ``amt`` bytes of the body.
+        """
+        if self._chunked:
+            if self._chunk_left == 0:
+                line = await self._io(self._reader.readline())
+                self._chunk_left = int(line.split(b";", 1)[0].strip(), 16)
+                if self._chunk_left == 0:
+                    # Skip trailer section.
+                    while (await self._io(self._reader.readline())) not in (b"\r\n", b"\n", b""):
+                        pass
+                    self._finish()
+                    return b""
+            n = min(amt, self._chunk_left)
+            data = await self._io(self._reader.readexactly(n))
+            self._chunk_left -= n
+            if self._chunk_left == 0:
+                await self._io(self._reader.readline())
+            return data
+        if self._remaining is None:
+            data = await self._io(self._reader.read(amt))
+            if not data:
+                self._finish()
+            return data
+        n = min(amt, self._remaining)
+        data = await self._io(self._reader.readexactly(n))
+        self._remaining -= n
+        if self._remaining == 0:
+            self._finish()
+        return data
+
+    async def read(self, amt=None):
+        """
+        Read up to ``amt`` bytes of the body, or the entire body if ``amt`` is None.
+        """
+        try:
+            if amt is not None:
+                return b"" if self._done else await self._read_block(amt)
+            parts = []
+            while not self._done:
+                parts.append(await self._read_block(self._blocksize))
+            return b"".join(parts)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            self.close()
+            raise URLError(e) from e
+
+    def close(self):
+        if self._writer is None:
+            return
+        # The body was not consumed, so the connection cannot be reused.
+        self._writer.close()
+        self._reader = self._writer = None
+        self._done = True
+
+
+class AsyncPoolManager:
+    """
+    Keep-alive HTTP/1.1 connection pools for asyncio clients.
+
+    This is the non-blocking counterpart of `PoolManager`. Connections
+    are opened with :func:`asyncio.open_connection` and are reused for
+    subsequent requests to the same scheme, host and port. Proxies
+    configured in the environment are not supported.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of idle connections kept open per host.
+        Defaults to 10.
+    idle_timeout : float
+        Idle connections that have not been used for this many seconds
+        are closed instead of being reused. Defaults to 60 seconds.
+    max_redirects : int
+        Maximum number of HTTP redirects that are followed.
+    """
+
+    def __init__(self, *, maxsize=10, idle_timeout=60, max_redirects=5):
+        self.maxsize = int(maxsize)
+        self.idle_timeout = float(idle_timeout)
+        self.max_redirects = int(max_redirects)
+        self._idle = {}
+        self._ssl_context = None
+
+    def __repr__(self):
+        return f"<AsyncPoolManager: {len(self._idle)} pools>"
+
+    @staticmethod
+    def _pool_key(parts):
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {scheme}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        return scheme, parts.hostname, port
+
+    async def _get_conn(self, key, timeout):
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer, last_used, conn_loop = idle.pop()
+            # Connections are bound to the event loop that created them.
+            if conn_loop is loop and now - last_used < self.idle_timeout and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        ssl_context = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl=ssl_context),
+                timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise URLError(e) from e
+        return reader, writer, False
+
+    def _put_conn(self, key, reader, writer):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.maxsize:
+            idle.append((reader, writer, time.monotonic(), asyncio.get_running_loop()))
+        else:
+            writer.close()
+
+    def clear(self):
+        """
+        Close all idle connections.
+        """
+        for idle in self._idle.values():
+            for _, writer, _, _ in idle:
+                writer.close()
+        self._idle.clear()
+
+    async def _send(self, key, method, url, parts, headers, data, timeout):
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}"]
+        if not any(k.lower() == "accept-encoding" for k in headers):
+            lines.append("Accept-Encoding: identity")
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        if data is not None:
+            lines.append(f"Content-Length: {len(data)}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin1")
+
+        t_start = time.perf_counter()
+        reader, writer, reused = await self._get_conn(key, timeout)
+        # The DNS lookup is not measured separately from the connect.
+        timings = {"reused": reused} if reused else {"reused": False, "connect": time.perf_counter() - t_start}
+        try:
+            writer.write(head + (data or b""))
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout)
+            if not status_line:
+                raise ConnectionResetError("Connection closed by server")
+            version, status, *reason = status_line.decode("latin1").split(None, 2)
+            header_msg = http.client.HTTPMessage()
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin1").partition(":")
+                header_msg[name.strip()] = value.strip()
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            writer.close()
+            if reused and isinstance(e, ConnectionError):
+                # The server dropped the idle keep-alive connection.
+                logger.debug(f"Stale connection to {key[1]}, reconnecting")
+                return await self._send(key, method, url, parts, headers, data, timeout)
+            raise URLError(e) from e
+
+        if version == "HTTP/1.0" and header_msg.get("Connection", "").lower() != "keep-alive":
+            header_msg["Connection"] = "close"
+        return AsyncPooledResponse(
+            url,
+            int(status),
+            reason[0].strip() if reason else "",
+            header_msg,
+            reader,
+            writer,
+            lambda r, w: self._put_conn(key, r, w),
+            timeout=timeout,
+            timings=timings,
+        )
+
+    async def urlopen(self, url, *, timeout=60, headers=None, data=None):
+        """
+        Open a URL, reusing a keep-alive connection if possible.
+
+        Redirects are followed and HTTP error codes raise
+        `~urllib.error.HTTPError`, like in `PoolManager.urlopen`.
+
+        Parameters
+        ----------
+        url : str
+            URL to be opened.
+        timeout : float
+            Timeout in seconds for connecting and receiving the response
+            headers.
+        headers : dict or None
+            Additional request headers. The drms User-Agent is always set.
+        data : bytes or None
+            If not None, the request is sent as a POST with this body.
+
+        Returns
+        -------
+        result : `AsyncPooledResponse`
+            The response. Its ``timings`` attribute is a dictionary that
+            contains whether the connection was ``reused`` and, for new
+            connections, the ``connect`` duration in seconds (including
+            the DNS lookup).
+        """
+        request = create_request_with_header(url)
+        for k, v in (headers or {}).items():
+            request.add_header(k, v)
+        method = "GET" if data is None else "POST"
+        for _ in range(self.max_redirects + 1):
+            request_headers = dict(request.header_items())
+            if data is not None:
+                request_headers.setdefault("Content-type", "application/x-www-form-urlencoded")
+            parts = urlsplit(url)
+            response = await self._send(self._pool_key(parts), method, url, parts, request_headers, data, timeout)
+            location = response.headers.get("Location")
+            if response.status in _redirect_codes and location:
+                await response.read()
+                url = urljoin(url, location)
+                request.full_url = url
+                if response.status == 303 or (response.status in (301, 302) and method == "POST"):
+                    method, data = "GET", None
+                continue
+            if response.status >= 400:
+                body = await response.read()
+                raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+            return response
+        raise HTTPError(url, response.status, "Too many redirects", response.headers, None)
@@ -1,4 +1,5 @@
 __all__ = [
+    "DrmsCircuitOpenError",
     "DrmsError",
     "DrmsExportError",
     "DrmsOperationNotSupported",
@@ -28,3 +29,9 @@ class DrmsOperationNotSupported(DrmsError):
     """
     Operation is not supported by DRMS server.
     """
+
+
+class DrmsCircuitOpenError(DrmsError):
+    """
+    Request was not sent, because too many requests to the server failed.
+    """
@@ -0,0 +1,575 @@
+"""
+A local stand-in for a DRMS server, for testing and load testing.
+
+`FakeDrmsServer` speaks the same CGI protocol as the JSOC server for the
+requests used by drms, and serves synthetic data series with a
+configurable number of records. It can also be started from the command
+line::
+
+    python -m drms.fakeserver --port 8080 --records 100000
+"""
+
+import re
+import sys
+import gzip
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import contextlib
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, unquote_plus, urlsplit
+
+from .config import ServerConfig
+
+__all__ = ["FakeDrmsServer", "FakeSeries"]
+
+_time_formats = (
+    "%Y.%m.%d_%H:%M:%S",
+    "%Y.%m.%d_%H:%M",
+    "%Y.%m.%d_%H",
+    "%Y.%m.%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d",
+)
+_duration_units = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+_re_recset = re.compile(r"^\s*([\w.]+)\s*((?:\[[^\]]*\]\s*)*)(?:\{([^}]*)\})?\s*$")
+_re_duration = re.compile(r"^(\d+(?:\.\d+)?)([smhd]?)$")
+
+
+def _parse_time(s):
+    s = s.strip()
+    for suffix in ("_TAI", "_UTC", "_UT", "Z"):
+        s = s.removesuffix(suffix)
+    for fmt in _time_formats:
+        with contextlib.suppress(ValueError):
+            return datetime.strptime(s, fmt)
+    raise ValueError(f"Invalid time string: {s}")
+
+
+def _parse_duration(s):
+    m = _re_duration.match(s.strip())
+    if m is None:
+        raise ValueError(f"Invalid duration: {s}")
+    return float(m.group(1)) * _duration_units[m.group(2)]
+
+
+class FakeSeries:
+    """
+    Synthetic DRMS data series with the prime key T_REC.
+
+    Records are spaced by ``cadence`` seconds, starting at ``start``. The
+    keywords are T_REC, QUALITY (an integer, formatted as hex string like
+    on JSOC) and ``num_keywords`` double keywords named KEY01, KEY02,
+    etc., whose values are deterministic functions of the record number.
+    Some values are 'MISSING' or 'nan', like in real data.
+
+    Parameters
+    ----------
+    name : str
+        Series name.
+    num_records : int
+        Number of records.
+    cadence : float
+        Time between records in seconds.
+    start : str
+        T_REC of the first record.
+    num_keywords : int
+        Number of double keywords.
+    segments : list of str
+        Segment names.
+    note : str or None
+        Series description.
+    """
+
+    def __init__(
+        self,
+        name,
+        *,
+        num_records=1000,
+        cadence=720,
+        start="2010.05.01_00:00:00_TAI",
+        num_keywords=8,
+        segments=("image",),
+        note=None,
+    ):
+        self.name = name
+        self.num_records = int(num_records)
+        self.cadence = float(cadence)
+        self.start = _parse_time(start)
+        self.segments = list(segments)
+        self.note = note if note is not None else f"Synthetic series {name}"
+        self.keywords = [("T_REC", "time"), ("QUALITY", "int")]
+        self.keywords += [(f"KEY{i + 1:02d}", "double") for i in range(int(num_keywords))]
+
+    def __repr__(self):
+        return f"<FakeSeries: {self.name}>"
+
+    def t_rec(self, i):
+        t = self.start + timedelta(seconds=i * self.cadence)
+        return t.strftime("%Y.%m.%d_%H:%M:%S_TAI")
+
+    def record_name(self, i):
+        return f"{self.name}[{self.t_rec(i)}]"
+
+    def keyword_value(self, name, i):
+        if name == "T_REC":
+            return self.t_rec(i)
+        if name == "QUALITY":
+            return f"0x{(0x10000 if i % 17 == 5 else 0):08x}"
+        if name.startswith("KEY"):
+            k = int(name[3:])
+            if i % 97 == k:
+                return "MISSING"
+            if i % 89 == k:
+                return "nan"
+            return f"{1000 * math.sin(0.01 * i + k):.6f}"
+        return "Invalid KeyLink"
+
+    def segment_value(self, name, i):
+        return f"/SUM{i % 10}/D{1000 + i}/S00000/{name}.fits"
+
+    def series_struct(self):
+        return {
+            "note": self.note,
+            "retention": 10000,
+            "unitsize": 32,
+            "archive": 1,
+            "tapegroup": 1,
+            "primekeys": ["T_REC"],
+            "dbindex": ["T_REC"],
+            "keywords": [
+                {"name": name, "type": kind, "recscope": "variable", "defval": "", "units": "none", "note": ""}
+                for name, kind in self.keywords
+            ],
+            "segments": [
+                {"name": seg, "type": "int", "units": "none", "protocol": "fits", "dims": "4096x4096", "note": ""}
+                for seg in self.segments
+            ],
+            "links": [],
+            "status": 0,
+        }
+
+    def select(self, spec):
+        """
+        Select records with a T_REC filter, e.g. '2010.05.01/1d@1h'.
+
+        Returns a `range` of record numbers.
+        """
+        spec = spec.strip()
+        n = self.num_records
+        if spec == "":
+            return range(n)
+        if spec == "$":
+            return range(n - 1, n)
+        spec, _, step = spec.partition("@")
+        step = max(1, round(_parse_duration(step) / self.cadence)) if step else 1
+        start, sep, duration = spec.partition("/")
+        offset = (_parse_time(start) - self.start).total_seconds() / self.cadence
+        i0 = math.ceil(offset)
+        if sep:
+            i1 = math.ceil(offset + _parse_duration(duration) / self.cadence)
+        else:
+            i1 = i0 + 1 if offset == i0 else i0
+        return range(min(max(i0, 0), n), min(max(i1, 0), n), step)
+
+
+class _FakeDrmsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, *, status=200, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if self.server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, d):
+        self._send(json.dumps(d).encode())
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        self._handle(parts.path, dict(parse_qsl(parts.query)))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        query = dict(parse_qsl(self.rfile.read(length).decode()))
+        self._handle(urlsplit(self.path).path, query)
+
+    def _handle(self, path, query):
+        server = self.server
+        with server.lock:
+            server.num_requests += 1
+            fail = server.error_rate > 0 and server.random.random() < server.error_rate
+        if server.latency:
+            time.sleep(server.latency)
+        if fail:
+            self.send_error(server.error_status)
+            return
+        cgi = path.rsplit("/", 1)[-1]
+        if path.startswith("/SUM"):
+            content = server.file_content(path)
+            if content is None:
+                self.send_error(404)
+                return
+            self._send(content, content_type="application/octet-stream")
+            return
+        handler = server.cgis.get(cgi)
+        if handler is None:
+            self.send_error(404)
+            return
+        try:
+            d = handler(query)
+        except Exception as e:  # NOQA: BLE001
+            d = {"status": 1, "error": str(e)}
+        self._send_json(d)
+
+
+class FakeDrmsServer(ThreadingHTTPServer):
+    """
+    Local fake DRMS server.
+
+    The server provides the show_series, showextseries, jsoc_info
+    (series_struct, rs_summary, rs_list), jsoc_fetch (exp_request,
+    exp_status) and checkAddress.sh CGIs, as well as the download of
+    exported files, for a set of `FakeSeries`. Use `config` to get a
+    `~drms.config.ServerConfig` for the server. Like on real mirrors,
+    export requests and their files only exist on the server that
+    accepted them.
+
+    Record set queries support a single T_REC filter of the form
+    ``start``, ``start/duration``, ``start/duration@step`` or ``$``,
+    optionally followed by further filters (which are ignored) and a
+    segment list.
+
+    Parameters
+    ----------
+    series : list of `FakeSeries` or None
+        Data series provided by the server. Defaults to three series
+        ``fake.series1`` to ``fake.series3`` with ``num_records``
+        records each.
+    num_records : int
+        Number of records of the default series. Defaults to 1000.
+    host : str
+        Host name to listen on. Defaults to '127.0.0.1'.
+    port : int
+        Port to listen on. Defaults to 0, which selects a free port.
+    latency : float
+        Delay in seconds added to every response. Defaults to 0.
+    error_rate : float
+        Fraction of requests that fail with HTTP status ``error_status``.
+        Defaults to 0.
+    error_status : int
+        HTTP status code of injected errors. Defaults to 503.
+    export_wait : int
+        Number of exp_status requests for which an export request stays
+        pending, before it is finished. Defaults to 1.
+    file_size : int
+        Size of exported files in bytes. Defaults to 4096.
+    compress : bool
+        If True (default), responses are gzip compressed for clients that
+        accept it.
+    seed : int or None
+        Seed of the random number generator used for error injection.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        series=None,
+        *,
+        num_records=1000,
+        host="127.0.0.1",
+        port=0,
+        latency=0,
+        error_rate=0,
+        error_status=503,
+        export_wait=1,
+        file_size=4096,
+        compress=True,
+        seed=None,
+    ):
+        super().__init__((host, port), _FakeDrmsHandler)
+        if series is None:
+            series = [FakeSeries(f"fake.series{i}", num_records=num_records) for i in (1, 2, 3)]
+        self.series = {s.name.lower(): s for s in series}
+        self.latency = float(latency)
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self.export_wait = int(export_wait)
+        self.file_size = int(file_size)
+        self.compress = compress
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.num_requests = 0
+        self.exports = {}
+        self._thread = None
+        self.cgis = {
+            "show_series": self._show_series,
+            "showextseries": self._show_series_wrapper,
+            "jsoc_info": self._jsoc_info,
+            "jsoc_fetch": self._jsoc_fetch,
+            "checkAddress.sh": self._check_address,
+        }
+
+    def __repr__(self):
+        return f"<FakeDrmsServer: {self.url}>"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self):
+        """
+        (str) Base URL of the server.
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def config(self):
+        """
+        (`~drms.config.ServerConfig`) Configuration for this server.
+        """
+        return ServerConfig(
+            name="FAKE",
+            cgi_baseurl=f"{self.url}cgi-bin/ajax/",
+            cgi_show_series="show_series",
+            cgi_jsoc_info="jsoc_info",
+            cgi_jsoc_fetch="jsoc_fetch",
+            cgi_check_address="checkAddress.sh",
+            cgi_show_series_wrapper="showextseries",
+            show_series_wrapper_dbhost="fake",
+            http_download_baseurl=self.url,
+        )
+
+    def start(self):
+        """
+        Start serving requests in a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the server and close its socket.
+        """
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def file_content(self, path):
+        """
+        Content of an exported file (deterministic bytes), or None if the
+        file belongs to an export request that is unknown to this server.
+        """
+        m = re.match(r"^/SUM0/D1/S00000/([^/]+)/", path)
+        if m is not None and m.group(1) not in self.exports:
+            return None
+        pattern = path.encode()
+        return (pattern * (self.file_size // len(pattern) + 1))[: self.file_size]
+
+    def _get_series(self, name):
+        series = self.series.get(name.lower())
+        if series is None:
+            raise ValueError(f"Unknown series: {name}")
+        return series
+
+    def _parse_recset(self, ds):
+        m = _re_recset.match(ds)
+        if m is None:
+            raise ValueError(f"Cannot parse record set: {ds}")
+        series = self._get_series(m.group(1))
+        filters = re.findall(r"\[([^\]]*)\]", m.group(2))
+        records = series.select(filters[0]) if filters else range(series.num_records)
+        segs = series.segments
+        if m.group(3) is not None:
+            segs = [s.strip() for s in m.group(3).split(",") if s.strip()]
+        return series, records, segs
+
+    @staticmethod
+    def _limit(records, n):
+        if n is None:
+            return records
+        n = int(n)
+        if n == 0:
+            return records
+        return records[:n] if n > 0 else records[n:]
+
+    def _show_series(self, query):
+        pattern = re.compile(query.get("filter", ""), re.IGNORECASE)
+        names = [
+            {"name": s.name, "primekeys": "T_REC", "note": s.note}
+            for s in self.series.values()
+            if pattern.search(s.name)
+        ]
+        return {"names": names, "n": len(names), "status": 0}
+
+    def _show_series_wrapper(self, query):
+        pattern = re.compile(query.get("filter", ""), re.IGNORECASE)
+        series = [s for s in self.series.values() if pattern.search(s.name)]
+        if query.get("info"):
+            series_list = [{s.name: {"description": s.note}} for s in series]
+        else:
+            series_list = [s.name for s in series]
+        return {"seriesList": series_list, "status": 0}
+
+    def _jsoc_info(self, query):
+        t_start = time.perf_counter()
+        op = query.get("op")
+        if op == "series_struct":
+            d = self._get_series(query["ds"]).series_struct()
+        elif op == "rs_summary":
+            _, records, _ = self._parse_recset(query["ds"])
+            d = {"count": len(records), "status": 0}
+        elif op == "rs_list":
+            d = self._rs_list(query)
+        else:
+            raise ValueError(f"Unsupported operation: {op}")
+        d["runtime"] = round(time.perf_counter() - t_start, 6)
+        return d
+
+    def _rs_list(self, query):
+        series, records, segs = self._parse_recset(query["ds"])
+        records = self._limit(records, query.get("n"))
+        d = {"count": len(records)}
+        if "key" in query:
+            keys = [k.strip() for k in query["key"].split(",") if k.strip()]
+            if keys == ["**ALL**"]:
+                keys = [name for name, _ in series.keywords]
+            d["keywords"] = [{"name": k, "values": [series.keyword_value(k, i) for i in records]} for k in keys]
+        if "seg" in query:
+            segs = [s.strip() for s in query["seg"].split(",") if s.strip()]
+            d["segments"] = [
+                {
+                    "name": s,
+                    "values": [series.segment_value(s, i) for i in records],
+                    "dims": ["4096x4096"] * len(records),
+                }
+                for s in segs
+            ]
+        if "link" in query:
+            links = [s.strip() for s in query["link"].split(",") if s.strip()]
+            d["links"] = [{"name": s, "values": ["Invalid KeyLink"] * len(records)} for s in links]
+        if query.get("R") == "1":
+            d["recinfo"] = [{"name": series.record_name(i), "online": 1} for i in records]
+        d["status"] = 0
+        return d
+
+    def _jsoc_fetch(self, query):
+        op = query.get("op")
+        if op == "exp_request":
+            return self._exp_request(query)
+        if op == "exp_status":
+            return self._exp_status(query)
+        raise ValueError(f"Unsupported operation: {op}")
+
+    def _exp_request(self, query):
+        series, records, segs = self._parse_recset(query["ds"])
+        n = query.get("process=n")
+        records = self._limit(records, n.split("|")[0] if n else None)
+        method = query.get("method", "url_quick")
+        protocol = query.get("protocol", "as-is").split(",")[0]
+        files = [(series.record_name(i), seg, i) for i in records for seg in segs]
+        if method == "url_quick" and protocol == "as-is":
+            return {
+                "status": 0,
+                "requestid": "",
+                "method": method,
+                "protocol": protocol,
+                "dir": None,
+                "count": len(files),
+                "data": [
+                    {"record": f"{rec}{{{seg}}}", "filename": series.segment_value(seg, i)} for rec, seg, i in files
+                ],
+            }
+        with self.lock:
+            requestid = f"JSOC_{datetime.now().strftime('%Y%m%d')}_{len(self.exports) + 1:03d}"
+            self.exports[requestid] = {
+                "series": series,
+                "files": files,
+                "method": method,
+                "protocol": protocol,
+                "polls": self.export_wait,
+            }
+        return {"status": 2, "requestid": requestid, "method": method, "protocol": protocol, "wait": 0}
+
+    def _exp_status(self, query):
+        requestid = query.get("requestid")
+        with self.lock:
+            export = self.exports.get(requestid)
+            if export is None:
+                return {"status": 6, "requestid": requestid, "error": "Request not found"}
+            if export["polls"] > 0:
+                export["polls"] -= 1
+                return {"status": 1, "requestid": requestid, "wait": 0}
+        series = export["series"]
+        data = []
+        for rec, seg, i in export["files"]:
+            t = series.t_rec(i).removesuffix("_TAI").replace(".", "").replace(":", "")
+            data.append({"record": f"{rec}{{{seg}}}", "filename": f"{series.name}.{t}_TAI.{seg}.fits"})
+        d = {
+            "status": 0,
+            "requestid": requestid,
+            "method": export["method"],
+            "protocol": export["protocol"],
+            "dir": f"/SUM0/D1/S00000/{requestid}",
+            "count": len(data),
+            "size": len(data) * self.file_size,
+            "data": data,
+        }
+        if export["method"] == "url-tar":
+            d["tarfile"] = f"/SUM0/D1/S00000/{requestid}/{requestid}.tar"
+        return d
+
+    def _check_address(self, query):
+        # drms quotes the address before it is URL-encoded.
+        address = unquote_plus(query.get("address", ""))
+        if "@" not in address:
+            return {"status": -2, "msg": "Not a valid email address"}
+        return {"status": 2, "msg": "Address is registered"}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Run a fake DRMS server for testing")
+    parser.add_argument("--host", default="127.0.0.1", help="host name to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--records", type=int, default=1000, help="number of records per series")
+    parser.add_argument("--latency", type=float, default=0, help="delay of every response in seconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of failing requests")
+    args = parser.parse_args(sys.argv[1:] if args is None else args)
+    server = FakeDrmsServer(
+        num_records=args.records,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    print(f"Serving fake DRMS server at {server.config.cgi_baseurl}")  # NOQA: T201
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,37 @@
+import os
+import re
+import time
+import zlib
+import codecs
+import asyncio
+import hashlib
 import json as _json
 import socket
+import tempfile
+import threading
 from enum import Enum
-from urllib.parse import urlencode, quote_plus
+from pathlib import Path
+from functools import cache, partial
+from urllib.parse import urljoin, urlencode, quote_plus
 from urllib.request import HTTPError, urlopen
 
 from drms import logger
+from .retry import RetryPolicy
+from .metrics import RequestMetrics, _MeteredResponse, _AsyncMeteredResponse
 from .config import ServerConfig, _server_configs
+from .transport import UrllibTransport
+from .connection import AsyncPoolManager
 from .utils import _split_arg, create_request_with_header
 
-__all__ = ["HttpJsonClient", "HttpJsonRequest", "JsocInfoConstants"]
+__all__ = [
+    "AsyncHttpJsonClient",
+    "HttpJsonClient",
+    "HttpJsonRequest",
+    "JsocInfoConstants",
+    "ResponseCache",
+    "register_json_decoder",
+    "set_json_decoder",
+]
 
 
 # TODO: When we support 3.11, we can use StrEnum instead of Enum
@@ -30,41 +53,829 @@ class JsocInfoConstants(str, Enum):
     archive = "*archive*"
 
 
+# Content codings accepted for JSON responses. Large rs_list responses are
+# very repetitive and usually shrink by a factor of ten or more.
+_accept_encoding = "gzip, deflate"
+
+# Size of the blocks that are read and decompressed at a time.
+_read_blocksize = 256 * 1024
+
+# Requests with longer URLs are sent as POST requests. Web servers reject
+# request lines longer than about 8 KiB (Apache's default LimitRequestLine
+# is 8190 bytes).
+_max_url_length = 8000
+
+
+class _DeflateDecompressor:
+    """
+    Decompressor for the "deflate" content coding.
+
+    Servers send either zlib-wrapped or raw deflate streams for this
+    coding, so the format is determined from the first block.
+    """
+
+    def __init__(self):
+        self._decomp = zlib.decompressobj()
+        self._first = True
+
+    def decompress(self, data):
+        if self._first:
+            self._first = False
+            try:
+                return self._decomp.decompress(data)
+            except zlib.error:
+                self._decomp = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decomp.decompress(data)
+
+    def flush(self):
+        return self._decomp.flush()
+
+
+def _decompressor(content_encoding):
+    """
+    Create a streaming decompressor for a Content-Encoding header value.
+
+    Returns None for uncompressed responses.
+    """
+    content_encoding = (content_encoding or "identity").strip().lower()
+    if content_encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if content_encoding == "deflate":
+        return _DeflateDecompressor()
+    if content_encoding == "identity":
+        return None
+    raise ValueError(f"Unsupported content encoding: {content_encoding}")
+
+
+def _iter_body(response):
+    """
+    Iterate over decompressed blocks of the body of a JSON response.
+    """
+    decomp = _decompressor(response.headers.get("Content-Encoding"))
+    while block := response.read(_read_blocksize):
+        yield block if decomp is None else decomp.decompress(block)
+    if decomp is not None:
+        yield decomp.flush()
+
+
+async def _aiter_body(response):
+    """
+    Iterate over decompressed blocks of the body of an asynchronous JSON response.
+    """
+    decomp = _decompressor(response.headers.get("Content-Encoding"))
+    while block := await response.read(_read_blocksize):
+        yield block if decomp is None else decomp.decompress(block)
+    if decomp is not None:
+        yield decomp.flush()
+
+
+def _read_body(response):
+    """
+    Read and decompress the body of a JSON response.
+    """
+    if _decompressor(response.headers.get("Content-Encoding")) is None:
+        return response.read()
+    return b"".join(_iter_body(response))
+
+
+async def _aread_body(response):
+    """
+    Read and decompress the body of an asynchronous JSON response.
+    """
+    if _decompressor(response.headers.get("Content-Encoding")) is None:
+        return await response.read()
+    return b"".join([block async for block in _aiter_body(response)])
+
+
+class _RsListParser:
+    """
+    Incremental parser for jsoc_info rs_list responses.
+
+    The response body is passed to `feed` block by block and `close`
+    returns the same dictionary as decoding the whole body at once would.
+    The string values of the "keywords", "segments" and "links" columns
+    are appended directly to one list per column, while only the current
+    block of the body is kept in memory. All complete values in a block
+    are decoded in one batch by the (C-accelerated) standard library.
+
+    The parser itself is a generator that yields whenever it needs more
+    data than is currently buffered.
+    """
+
+    _re_ws = re.compile(r"\s*")
+    _re_number_tail = re.compile(r"[-+0-9.eE]*")
+    _column_keys = ("keywords", "segments", "links")
+    # Keep consumed text in the buffer up to this size, to avoid copying
+    # the buffer for every block.
+    _max_consumed = 1024 * 1024
+
+    def __init__(self, encoding):
+        self._text_decoder = codecs.getincrementaldecoder(encoding)()
+        self._json_decoder = _json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        # Number of times data was added to the buffer.
+        self._refills = 0
+        self._result = None
+        self._parser = self._parse()
+        next(self._parser)
+
+    def feed(self, data):
+        """
+        Parse the next block of the response body.
+        """
+        if self._pos > self._max_consumed:
+            self._buf = self._buf[self._pos :]
+            self._pos = 0
+        self._buf += self._text_decoder.decode(data)
+        self._refills += 1
+        self._resume()
+
+    def close(self):
+        """
+        Finish parsing and return the decoded response.
+        """
+        self._buf += self._text_decoder.decode(b"", final=True)
+        self._eof = True
+        self._refills += 1
+        self._resume()
+        if self._result is None:
+            raise ValueError("Unexpected end of JSON data")
+        return self._result
+
+    def _resume(self):
+        if self._result is not None:
+            return
+        try:
+            next(self._parser)
+        except StopIteration as e:
+            self._result = e.value
+
+    def _error(self, msg):
+        return _json.JSONDecodeError(msg, self._buf, self._pos)
+
+    def _skip_ws(self):
+        while True:
+            self._pos = self._re_ws.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or self._eof:
+                return
+            yield
+
+    def _expect(self, chars):
+        yield from self._skip_ws()
+        if self._pos >= len(self._buf):
+            raise self._error("Unexpected end of JSON data")
+        c = self._buf[self._pos]
+        if c not in chars:
+            raise self._error(f"Expecting one of {chars!r}")
+        self._pos += 1
+        return c
+
+    def _peek(self, c):
+        yield from self._skip_ws()
+        if self._buf.startswith(c, self._pos):
+            self._pos += 1
+            return True
+        return False
+
+    def _value(self):
+        """
+        Decode a (small) JSON value, waiting for more data if necessary.
+        """
+        yield from self._skip_ws()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buf, self._pos)
+            except _json.JSONDecodeError:
+                if self._eof:
+                    raise
+                yield
+                continue
+            # Numbers that reach the end of the buffer may be incomplete.
+            if not self._eof and self._re_number_tail.match(self._buf, end).end() == len(self._buf):
+                yield
+                continue
+            self._pos = end
+            return value
+
+    def _object(self, handle_value):
+        yield from self._expect("{")
+        if (yield from self._peek("}")):
+            return
+        while True:
+            key = yield from self._value()
+            yield from self._expect(":")
+            yield from handle_value(key)
+            if (yield from self._expect(",}")) == "}":
+                return
+
+    def _array(self, handle_item):
+        yield from self._expect("[")
+        if (yield from self._peek("]")):
+            return
+        while True:
+            yield from handle_item()
+            if (yield from self._expect(",]")) == "]":
+                return
+
+    def _values(self, out):
+        yield from self._expect("[")
+        if (yield from self._peek("]")):
+            return
+        failed_at = None
+        while True:
+            # Decode all complete values up to the last string terminator in
+            # the buffer at once. The search stops at the first "]", which is
+            # usually the end of the array. If the cut happens to be inside a
+            # string, decoding fails and values are decoded one by one until
+            # more data arrives, because the cut would not change before.
+            end = self._buf.find("]", self._pos)
+            cut = self._buf.rfind('",', self._pos, len(self._buf) if end < 0 else end)
+            if cut > self._pos and failed_at != self._refills:
+                try:
+                    out.extend(_json.loads(f"[{self._buf[self._pos : cut + 1]}]"))
+                except ValueError:
+                    failed_at = self._refills
+                else:
+                    self._pos = cut + 2
+                    continue
+            out.append((yield from self._value()))
+            if (yield from self._expect(",]")) == "]":
+                return
+
+    def _append_value(self, out):
+        out.append((yield from self._value()))
+
+    def _column(self, columns):
+        column = {}
+        columns.append(column)
+
+        def handle_value(key):
+            if key == "values":
+                column[key] = []
+                yield from self._values(column[key])
+            else:
+                column[key] = yield from self._value()
+
+        yield from self._object(handle_value)
+
+    def _parse(self):
+        result = {}
+
+        def handle_value(key):
+            if key in self._column_keys:
+                result[key] = columns = []
+                yield from self._array(lambda: self._column(columns))
+            elif key == "recinfo":
+                result[key] = items = []
+                yield from self._array(lambda: self._append_value(items))
+            else:
+                result[key] = yield from self._value()
+
+        yield
+        yield from self._object(handle_value)
+        yield from self._skip_ws()
+        if self._pos != len(self._buf) or not self._eof:
+            # Wait for the end of the data, which must not contain anything
+            # but whitespace.
+            while not self._eof:
+                yield
+                yield from self._skip_ws()
+            if self._pos != len(self._buf):
+                raise self._error("Extra data")
+        return result
+
+
+def _stdlib_decoder(raw_data, encoding):
+    return _json.loads(raw_data.decode(encoding))
+
+
+def _is_utf8(encoding):
+    return encoding.lower().replace("_", "-") in ("utf-8", "utf8")
+
+
+def _orjson_decoder(raw_data, encoding):
+    import orjson  # noqa: PLC0415
+
+    # orjson only parses UTF-8, which is identical to most other encodings
+    # for pure ASCII data. Anything else has to be decoded first.
+    if _is_utf8(encoding) or raw_data.isascii():
+        return orjson.loads(raw_data)
+    return orjson.loads(raw_data.decode(encoding))
+
+
+def _msgspec_decoder(raw_data, encoding):
+    import msgspec  # noqa: PLC0415
+
+    if _is_utf8(encoding) or raw_data.isascii():
+        return msgspec.json.decode(raw_data)
+    return msgspec.json.decode(raw_data.decode(encoding))
+
+
+# Registered JSON decoders, see register_json_decoder.
+_json_decoders = {
+    "json": (_stdlib_decoder, "json"),
+    "orjson": (_orjson_decoder, "orjson"),
+    "msgspec": (_msgspec_decoder, "msgspec"),
+}
+
+# Decoder used if the server config does not select one.
+_default_json_decoder = "auto"
+
+
+def register_json_decoder(name, decoder, *, module=None):
+    """
+    Register a JSON decoder backend.
+
+    Parameters
+    ----------
+    name : str
+        Name of the decoder, used to select it with `set_json_decoder` or
+        the ``json_decoder`` server config entry.
+    decoder : callable
+        Function that takes the raw response body (bytes) and the
+        character encoding of the server and returns the decoded data.
+    module : str or None
+        Name of a module the decoder depends on. The decoder is skipped
+        for ``"auto"`` selection, if the module is not installed.
+    """
+    name = name.lower()
+    if name == "auto":
+        raise ValueError("The decoder name 'auto' is reserved")
+    _json_decoders[name] = (decoder, module)
+
+
+def set_json_decoder(name):
+    """
+    Select the default JSON decoder backend for all servers.
+
+    Individual servers can use a different decoder by setting the
+    ``json_decoder`` entry of their `~drms.config.ServerConfig`.
+
+    Parameters
+    ----------
+    name : str
+        Name of a registered decoder. Built-in decoders are 'json' (the
+        standard library), 'orjson' and 'msgspec'. If set to 'auto' (the
+        default), orjson or msgspec is used if available and the standard
+        library otherwise.
+    """
+    global _default_json_decoder
+    name = name.lower()
+    if name != "auto":
+        _get_json_decoder(name)
+    _default_json_decoder = name
+
+
+@cache
+def _module_available(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def _get_json_decoder(name=None):
+    """
+    Get the decoder function for a decoder name (or the default decoder).
+    """
+    name = (name or _default_json_decoder).lower()
+    if name == "auto":
+        for auto_name in ("orjson", "msgspec"):
+            if _module_available(_json_decoders[auto_name][1]):
+                return _json_decoders[auto_name][0]
+        return _stdlib_decoder
+    try:
+        decoder, module = _json_decoders[name]
+    except KeyError:
+        raise ValueError(f"Unknown JSON decoder: {name}") from None
+    if module is not None and not _module_available(module):
+        raise ImportError(f"JSON decoder {name} requires the {module} package")
+    return decoder
+
+
+def _loads(raw_data, encoding, decoder=None):
+    """
+    Decode the raw body of a JSON response.
+
+    Third-party decoders are stricter than the standard library, so the
+    standard library is used as a fallback for data they reject.
+    """
+    decode = _get_json_decoder(decoder)
+    if decode is _stdlib_decoder:
+        return decode(raw_data, encoding)
+    try:
+        return decode(raw_data, encoding)
+    except ValueError:
+        logger.debug("JSON decoder failed, falling back to the standard library")
+        return _stdlib_decoder(raw_data, encoding)
+
+
+def _copy_json(value):
+    """
+    Copy the dictionaries and lists of decoded JSON data.
+    """
+    if isinstance(value, dict):
+        return {k: _copy_json(v) if isinstance(v, (dict, list)) else v for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(v) if isinstance(v, (dict, list)) else v for v in value]
+    return value
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class _SingleFlight:
+    """
+    Coalesce identical concurrent calls.
+
+    While a call for a key is running, other threads calling `do` with the
+    same key wait for it and get a copy of its result (or its exception),
+    instead of making the same call again. If other threads waited for
+    the call, the thread that made it also gets a copy, so that the
+    result is never changed while it is copied.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, func):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy_json(flight.result)
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        # No threads can join the flight after it was removed.
+        return _copy_json(flight.result) if flight.waiters else flight.result
+
+
+class _AsyncFlight:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class _AsyncSingleFlight:
+    """
+    Coalesce identical concurrent calls of asyncio tasks.
+
+    The call runs in a separate task, so that cancelling one of the
+    waiting tasks does not cancel the call for the others. Tasks other
+    than the one that started the call get a copy of its result, and so
+    does the task that started it, if other tasks waited for the call.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key, func):
+        flight = self._flights.get(key)
+        leader = flight is None or flight.task.get_loop() is not asyncio.get_running_loop()
+        if leader:
+            flight = _AsyncFlight(asyncio.ensure_future(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(partial(self._remove, key, flight))
+        else:
+            flight.waiters += 1
+        result = await asyncio.shield(flight.task)
+        # The flight is removed before the tasks waiting for it resume, so
+        # the number of waiters is final.
+        return _copy_json(result) if not leader or flight.waiters else result
+
+    def _remove(self, key, flight, task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved, in case all waiting tasks
+            # have been cancelled.
+            task.exception()
+
+
+def _post_args(url, max_url_length=None):
+    """
+    Split an oversized request URL into the CGI URL and a form-encoded
+    POST body.
+
+    Returns the unchanged URL and None, if the URL is short enough to be
+    sent as a GET request.
+    """
+    if max_url_length is None:
+        max_url_length = _max_url_length
+    if len(url) <= max_url_length or "?" not in url:
+        return url, None
+    base_url, _, query = url.partition("?")
+    logger.debug(f"Sending request as POST, URL length {len(url)} exceeds {max_url_length}")
+    # The query string is already form-encoded.
+    return base_url, query.encode("ascii")
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache for JSON responses.
+
+    Responses of requests that rarely change (`HttpJsonClient.show_series`,
+    `HttpJsonClient.show_series_wrapper` and `HttpJsonClient.series_struct`)
+    are stored in a directory, one file per URL, and are reused until their
+    time to live has expired. If the total size of the cached files exceeds
+    ``max_size``, the least recently used responses are removed.
+
+    Files are written atomically, so a cache directory can be shared by
+    several processes at the same time.
+
+    Parameters
+    ----------
+    directory : str, pathlib.Path or None
+        Cache directory. If set to None (default), the directory
+        ``drms/responses`` in the user cache directory (``$XDG_CACHE_HOME``
+        or ``~/.cache``) is used.
+    ttl : float, dict or None
+        Time to live of cached responses in seconds, either for all
+        endpoints or as a dictionary mapping endpoint names (e.g.
+        'series_struct') to a time to live. Endpoints that are not
+        included in the dictionary use the default values in
+        `default_ttl`.
+    max_size : int
+        Maximum total size of the cached responses in bytes. Defaults to
+        100 MiB.
+    """
+
+    #: Default time to live in seconds for each cached endpoint.
+    default_ttl = {
+        "show_series": 24 * 3600,
+        "show_series_wrapper": 24 * 3600,
+        "series_struct": 3600,
+    }
+
+    def __init__(self, directory=None, *, ttl=None, max_size=100 * 1024**2):
+        if directory is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+            directory = Path(cache_home) / "drms" / "responses"
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._ttl = dict(self.default_ttl)
+        if isinstance(ttl, dict):
+            self._ttl.update(ttl)
+        elif ttl is not None:
+            self._ttl = dict.fromkeys(self._ttl, ttl)
+        self.max_size = int(max_size)
+
+    def __repr__(self):
+        return f"<ResponseCache: {self._directory}>"
+
+    @property
+    def directory(self):
+        """
+        (`pathlib.Path`) Cache directory.
+        """
+        return self._directory
+
+    def ttl(self, endpoint):
+        """
+        Time to live in seconds of responses of an endpoint.
+        """
+        return self._ttl.get(endpoint, 0)
+
+    def _path(self, url):
+        return self._directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def get(self, url, endpoint):
+        """
+        Get a cached response, or None if the URL is not cached or the
+        cached response has expired.
+        """
+        path = self._path(url)
+        try:
+            mtime = path.stat().st_mtime
+            if time.time() - mtime > self.ttl(endpoint):
+                return None
+            raw_data = path.read_bytes()
+            # Record the access for LRU eviction, keeping the time the
+            # response was stored.
+            os.utime(path, (time.time(), mtime))
+        except OSError:
+            return None
+        try:
+            return _loads(raw_data, "utf-8")
+        except ValueError:
+            logger.debug(f"Removing corrupt cache file {path}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, url, data):
+        """
+        Store a response in the cache.
+        """
+        raw_data = _json.dumps(data).encode()
+        tmp_name = None
+        try:
+            # Write to a temporary file first, so that other processes never
+            # see partially written files.
+            with tempfile.NamedTemporaryFile(dir=self._directory, suffix=".tmp", delete=False) as f:
+                tmp_name = f.name
+                f.write(raw_data)
+            Path(tmp_name).replace(self._path(url))
+        except OSError as e:
+            logger.debug(f"Could not write response to cache: {e}")
+            if tmp_name is not None:
+                Path(tmp_name).unlink(missing_ok=True)
+            return
+        self._evict()
+
+    def clear(self):
+        """
+        Remove all cached responses.
+        """
+        for path in self._directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def _evict(self):
+        files = []
+        for path in self._directory.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_atime, st.st_size, path))
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+
 class HttpJsonRequest:
     """
     Class for handling HTTP/JSON requests.
 
     Use `HttpJsonClient` to create an instance.
+
+    Parameters
+    ----------
+    url : str
+        URL of the request.
+    encoding : str
+        Character encoding of the JSON response.
+    timeout : float, optional
+        Sets the timeout to "urlopen", this defaults to 60 seconds.
+    pool : `~drms.connection.PoolManager` or None, optional
+        Connection pool used to send the request. If set to None
+        (default), a new connection is opened using "urlopen".
+    transport : `~drms.transport.Transport` or None, optional
+        Transport used to send the request. If set, this takes precedence
+        over ``pool``.
+    decoder : str or None, optional
+        Name of the JSON decoder backend. If set to None (default), the
+        decoder selected with `set_json_decoder` is used.
+    data : bytes or None, optional
+        If not None, the request is sent as a POST request with this
+        form-encoded body.
+    metrics_hook : callable or None, optional
+        Function that is called with the `~drms.metrics.RequestMetrics`
+        of the request, once the response has been decoded or the request
+        has failed.
     """
 
-    def __init__(self, url, encoding, timeout=60):
+    def __init__(
+        self,
+        url,
+        encoding,
+        timeout=60,
+        *,
+        pool=None,
+        decoder=None,
+        transport=None,
+        data=None,
+        metrics_hook=None,
+    ):
         timeout = socket.getdefaulttimeout() or timeout
         self._encoding = encoding
+        self._decoder = decoder
+        self.metrics = RequestMetrics(url, method="GET" if data is None else "POST")
+        headers = {"Accept-Encoding": _accept_encoding}
         try:
-            self._http = urlopen(create_request_with_header(url), timeout=timeout)
+            if transport is not None:
+                if data is None:
+                    self._http = transport.get(url, stream=True, timeout=timeout, headers=headers)
+                else:
+                    self._http = transport.post(url, data, stream=True, timeout=timeout, headers=headers)
+            elif pool is None:
+                request = create_request_with_header(url)
+                request.add_header("Accept-Encoding", _accept_encoding)
+                request.data = data
+                self._http = urlopen(request, timeout=timeout)
+            else:
+                self._http = pool.urlopen(url, timeout=timeout, headers=headers, data=data)
         except HTTPError as e:
             e.msg = f"Failed to open URL: {e.url} with {e.code} - {e.msg}"
+            self._fail(e, metrics_hook)
             raise e
+        except Exception as e:
+            self._fail(e, metrics_hook)
+            raise
+        self._http = _MeteredResponse(self._http, self.metrics, metrics_hook)
         self._data_str = None
         self._data = None
 
     def __repr__(self):
         return f"<HttpJsonRequest: {self.url}>"
 
+    def _fail(self, error, metrics_hook):
+        self.metrics._finish(error)
+        if metrics_hook is not None:
+            metrics_hook(self.metrics)
+
+    def _decode(self, decode):
+        """
+        Decode the response body with ``decode`` and complete the request
+        metrics.
+        """
+        try:
+            data = decode()
+        except Exception as e:
+            self.metrics.error = e
+            raise
+        else:
+            if isinstance(data, dict):
+                self.metrics.server_runtime = data.get("runtime")
+        finally:
+            # This completes the metrics and calls the metrics hook.
+            self._http.close()
+        return data
+
     @property
     def url(self):
         return self._http.url
 
     @property
     def raw_data(self):
+        """
+        (bytes) Response body, decompressed if the server used gzip or deflate.
+        """
         if self._data_str is None:
-            self._data_str = self._http.read()
+            self._data_str = _read_body(self._http)
+            self.metrics.bytes_decoded = len(self._data_str)
         return self._data_str
 
     @property
     def data(self):
         if self._data is None:
-            self._data = _json.loads(self.raw_data.decode(self._encoding))
+            self._data = self._decode(lambda: _loads(self.raw_data, self._encoding, self._decoder))
+        return self._data
+
+    def iter_content(self):
+        """
+        Iterate over blocks of the response body, without keeping the
+        whole body in memory.
+
+        Compressed responses are decompressed block by block. This cannot
+        be combined with `raw_data` or `data`.
+        """
+        yield from _iter_body(self._http)
+
+    def rs_list_data(self):
+        """
+        Decode a jsoc_info rs_list response with the streaming parser.
+
+        This returns the same result as `data`, but the response body is
+        parsed while it is received, so that the raw body is never held in
+        memory as a whole.
+        """
+        if self._data is None:
+
+            def parse():
+                parser = _RsListParser(self._encoding)
+                self.metrics.bytes_decoded = 0
+                for block in self.iter_content():
+                    self.metrics.bytes_decoded += len(block)
+                    parser.feed(block)
+                return parser.close()
+
+            self._data = self._decode(parse)
         return self._data
 
 
@@ -72,30 +883,306 @@ class HttpJsonClient:
     """
     HTTP/JSON communication with the DRMS server CGIs.
 
+    If several mirrors are configured for the server (see
+    `~drms.config.ServerConfig`), series lists, jsoc_info requests and
+    email address checks are sent to the fastest healthy mirror and are
+    repeated on the other mirrors if they fail. Exports only exist on the
+    mirror that accepted them, so export requests, their status requests
+    and file downloads are sent to a single mirror (see `exp_request`).
+
+    Requests are sent as GET requests. Requests whose URL would exceed the
+    ``max_url_length`` entry of the server configuration (8000 characters
+    by default), e.g. `rs_list` queries with hundreds of keywords or
+    explicit record lists, are sent as form-encoded POST requests instead.
+
     Parameters
     ----------
     server : str or drms.config.ServerConfig
         Registered server ID or ServerConfig instance.
         Defaults to JSOC.
+    pool_size : int
+        Maximum number of idle keep-alive connections kept open per
+        host. Defaults to 10.
+    idle_timeout : float
+        Number of seconds after which idle keep-alive connections are
+        closed instead of being reused. Defaults to 60 seconds.
+    stream_rs_list : bool
+        If True (default), rs_list responses are decoded with a streaming
+        parser while they are received, instead of decoding the complete
+        response body at once. This keeps the peak memory usage of large
+        queries close to the size of the result.
+    retry_policy : `~drms.retry.RetryPolicy` or None
+        Policy used to retry failed requests. If set to None (default), a
+        `~drms.retry.RetryPolicy` with default settings is used. Use
+        ``RetryPolicy(total=0)`` to disable retries.
+    coalesce : bool
+        If True (default), identical requests (i.e. requests for the same
+        URL) that are sent concurrently from several threads using this
+        client are combined into a single request, whose result is
+        returned to all callers (as a copy). Export requests are never
+        combined.
+    cache : `ResponseCache` or None
+        Persistent cache for responses that rarely change (series lists
+        and series information). If set to None (default), no cache is
+        used.
+    transport : `~drms.transport.Transport` or None
+        Transport used to send HTTP requests, e.g. a
+        `~drms.transport.Urllib3Transport`, a
+        `~drms.transport.HttpxTransport` or a
+        `~drms.replay.RecordReplayTransport`. If set to None (default), a
+        new `~drms.transport.UrllibTransport` is used and ``pool_size``
+        and ``idle_timeout`` apply to it.
+    metrics_hook : callable or None
+        Function that is called with a `~drms.metrics.RequestMetrics`
+        instance for every completed or failed HTTP request (including
+        retries and file downloads), which contains the phase timings,
+        byte counts and the runtime reported by the server. Exceptions
+        raised by the hook are logged and ignored.
     """
 
-    def __init__(self, server="jsoc"):
+    # Subclasses that send requests without a transport set this to False.
+    _uses_transport = True
+
+    def __init__(
+        self,
+        server="jsoc",
+        *,
+        pool_size=10,
+        idle_timeout=60,
+        stream_rs_list=True,
+        retry_policy=None,
+        coalesce=True,
+        cache=None,
+        transport=None,
+        metrics_hook=None,
+    ):
         if isinstance(server, ServerConfig):
             self._server = server
         else:
             self._server = _server_configs[server.lower()]
+        if transport is None and self._uses_transport:
+            transport = UrllibTransport(maxsize=pool_size, idle_timeout=idle_timeout)
+        self._transport = transport
+        self._pool = getattr(transport, "pool", None)
+        self._stream_rs_list = stream_rs_list
+        self._retry = RetryPolicy() if retry_policy is None else retry_policy
+        self._coalesce = coalesce
+        # Requests of this client that are in flight.
+        self._single_flight = _SingleFlight()
+        self._cache = cache
+        self._metrics_hook = metrics_hook
 
     def __repr__(self):
         return f"<HttpJsonClient: {self._server.name}>"
 
+    def _report_metrics(self, metrics):
+        selector = self._mirror_selector(metrics.url)
+        if selector is not None:
+            selector.observe(metrics, self._retry.is_retryable)
+        if self._metrics_hook is None:
+            return
+        try:
+            self._metrics_hook(metrics)
+        except Exception as e:  # NOQA: BLE001
+            logger.warning(f"Metrics hook failed: {e!r}")
+
     def _json_request(self, url):
         logger.debug(f"URL for request: {url}")
-        return HttpJsonRequest(url, self._server.encoding)
+        url, data = _post_args(url, self._server.max_url_length)
+        return HttpJsonRequest(
+            url,
+            self._server.encoding,
+            decoder=self._server.json_decoder,
+            transport=self._transport,
+            data=data,
+            metrics_hook=self._report_metrics,
+        )
+
+    def _json_data(self, url, *, stream=False, coalesce=True, failover=True, idempotent=True):
+        """
+        Send a request and decode the JSON response, retrying failed
+        requests according to the retry policy.
+
+        Unless ``coalesce`` is False, the request is combined with an
+        identical request that is already in flight. Unless ``failover``
+        is False, the request is repeated on the other mirrors of the
+        server if it fails. If ``idempotent`` is False, the request is
+        only retried if connecting to the server failed.
+        """
+
+        def request(request_url):
+            with self._server.limiter:
+                req = self._json_request(request_url)
+                return req.rs_list_data() if stream else req.data
+
+        def attempt():
+            return self._failover(request, url) if failover else request(url)
+
+        if coalesce and self._coalesce:
+            return self._single_flight.do(url, lambda: self._retry.call(attempt, url))
+        return self._retry.call(attempt, url, idempotent=idempotent)
+
+    def _mirror_selector(self, url):
+        """
+        Get the mirror selector responsible for a URL, or None.
+        """
+        # The download base URL can be a prefix of the CGI base URL, so
+        # the selector with the longest matching base URL is used.
+        matches = [(len(s.match(url) or ""), s) for s in self._server.mirror_selectors()]
+        length, selector = max(matches, key=lambda m: m[0], default=(0, None))
+        return selector if length > 0 else None
+
+    def _mirror_urls(self, url):
+        """
+        URLs of a request on all mirrors of the server, in the order in
+        which they are tried.
+        """
+        selector = self._mirror_selector(url)
+        return [url] if selector is None else selector.candidates(url)
+
+    def _failover(self, func, url):
+        """
+        Call ``func`` with the URL of a request on the fastest healthy
+        mirror, and with the URLs on the other mirrors if that fails.
+        """
+        *urls, last_url = self._mirror_urls(url)
+        for mirror_url in urls:
+            try:
+                return func(mirror_url)
+            except Exception as e:  # NOQA: PERF203
+                if not self._retry.is_retryable(e):
+                    raise
+                logger.info(f"Request to {mirror_url} failed with {e!r}, trying the next mirror")
+        return func(last_url)
+
+    def _cached_json_data(self, url, endpoint):
+        """
+        Like `_json_data`, but use the response cache if there is one.
+        """
+        if self._cache is None:
+            return self._json_data(url)
+        data = self._cache.get(url, endpoint)
+        if data is None:
+            data = self._json_data(url)
+            # Error responses are not cached.
+            if data.get("status", 0) == 0:
+                self._cache.put(url, data)
+        return data
+
+    def _urlopen(self, url, *, timeout=60, kind="download", failover=True):
+        """
+        Open a URL using the transport of this client, failing over to
+        mirrors of the server unless ``failover`` is False.
+
+        The request metrics are reported when the response is closed.
+        """
+        timeout = socket.getdefaulttimeout() or timeout
+
+        def urlopen(request_url):
+            metrics = RequestMetrics(request_url, kind=kind)
+            try:
+                response = self._transport.get(request_url, stream=True, timeout=timeout)
+            except Exception as e:
+                metrics._finish(e)
+                self._report_metrics(metrics)
+                raise
+            return _MeteredResponse(response, metrics, self._report_metrics)
+
+        return self._failover(urlopen, url) if failover else urlopen(url)
+
+    def _export_mirror(self):
+        """
+        Choose the mirror for a new export request.
+
+        Returns the CGI base URL of the fastest healthy mirror and the
+        download base URL of the same mirror, i.e. the download mirror at
+        the same position in the list of mirrors.
+        """
+        cgi_urls = self._server.cgi_mirrors or [self._server.cgi_baseurl]
+        download_urls = self._server.http_download_mirrors or [self._server.http_download_baseurl]
+        selector = self._server.mirror_selector("cgi")
+        cgi_baseurl = cgi_urls[0] if selector is None else selector.ranked()[0]
+        i = cgi_urls.index(cgi_baseurl)
+        return cgi_baseurl, download_urls[i] if len(download_urls) == len(cgi_urls) else download_urls[0]
+
+    def _jsoc_fetch_url(self, base_url=None):
+        """
+        URL of the jsoc_fetch CGI on the mirror with the CGI base URL
+        ``base_url``, or on the primary mirror if it is None.
+        """
+        if base_url is None or self._server.cgi_jsoc_fetch is None:
+            return self._server.url_jsoc_fetch
+        return urljoin(base_url, self._server.cgi_jsoc_fetch)
+
+    def probe_mirrors(self, *, timeout=10):
+        """
+        Measure the latency of all configured mirrors of the server.
+
+        Mirrors are also measured by regular requests, so calling this is
+        optional. It allows to route the first requests to the fastest
+        mirror, though.
+
+        Parameters
+        ----------
+        timeout : float
+            Timeout in seconds for each mirror.
+        """
+        for selector in self._server.mirror_selectors():
+            selector.probe(lambda u: self._transport.get(u, stream=True, timeout=timeout))
 
     @property
     def server(self):
         return self._server
 
+    @property
+    def pool(self):
+        """
+        (`~drms.connection.PoolManager` or None) Keep-alive connection
+        pools, or None if the transport of this client does not use them.
+        """
+        return self._pool
+
+    @property
+    def transport(self):
+        """
+        (`~drms.transport.Transport`) Transport used to send requests.
+        """
+        return self._transport
+
+    @property
+    def metrics_hook(self):
+        """
+        (callable or None) Function that is called with the
+        `~drms.metrics.RequestMetrics` of every request.
+        """
+        return self._metrics_hook
+
+    @metrics_hook.setter
+    def metrics_hook(self, value):
+        self._metrics_hook = value
+
+    @property
+    def limiter(self):
+        """
+        (`~drms.ratelimit.RateLimiter`) Rate limiter of the server, which
+        is shared by all clients using the same server configuration.
+        """
+        return self._server.limiter
+
+    @property
+    def cache(self):
+        """
+        (`ResponseCache` or None) Persistent response cache.
+        """
+        return self._cache
+
+    @property
+    def retry_policy(self):
+        """
+        (`~drms.retry.RetryPolicy`) Policy used to retry failed requests.
+        """
+        return self._retry
+
     def show_series(self, ds_filter=None):
         """
         List available data series.
@@ -110,11 +1197,13 @@ class HttpJsonClient:
         -------
         result : dict
         """
+        return self._cached_json_data(self._show_series_url(ds_filter), "show_series")
+
+    def _show_series_url(self, ds_filter=None):
         query = "?" if ds_filter is not None else ""
         if ds_filter is not None:
             query += urlencode({"filter": ds_filter})
-        req = self._json_request(self._server.url_show_series + query)
-        return req.data
+        return self._server.url_show_series + query
 
     def show_series_wrapper(self, ds_filter=None, *, info=False):
         """
@@ -139,14 +1228,16 @@ class HttpJsonClient:
         -------
         result : dict
         """
+        return self._cached_json_data(self._show_series_wrapper_url(ds_filter, info=info), "show_series_wrapper")
+
+    def _show_series_wrapper_url(self, ds_filter=None, *, info=False):
         query_args = {"dbhost": self._server.show_series_wrapper_dbhost}
         if ds_filter is not None:
             query_args["filter"] = ds_filter
         if info:
             query_args["info"] = "1"
         query = f"?{urlencode(query_args)}"
-        req = self._json_request(self._server.url_show_series_wrapper + query)
-        return req.data
+        return self._server.url_show_series_wrapper + query
 
     def series_struct(self, ds):
         """
@@ -162,9 +1253,11 @@ class HttpJsonClient:
         result : dict
             Dictionary containing information about the data series.
         """
+        return self._cached_json_data(self._series_struct_url(ds), "series_struct")
+
+    def _series_struct_url(self, ds):
         query = f"?{urlencode({'op': 'series_struct', 'ds': ds})}"
-        req = self._json_request(self._server.url_jsoc_info + query)
-        return req.data
+        return self._server.url_jsoc_info + query
 
     def rs_summary(self, ds):
         """
@@ -180,9 +1273,11 @@ class HttpJsonClient:
         result : dict
             Dictionary containing 'count', 'status' and 'runtime'.
         """
+        return self._json_data(self._rs_summary_url(ds))
+
+    def _rs_summary_url(self, ds):
         query = f"?{urlencode({'op': 'rs_summary', 'ds': ds})}"
-        req = self._json_request(self._server.url_jsoc_info + query)
-        return req.data
+        return self._server.url_jsoc_info + query
 
     def rs_list(self, ds, *, key=None, seg=None, link=None, recinfo=False, n=None, uid=None):
         """
@@ -213,6 +1308,10 @@ class HttpJsonClient:
         result : dict
             Dictionary containing the requested record set information.
         """
+        url = self._rs_list_url(ds, key=key, seg=seg, link=link, recinfo=recinfo, n=n, uid=uid)
+        return self._json_data(url, stream=self._stream_rs_list)
+
+    def _rs_list_url(self, ds, *, key=None, seg=None, link=None, recinfo=False, n=None, uid=None):
         if key is None and seg is None and link is None:
             raise ValueError("At least one key, seg or link must be specified")
         d = {"op": "rs_list", "ds": ds}
@@ -229,8 +1328,7 @@ class HttpJsonClient:
         if uid is not None:
             d["userhandle"] = uid
         query = f"?{urlencode(d)}"
-        req = self._json_request(self._server.url_jsoc_info + query)
-        return req.data
+        return self._server.url_jsoc_info + query
 
     def check_address(self, email):
         """
@@ -251,14 +1349,21 @@ class HttpJsonClient:
             - 4: Email address has neither been validated nor registered
             - -2: Not a valid email address
         """
+        return self._json_data(self._check_address_url(email))
+
+    def _check_address_url(self, email):
         query = "?" + urlencode({"address": quote_plus(email), "checkonly": "1"})
-        req = self._json_request(self._server.url_check_address + query)
-        return req.data
+        return self._server.url_check_address + query
 
     def exp_request(self, *args, **kwargs):
         """
         Request data export.
 
+        Every export request creates a new export on the server, so the
+        request is only retried if connecting to the server failed, but
+        not after a timeout or an error response, since the server may
+        have created the export already.
+
         Parameters
         ----------
         ds : str
@@ -292,6 +1397,11 @@ class HttpJsonClient:
             name is determined from the email address. If set to False,
             the requester argument will be omitted in the export
             request.
+        base_url : str or None
+            CGI base URL of the mirror the request is sent to. Default is
+            None, which uses the primary mirror. The request is not
+            repeated on other mirrors, and the status requests and file
+            downloads of the export must use the same mirror.
 
         Returns
         -------
@@ -299,8 +1409,8 @@ class HttpJsonClient:
             Dictionary containing the server response to the export
             request.
         """
-        req = self._json_request(self._exp_request_url(*args, **kwargs))
-        return req.data
+        url = self._exp_request_url(*args, **kwargs)
+        return self._json_data(url, coalesce=False, failover=False, idempotent=False)
 
     def _exp_request_url(
         self,
@@ -314,6 +1424,7 @@ class HttpJsonClient:
         n=None,
         process=None,
         requester=None,
+        base_url=None,
     ):
         method = method.lower()
         method_list = ["url_quick", "url", "url-tar"]
@@ -403,9 +1514,9 @@ class HttpJsonClient:
             d["requester"] = requester
 
         query = "?" + urlencode(d)
-        return self._server.url_jsoc_fetch + query
+        return self._jsoc_fetch_url(base_url) + query
 
-    def exp_status(self, requestid):
+    def exp_status(self, requestid, *, base_url=None):
         """
         Query data export status.
 
@@ -413,12 +1524,281 @@ class HttpJsonClient:
         ----------
         requestid : str
             Request identifier returned by exp_request.
+        base_url : str or None
+            CGI base URL of the mirror that accepted the export request.
+            Default is None, which uses the primary mirror.
 
         Returns
         -------
         result : dict
             Dictionary containing the export request status.
         """
+        return self._json_data(self._exp_status_url(requestid, base_url), failover=False)
+
+    def _exp_status_url(self, requestid, base_url=None):
         query = f"?{urlencode({'op': 'exp_status', 'requestid': requestid})}"
-        req = self._json_request(self._server.url_jsoc_fetch + query)
-        return req.data
+        return self._jsoc_fetch_url(base_url) + query
+
+
+class AsyncHttpJsonClient(HttpJsonClient):
+    """
+    Asynchronous HTTP/JSON communication with the DRMS server CGIs.
+
+    This provides the same requests as `HttpJsonClient`, but all of them
+    are coroutines that use a non-blocking `~drms.connection.AsyncPoolManager`.
+
+    Parameters
+    ----------
+    server : str or drms.config.ServerConfig
+        Registered server ID or ServerConfig instance.
+        Defaults to JSOC.
+    pool_size : int
+        Maximum number of idle keep-alive connections kept open per
+        host. Defaults to 10.
+    idle_timeout : float
+        Number of seconds after which idle keep-alive connections are
+        closed instead of being reused. Defaults to 60 seconds.
+    stream_rs_list : bool
+        If True (default), rs_list responses are decoded with a streaming
+        parser while they are received.
+    retry_policy : `~drms.retry.RetryPolicy` or None
+        Policy used to retry failed requests. If set to None (default), a
+        `~drms.retry.RetryPolicy` with default settings is used.
+    coalesce : bool
+        If True (default), identical requests that are sent concurrently
+        from several tasks using this client are combined into a single
+        request.
+    cache : `ResponseCache` or None
+        Persistent cache for responses that rarely change. If set to None
+        (default), no cache is used.
+    metrics_hook : callable or None
+        Function that is called with a `~drms.metrics.RequestMetrics`
+        instance for every completed or failed HTTP request. The DNS
+        lookup is included in the ``connect`` duration.
+    """
+
+    # Requests are sent with the asynchronous pool manager instead of a
+    # transport.
+    _uses_transport = False
+    # Number of bytes of a streamed rs_list response that are passed to
+    # the parser at once.
+    _feed_size = 1024 * 1024
+
+    def __init__(
+        self,
+        server="jsoc",
+        *,
+        pool_size=10,
+        idle_timeout=60,
+        stream_rs_list=True,
+        retry_policy=None,
+        coalesce=True,
+        cache=None,
+        metrics_hook=None,
+    ):
+        super().__init__(
+            server,
+            pool_size=pool_size,
+            idle_timeout=idle_timeout,
+            stream_rs_list=stream_rs_list,
+            retry_policy=retry_policy,
+            coalesce=coalesce,
+            cache=cache,
+            metrics_hook=metrics_hook,
+        )
+        self._single_flight = _AsyncSingleFlight()
+        self._pool = AsyncPoolManager(maxsize=pool_size, idle_timeout=idle_timeout)
+
+    def __repr__(self):
+        return f"<AsyncHttpJsonClient: {self._server.name}>"
+
+    async def _json_request(self, url, timeout=60, *, parser=None):
+        logger.debug(f"URL for request: {url}")
+        url, data = _post_args(url, self._server.max_url_length)
+        try:
+            headers = {"Accept-Encoding": _accept_encoding}
+            async with await self._open(url, timeout=timeout, headers=headers, data=data, kind="json") as response:
+                # The body is decoded before the response is closed, which
+                # completes the request metrics.
+                metrics = response.metrics
+                if parser is None:
+                    raw_data = await _aread_body(response)
+                    metrics.bytes_decoded = len(raw_data)
+                    # Large responses are decoded without blocking the event loop.
+                    result = await asyncio.to_thread(_loads, raw_data, self._server.encoding, self._server.json_decoder)
+                else:
+                    # The blocks are collected up to _feed_size and parsed in a
+                    # worker thread, which keeps the event loop responsive.
+                    metrics.bytes_decoded = 0
+                    blocks = []
+                    size = 0
+                    async for block in _aiter_body(response):
+                        metrics.bytes_decoded += len(block)
+                        blocks.append(block)
+                        size += len(block)
+                        if size >= self._feed_size:
+                            await asyncio.to_thread(parser.feed, b"".join(blocks))
+                            blocks = []
+                            size = 0
+                    if blocks:
+                        await asyncio.to_thread(parser.feed, b"".join(blocks))
+                    result = await asyncio.to_thread(parser.close)
+                if isinstance(result, dict):
+                    metrics.server_runtime = result.get("runtime")
+        except HTTPError as e:
+            e.msg = f"Failed to open URL: {e.url} with {e.code} - {e.msg}"
+            raise
+        return result
+
+    async def _json_data(self, url, *, stream=False, coalesce=True, failover=True, idempotent=True):
+        """
+        Send a request and decode the JSON response, retrying failed
+        requests according to the retry policy.
+
+        Unless ``coalesce`` is False, the request is combined with an
+        identical request that is already in flight. Unless ``failover``
+        is False, the request is repeated on the other mirrors of the
+        server if it fails. If ``idempotent`` is False, the request is
+        only retried if connecting to the server failed.
+        """
+
+        async def request(request_url):
+            # The streaming parser keeps state, so each attempt needs a new one.
+            parser = _RsListParser(self._server.encoding) if stream else None
+            async with self._server.limiter:
+                return await self._json_request(request_url, parser=parser)
+
+        def attempt():
+            return self._afailover(request, url) if failover else request(url)
+
+        if coalesce and self._coalesce:
+            return await self._single_flight.do(url, lambda: self._retry.acall(attempt, url))
+        return await self._retry.acall(attempt, url, idempotent=idempotent)
+
+    async def _afailover(self, func, url):
+        """
+        Asynchronous version of `_failover`; ``func`` is a coroutine
+        function.
+        """
+        *urls, last_url = self._mirror_urls(url)
+        for mirror_url in urls:
+            try:
+                return await func(mirror_url)
+            except Exception as e:  # NOQA: PERF203
+                if not self._retry.is_retryable(e):
+                    raise
+                logger.info(f"Request to {mirror_url} failed with {e!r}, trying the next mirror")
+        return await func(last_url)
+
+    async def _cached_json_data(self, url, endpoint):
+        """
+        Like `_json_data`, but use the response cache if there is one.
+        """
+        if self._cache is None:
+            return await self._json_data(url)
+        data = self._cache.get(url, endpoint)
+        if data is None:
+            data = await self._json_data(url)
+            if data.get("status", 0) == 0:
+                self._cache.put(url, data)
+        return data
+
+    async def _urlopen(self, url, *, timeout=60, headers=None, data=None, kind="download", failover=True):
+        """
+        Open a URL using the connection pool of this client, failing over
+        to mirrors of the server unless ``failover`` is False.
+
+        The request metrics are reported when the response is closed.
+        """
+        if not failover:
+            return await self._open(url, timeout=timeout, headers=headers, data=data, kind=kind)
+        return await self._afailover(
+            lambda u: self._open(u, timeout=timeout, headers=headers, data=data, kind=kind),
+            url,
+        )
+
+    async def _open(self, url, *, timeout=60, headers=None, data=None, kind="download"):
+        timeout = socket.getdefaulttimeout() or timeout
+        metrics = RequestMetrics(url, method="GET" if data is None else "POST", kind=kind)
+        try:
+            response = await self._pool.urlopen(url, timeout=timeout, headers=headers, data=data)
+        except Exception as e:
+            metrics._finish(e)
+            self._report_metrics(metrics)
+            raise
+        return _AsyncMeteredResponse(response, metrics, self._report_metrics)
+
+    async def probe_mirrors(self, *, timeout=10):
+        """
+        Measure the latency of all configured mirrors of the server.
+
+        See `HttpJsonClient.probe_mirrors`.
+        """
+        for selector in self._server.mirror_selectors():
+            await selector.aprobe(lambda u: self._pool.urlopen(u, timeout=timeout))
+
+    async def show_series(self, ds_filter=None):
+        """
+        List available data series.
+
+        See `HttpJsonClient.show_series`.
+        """
+        return await self._cached_json_data(self._show_series_url(ds_filter), "show_series")
+
+    async def show_series_wrapper(self, ds_filter=None, *, info=False):
+        """
+        List available data series.
+
+        See `HttpJsonClient.show_series_wrapper`.
+        """
+        return await self._cached_json_data(self._show_series_wrapper_url(ds_filter, info=info), "show_series_wrapper")
+
+    async def series_struct(self, ds):
+        """
+        Get information about the content of a data series.
+
+        See `HttpJsonClient.series_struct`.
+        """
+        return await self._cached_json_data(self._series_struct_url(ds), "series_struct")
+
+    async def rs_summary(self, ds):
+        """
+        Get summary (i.e. count) of a given record set.
+
+        See `HttpJsonClient.rs_summary`.
+        """
+        return await self._json_data(self._rs_summary_url(ds))
+
+    async def rs_list(self, ds, *, key=None, seg=None, link=None, recinfo=False, n=None, uid=None):
+        """
+        Get detailed information about a record set.
+
+        See `HttpJsonClient.rs_list`.
+        """
+        url = self._rs_list_url(ds, key=key, seg=seg, link=link, recinfo=recinfo, n=n, uid=uid)
+        return await self._json_data(url, stream=self._stream_rs_list)
+
+    async def check_address(self, email):
+        """
+        Check if an email address is registered for export data requests.
+
+        See `HttpJsonClient.check_address`.
+        """
+        return await self._json_data(self._check_address_url(email))
+
+    async def exp_request(self, *args, **kwargs):
+        """
+        Request data export.
+
+        See `HttpJsonClient.exp_request`.
+        """
+        url = self._exp_request_url(*args, **kwargs)
+        return await self._json_data(url, coalesce=False, failover=False, idempotent=False)
+
+    async def exp_status(self, requestid, *, base_url=None):
+        """
+        Query data export status.
+
+        See `HttpJsonClient.exp_status`.
+        """
+        return await self._json_data(self._exp_status_url(requestid, base_url), failover=False)
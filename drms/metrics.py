@@ -0,0 +1,179 @@
+import time
+
+__all__ = ["RequestMetrics"]
+
+
+class RequestMetrics:
+    """
+    Phase timings and byte counts of a single HTTP request.
+
+    Instances are passed to the ``metrics_hook`` of
+    `~drms.json.HttpJsonClient` (and `~drms.client.Client`) once a
+    request has been completed or has failed. Each retry attempt is
+    reported separately. All durations are in seconds; attributes that
+    were not measured (e.g. DNS and connect timings of reused keep-alive
+    connections or of custom transports) are None.
+
+    Attributes
+    ----------
+    url : str
+        URL of the request.
+    method : str
+        HTTP method, 'GET' or 'POST'.
+    kind : str
+        'json' for DRMS CGI requests and 'download' for file downloads.
+    status : int or None
+        HTTP status code of the response.
+    reused : bool or None
+        Whether a keep-alive connection was reused.
+    dns : float or None
+        Duration of the DNS lookup.
+    connect : float or None
+        Duration of the TCP connect and TLS handshake.
+    ttfb : float or None
+        Time to first byte, i.e. the time from the start of the request
+        until the response headers have been received. This includes
+        ``dns`` and ``connect``, as well as the processing time of the
+        server.
+    transfer : float
+        Time spent receiving the response body.
+    decode : float or None
+        Time spent processing the received body, i.e. decompressing and
+        decoding JSON responses or writing downloaded files.
+    total : float or None
+        Total duration of the request.
+    bytes_received : int
+        Size of the response body as received, before decompression.
+    bytes_decoded : int or None
+        Size of the decompressed JSON response body.
+    server_runtime : float or None
+        Processing time reported by the DRMS server in the ``runtime``
+        field of JSON responses.
+    error : Exception or None
+        Exception raised by the request, if it failed.
+    """
+
+    def __init__(self, url, *, method="GET", kind="json"):
+        self.url = url
+        self.method = method
+        self.kind = kind
+        self.status = None
+        self.reused = None
+        self.dns = None
+        self.connect = None
+        self.ttfb = None
+        self.transfer = 0.0
+        self.decode = None
+        self.total = None
+        self.bytes_received = 0
+        self.bytes_decoded = None
+        self.server_runtime = None
+        self.error = None
+        self._start = time.perf_counter()
+        self._done = False
+
+    def __repr__(self):
+        return f"<RequestMetrics: {self.method} {self.url} {self.status} total={self.total}>"
+
+    def _response(self, response):
+        """
+        Record that the response headers have been received.
+        """
+        self.ttfb = time.perf_counter() - self._start
+        self.status = getattr(response, "status", None)
+        timings = getattr(response, "timings", None) or {}
+        self.reused = timings.get("reused")
+        self.dns = timings.get("dns")
+        self.connect = timings.get("connect")
+
+    def _finish(self, error=None):
+        """
+        Record the end of the request.
+
+        Returns False if the request has already been finished before.
+        """
+        if self._done:
+            return False
+        self._done = True
+        if error is not None and self.error is None:
+            self.error = error
+            if self.status is None:
+                self.status = getattr(error, "code", None)
+        self.total = time.perf_counter() - self._start
+        if self.ttfb is not None:
+            self.decode = max(self.total - self.ttfb - self.transfer, 0.0)
+        return True
+
+    def to_dict(self):
+        """
+        Return the metrics as a dictionary.
+        """
+        return {k: v for k, v in vars(self).items() if not k.startswith("_")}
+
+
+class _MeteredResponse:
+    """
+    Response wrapper that measures the time spent reading the body.
+
+    The metrics are finished and passed to ``callback`` when the
+    response is closed.
+    """
+
+    def __init__(self, response, metrics, callback=None):
+        self._response = response
+        self._callback = callback
+        self.metrics = metrics
+        metrics._response(response)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._close(exc)
+
+    def _close(self, error=None):
+        self._response.close()
+        if self.metrics._finish(error) and self._callback is not None:
+            self._callback(self.metrics)
+
+    def read(self, amt=None):
+        t_start = time.perf_counter()
+        try:
+            data = self._response.read(amt)
+        except Exception as e:
+            self.metrics.error = e
+            raise
+        finally:
+            self.metrics.transfer += time.perf_counter() - t_start
+        self.metrics.bytes_received += len(data)
+        return data
+
+    def close(self):
+        self._close()
+
+
+class _AsyncMeteredResponse(_MeteredResponse):
+    """
+    Asynchronous variant of `_MeteredResponse`.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._close(exc)
+
+    async def read(self, amt=None):
+        t_start = time.perf_counter()
+        try:
+            data = await self._response.read(amt)
+        except Exception as e:
+            self.metrics.error = e
+            raise
+        finally:
+            self.metrics.transfer += time.perf_counter() - t_start
+        self.metrics.bytes_received += len(data)
+        return data
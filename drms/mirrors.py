@@ -0,0 +1,208 @@
+import time
+import threading
+from urllib.error import URLError, HTTPError
+
+from drms import logger
+
+__all__ = ["MirrorSelector"]
+
+
+class MirrorSelector:
+    """
+    Latency-based selection of mirrors with failover.
+
+    A selector tracks the health and the latency (time to first byte) of
+    a set of equivalent base URLs, e.g. the CGI base URLs of a local
+    NetDRMS mirror and of JSOC. Requests are routed to the healthy mirror
+    with the lowest latency, which is tracked as an exponentially
+    weighted moving average. Mirrors without a recent latency
+    measurement are tried first, so that every mirror is measured by
+    regular requests and a mirror that has become faster is noticed. A
+    mirror whose request failed is avoided for ``cooldown`` seconds.
+
+    Selectors are created by `~drms.config.ServerConfig.mirror_selector`
+    and are shared by all clients using the same server configuration.
+
+    Parameters
+    ----------
+    base_urls : list of str
+        Base URLs of the mirrors, in order of preference.
+    alpha : float
+        Weight of a new latency measurement in the moving average.
+        Defaults to 0.3.
+    cooldown : float
+        Number of seconds a failed mirror is avoided. Defaults to 30
+        seconds.
+    max_age : float
+        Latency measurements older than this many seconds are refreshed
+        by routing the next request to the mirror. Defaults to 300
+        seconds.
+    """
+
+    def __init__(self, base_urls, *, alpha=0.3, cooldown=30, max_age=300):
+        if not base_urls:
+            raise ValueError("At least one mirror base URL is required")
+        self._base_urls = list(base_urls)
+        self.alpha = float(alpha)
+        self.cooldown = float(cooldown)
+        self.max_age = float(max_age)
+        self._latency = {}
+        self._measured = {}
+        self._failed_until = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<MirrorSelector: {', '.join(self._base_urls)}>"
+
+    @property
+    def base_urls(self):
+        """
+        (list of str) Base URLs of the mirrors.
+        """
+        return list(self._base_urls)
+
+    def latency(self, base_url):
+        """
+        Moving average of the latency of a mirror in seconds, or None if
+        it has not been measured yet.
+        """
+        return self._latency.get(base_url)
+
+    def is_healthy(self, base_url):
+        """
+        Check if a mirror is not in its cooldown period after a failure.
+        """
+        return time.monotonic() >= self._failed_until.get(base_url, 0)
+
+    def ranked(self):
+        """
+        Return the base URLs in the order in which they are tried.
+
+        Healthy mirrors without a recent latency measurement come first,
+        followed by the other healthy mirrors sorted by latency. Failed
+        mirrors come last, sorted by the end of their cooldown period.
+        """
+        now = time.monotonic()
+        with self._lock:
+
+            def rank(item):
+                i, base_url = item
+                failed_until = self._failed_until.get(base_url, 0)
+                if now < failed_until:
+                    return (2, failed_until, i)
+                measured = self._measured.get(base_url)
+                if measured is None or now - measured >= self.max_age:
+                    return (0, 0, i)
+                return (1, self._latency[base_url], i)
+
+            return [base_url for _, base_url in sorted(enumerate(self._base_urls), key=rank)]
+
+    def match(self, url):
+        """
+        Return the base URL that ``url`` starts with, or None.
+        """
+        for base_url in self._base_urls:
+            if url.startswith(base_url):
+                return base_url
+        return None
+
+    def candidates(self, url):
+        """
+        Return the URLs of a request on all mirrors, in the order in which
+        they are tried.
+
+        Returns an empty list, if ``url`` does not start with one of the
+        mirror base URLs.
+        """
+        base_url = self.match(url)
+        if base_url is None:
+            return []
+        path = url[len(base_url) :]
+        return [f"{mirror}{path}" for mirror in self.ranked()]
+
+    def record_latency(self, base_url, latency):
+        """
+        Record a successful request to a mirror.
+        """
+        with self._lock:
+            previous = self._latency.get(base_url)
+            if previous is None:
+                self._latency[base_url] = latency
+            else:
+                self._latency[base_url] = self.alpha * latency + (1 - self.alpha) * previous
+            self._measured[base_url] = time.monotonic()
+            self._failed_until.pop(base_url, None)
+
+    def record_failure(self, base_url):
+        """
+        Record a failed request to a mirror.
+        """
+        with self._lock:
+            self._failed_until[base_url] = time.monotonic() + self.cooldown
+        logger.info(f"Mirror {base_url} failed, avoiding it for {self.cooldown:.0f} seconds")
+
+    def observe(self, metrics, is_retryable):
+        """
+        Update the mirror statistics from `~drms.metrics.RequestMetrics`.
+
+        Parameters
+        ----------
+        metrics : `~drms.metrics.RequestMetrics`
+            Metrics of a completed or failed request.
+        is_retryable : callable
+            Function that checks if an exception is caused by a transient
+            failure, e.g. `~drms.retry.RetryPolicy.is_retryable`. Other
+            errors do not count as failures of the mirror.
+        """
+        base_url = self.match(metrics.url)
+        if base_url is None:
+            return
+        if metrics.error is not None:
+            if is_retryable(metrics.error):
+                self.record_failure(base_url)
+        elif metrics.ttfb is not None:
+            self.record_latency(base_url, metrics.ttfb)
+
+    def _probe_result(self, base_url, t_start, error=None):
+        if error is None or isinstance(error, HTTPError):
+            # Any HTTP response shows that the mirror is reachable.
+            self.record_latency(base_url, time.perf_counter() - t_start)
+            if error is not None:
+                error.close()
+        else:
+            self.record_failure(base_url)
+
+    def probe(self, urlopen):
+        """
+        Measure the latency of all mirrors by opening their base URLs.
+
+        Parameters
+        ----------
+        urlopen : callable
+            Function that opens a URL and returns a response, which
+            supports the context manager protocol.
+        """
+        for base_url in self._base_urls:
+            t_start = time.perf_counter()
+            try:
+                with urlopen(base_url):
+                    pass
+            except (URLError, OSError) as e:
+                self._probe_result(base_url, t_start, e)
+            else:
+                self._probe_result(base_url, t_start)
+
+    async def aprobe(self, urlopen):
+        """
+        Asynchronous version of `probe`; ``urlopen`` is a coroutine
+        function.
+        """
+        for base_url in self._base_urls:
+            t_start = time.perf_counter()
+            try:
+                async with await urlopen(base_url):
+                    pass
+            except (URLError, OSError) as e:
+                self._probe_result(base_url, t_start, e)
+            else:
+                self._probe_result(base_url, t_start)
@@ -0,0 +1,208 @@
+"""
+Output formats of query results.
+
+By default, `~drms.client.Client.query` returns pandas DataFrames. Other
+formats are selected with its ``output`` argument and are created
+directly from the columns of the server response, without creating a
+DataFrame first:
+
+* 'arrow': `pyarrow.Table` (requires pyarrow)
+* 'polars': `polars.DataFrame` (requires polars)
+* 'numpy': NumPy structured array
+* 'dict': dictionary of NumPy arrays, keyed by column name
+"""
+
+import numpy as np
+import pandas as pd
+
+from .json import _module_available
+from .utils import _to_numeric, to_datetime
+
+__all__ = ["register_output"]
+
+# Integer and floating point keyword types, with the names of their dtypes.
+_int_types = {"short": "int16", "int": "int32", "longlong": "int64"}
+_float_types = {"float": "float32", "double": "float64"}
+
+
+def _numeric_values(values, kind):
+    """
+    Convert the values of a numeric keyword to a pandas Series.
+    """
+    return _to_numeric(pd.Series(values, dtype=object), parse_hex=kind in _int_types)
+
+
+def _time_values(values):
+    """
+    Convert the values of a time keyword to a datetime64 array.
+    """
+    return to_datetime(pd.Series(values, dtype=object), force=True).to_numpy()
+
+
+def _numpy_column(values, kind):
+    """
+    Convert a column to a NumPy array with the dtype of its keyword type.
+
+    NumPy does not support missing integer values, so integer keywords
+    with missing values are returned as float64 with NaNs.
+    """
+    if kind == "time":
+        return _time_values(values)
+    if kind in _float_types:
+        return _numeric_values(values, kind).to_numpy(dtype=_float_types[kind])
+    if kind in _int_types:
+        if len(values) == 0:
+            return np.empty(0, dtype=_int_types[kind])
+        res = _numeric_values(values, kind).to_numpy()
+        if res.dtype.kind == "i":
+            info = np.iinfo(_int_types[kind])
+            if info.min <= res.min() and res.max() <= info.max:
+                return res.astype(_int_types[kind])
+        return res
+    return np.asarray(values, dtype=str)
+
+
+def _numpy_table(names, columns, kinds):
+    arrays = [_numpy_column(values, kind) for values, kind in zip(columns, kinds, strict=True)]
+    res = np.empty(
+        len(arrays[0]) if arrays else 0, dtype=[(name, a.dtype) for name, a in zip(names, arrays, strict=True)]
+    )
+    for name, a in zip(names, arrays, strict=True):
+        res[name] = a
+    return res
+
+
+def _numpy_concat(tables):
+    return np.concatenate([t for t in tables if t.dtype.names] or tables[:1])
+
+
+def _dict_table(names, columns, kinds):
+    return {name: _numpy_column(values, kind) for name, values, kind in zip(names, columns, kinds, strict=True)}
+
+
+def _dict_concat(tables):
+    tables = [t for t in tables if t] or tables[:1]
+    return {name: np.concatenate([t[name] for t in tables]) for name in tables[0]}
+
+
+def _dict_num_rows(table):
+    return len(next(iter(table.values()))) if table else 0
+
+
+def _polars_column(name, values, kind):
+    import polars as pl  # noqa: PLC0415
+
+    if kind in _int_types:
+        # Missing values become nulls. Values that do not fit into the type
+        # of the keyword are kept as int64 or float64.
+        res = pl.Series(name, _numeric_values(values, kind).to_numpy(), nan_to_null=True)
+        try:
+            return res.cast(getattr(pl, _int_types[kind].capitalize()))
+        except pl.exceptions.InvalidOperationError:
+            return res
+    if kind == "time" or kind in _float_types:
+        return pl.Series(name, _numpy_column(values, kind))
+    if kind == "category":
+        return pl.Series(name, values, dtype=pl.Categorical)
+    return pl.Series(name, values, dtype=pl.String)
+
+
+def _polars_table(names, columns, kinds):
+    import polars as pl  # noqa: PLC0415
+
+    return pl.DataFrame([_polars_column(*args) for args in zip(names, columns, kinds, strict=True)])
+
+
+def _polars_concat(tables):
+    import polars as pl  # noqa: PLC0415
+
+    return pl.concat([t for t in tables if t.width > 0] or tables[:1])
+
+
+def _arrow_column(values, kind):
+    import pyarrow as pa  # noqa: PLC0415
+
+    if kind == "time":
+        return pa.array(_time_values(values), from_pandas=True)
+    if kind in _float_types:
+        return pa.array(_numeric_values(values, kind).to_numpy(dtype=_float_types[kind]))
+    if kind in _int_types:
+        # Missing values become nulls. Values that do not fit into the type
+        # of the keyword are kept as int64 or float64.
+        res = pa.array(_numeric_values(values, kind).to_numpy(), from_pandas=True)
+        try:
+            return res.cast(_int_types[kind])
+        except pa.ArrowInvalid:
+            return res
+    if kind == "category":
+        return pa.array(values, type=pa.string()).dictionary_encode()
+    return pa.array(values, type=pa.string())
+
+
+def _arrow_table(names, columns, kinds):
+    import pyarrow as pa  # noqa: PLC0415
+
+    arrays = [_arrow_column(values, kind) for values, kind in zip(columns, kinds, strict=True)]
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _arrow_concat(tables):
+    import pyarrow as pa  # noqa: PLC0415
+
+    # Responses without any records may not contain any columns.
+    return pa.concat_tables([t for t in tables if t.num_columns > 0] or tables[:1])
+
+
+# Registered output formats, see register_output.
+_outputs = {
+    "arrow": (_arrow_table, _arrow_concat, len, "pyarrow"),
+    "dict": (_dict_table, _dict_concat, _dict_num_rows, None),
+    "numpy": (_numpy_table, _numpy_concat, len, None),
+    "polars": (_polars_table, _polars_concat, len, "polars"),
+}
+
+
+def register_output(name, table, concat, *, num_rows=len, module=None):
+    """
+    Register an output format for query results.
+
+    Parameters
+    ----------
+    name : str
+        Name of the format, used as ``output`` argument of
+        `~drms.client.Client.query`.
+    table : callable
+        Function that creates a table from a list of column names, a list
+        of columns and a list of the keyword types of the columns (e.g.
+        'int', 'double' or 'time'). Each column is a list of the strings
+        returned by the server. The type is None for segments, links,
+        record names and keywords that are not converted, and 'category'
+        for string keywords that are encoded as categorical columns (see
+        the ``categorical`` argument of `~drms.client.Client.query`).
+    concat : callable
+        Function that concatenates a list of tables, which is used to
+        combine the chunks of chunked queries.
+    num_rows : callable
+        Function that returns the number of rows of a table. Defaults to
+        `len`.
+    module : str or None
+        Name of a module the format depends on. Using the format raises
+        an ImportError, if the module is not installed.
+    """
+    name = name.lower()
+    if name == "pandas":
+        raise ValueError("The output name 'pandas' is reserved")
+    _outputs[name] = (table, concat, num_rows, module)
+
+
+def _get_output(name):
+    """
+    Get the table, concat and num_rows functions of an output format.
+    """
+    try:
+        table, concat, num_rows, module = _outputs[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown output format: {name}") from None
+    if module is not None and not _module_available(module):
+        raise ImportError(f"Output format {name} requires the {module} package")
+    return table, concat, num_rows
@@ -0,0 +1,224 @@
+import time
+import asyncio
+import threading
+from collections import deque
+
+__all__ = ["RateLimiter"]
+
+
+class _Waiter:
+    """
+    Thread or asyncio task waiting for a `RateLimiter`.
+
+    Threads wait for an event, tasks for a future of their event loop,
+    which is woken from other threads with ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.queued = False
+        self._event = threading.Event() if loop is None else None
+        self._future = None
+
+    def reset(self):
+        if self.loop is None:
+            self._event.clear()
+        else:
+            self._future = self.loop.create_future()
+
+    def wake(self):
+        if self.loop is None:
+            self._event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._set_future, self._future)
+
+    @staticmethod
+    def _set_future(future):
+        if not future.done():
+            future.set_result(None)
+
+    def wait(self, timeout):
+        self._event.wait(timeout)
+
+    async def await_(self, timeout):
+        await asyncio.wait([self._future], timeout=timeout)
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter combined with a limit on concurrent requests.
+
+    Each request takes one token from a bucket that is refilled with
+    ``rate`` tokens per second and holds at most ``burst`` tokens. In
+    addition, at most ``max_in_flight`` requests may be active at the
+    same time. Requests that exceed either limit wait until they are
+    allowed to proceed.
+
+    A limiter is thread-safe and can be used from threads and asyncio
+    tasks at the same time, so that all of them share the same budget.
+    Waiting threads and tasks are queued and start their requests in
+    first-in, first-out order. They are woken when a request finishes,
+    and only sleep on their own while waiting for new tokens.
+    Every `~drms.config.ServerConfig` has its own limiter, see
+    `drms.config.ServerConfig.limiter`.
+
+    Parameters
+    ----------
+    rate : float or None
+        Maximum average number of requests per second. If set to None
+        (default), the request rate is not limited.
+    burst : int or None
+        Maximum number of requests that may be sent at once, after the
+        limiter has been idle. Defaults to ``max(1, rate)``.
+    max_in_flight : int or None
+        Maximum number of concurrent requests. If set to None (default),
+        the number of concurrent requests is not limited.
+    """
+
+    def __init__(self, *, rate=None, burst=None, max_in_flight=None):
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self.configure(rate=rate, burst=burst, max_in_flight=max_in_flight)
+
+    def __repr__(self):
+        return f"<RateLimiter: rate={self.rate}, max_in_flight={self.max_in_flight}>"
+
+    def configure(self, *, rate=None, burst=None, max_in_flight=None):
+        """
+        Change the limits. Requests that are currently active are not
+        affected.
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        with self._lock:
+            self.rate = None if rate is None else float(rate)
+            if burst is None:
+                burst = 1 if rate is None else max(1, rate)
+            self.burst = float(burst)
+            self.max_in_flight = None if max_in_flight is None else int(max_in_flight)
+            self._tokens = self.burst
+            self._updated = time.monotonic()
+            self._wake_next()
+
+    @property
+    def in_flight(self):
+        """
+        (int) Number of currently active requests.
+        """
+        return self._in_flight
+
+    def _try_acquire(self):
+        """
+        Try to start a request.
+
+        Returns the number of seconds to wait before trying again, 0 if
+        the request was started, or None if it has to wait for another
+        request to finish.
+        """
+        if self.max_in_flight is not None and self._in_flight >= self.max_in_flight:
+            return None
+        if self.rate is not None:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self._in_flight += 1
+        return 0
+
+    def _wake_next(self):
+        if self._waiters:
+            self._waiters[0].wake()
+
+    def _next_attempt(self, waiter):
+        """
+        Try to start the request of a waiter, if it is the first one in
+        the queue, and queue it otherwise.
+
+        Returns the number of seconds to wait before trying again, 0 if
+        the request was started, or None if the waiter has to wait until
+        it is woken.
+        """
+        with self._lock:
+            waiter.reset()
+            if self._waiters and self._waiters[0] is not waiter:
+                wait = None
+            else:
+                wait = self._try_acquire()
+                if wait == 0:
+                    if waiter.queued:
+                        self._waiters.popleft()
+                        waiter.queued = False
+                    # The next waiter may be able to start as well.
+                    self._wake_next()
+                    return 0
+            if not waiter.queued:
+                self._waiters.append(waiter)
+                waiter.queued = True
+            return wait
+
+    def _remove(self, waiter):
+        with self._lock:
+            if waiter.queued:
+                first = self._waiters[0] is waiter
+                self._waiters.remove(waiter)
+                waiter.queued = False
+                if first:
+                    self._wake_next()
+
+    def acquire(self):
+        """
+        Wait until a request may be started.
+
+        Every call has to be followed by a call to `release`, once the
+        request has finished. The limiter can also be used as a (async)
+        context manager instead.
+        """
+        waiter = _Waiter()
+        try:
+            while (wait := self._next_attempt(waiter)) != 0:
+                waiter.wait(wait)
+        except BaseException:
+            self._remove(waiter)
+            raise
+
+    async def aacquire(self):
+        """
+        Wait until a request may be started, without blocking the event
+        loop.
+        """
+        waiter = _Waiter(asyncio.get_running_loop())
+        try:
+            while (wait := self._next_attempt(waiter)) != 0:
+                await waiter.await_(wait)
+        except BaseException:
+            self._remove(waiter)
+            raise
+
+    def release(self):
+        """
+        Mark a request as finished.
+        """
+        with self._lock:
+            if self._in_flight <= 0:
+                raise RuntimeError("release() called more often than acquire()")
+            self._in_flight -= 1
+            self._wake_next()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
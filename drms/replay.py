@@ -0,0 +1,273 @@
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from http.client import HTTPMessage
+from urllib.error import HTTPError
+
+from drms import logger
+from .exceptions import DrmsError
+from .transport import Transport, UrllibTransport, _buffered
+
+__all__ = ["RecordReplayTransport"]
+
+
+def _headers(items):
+    headers = HTTPMessage()
+    for k, v in items:
+        headers[k] = v
+    return headers
+
+
+class _RecordingResponse:
+    """
+    Response wrapper that writes the response body to a cassette file
+    while it is read.
+
+    The recorded interaction is only stored once the body has been read
+    completely.
+    """
+
+    def __init__(self, response, transport, key, meta):
+        self._response = response
+        self._transport = transport
+        self._key = key
+        self._meta = meta
+        self._file = tempfile.NamedTemporaryFile(dir=transport.directory, suffix=".tmp", delete=False)
+        self.url = response.url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def __repr__(self):
+        return f"<RecordingResponse: {self.status} {self.url}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def getcode(self):
+        return self.status
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        data = self._response.read(amt)
+        if self._file is not None:
+            self._file.write(data)
+            if not data or amt is None or amt < 0:
+                self._finish()
+        return data
+
+    def _finish(self):
+        f, self._file = self._file, None
+        f.close()
+        self._transport._store(self._key, self._meta, Path(f.name))
+
+    def close(self):
+        if self._file is not None:
+            # The body was not read completely, so nothing is recorded.
+            f, self._file = self._file, None
+            f.close()
+            Path(f.name).unlink(missing_ok=True)
+        self._response.close()
+
+
+class _ReplayResponse:
+    """
+    File-like response that serves a recorded response body.
+    """
+
+    def __init__(self, meta, path, bandwidth):
+        self.url = meta["url"]
+        self.status = meta["status"]
+        self.reason = meta["reason"]
+        self.headers = _headers(meta["headers"])
+        self._file = path.open("rb")
+        self._bandwidth = bandwidth
+
+    def __repr__(self):
+        return f"<ReplayResponse: {self.status} {self.url}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def getcode(self):
+        return self.status
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        data = self._file.read(amt)
+        if self._bandwidth:
+            time.sleep(len(data) / self._bandwidth)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+class RecordReplayTransport(Transport):
+    """
+    Transport that records HTTP responses to a cassette directory and
+    replays them.
+
+    Every request sent through this transport (JSON requests as well as
+    export file downloads) is identified by its method, URL and body. In
+    'record' mode, requests are sent to the server and the responses are
+    saved in the cassette directory. In 'replay' mode, no network access
+    takes place, instead the saved responses are returned, optionally
+    with a simulated latency and bandwidth. This allows to test and
+    profile `~drms.client.Client` code offline and reproducibly.
+
+    Use it by passing an instance as ``transport`` to
+    `~drms.client.Client` or `~drms.json.HttpJsonClient`.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Cassette directory.
+    mode : {'replay', 'record', 'auto'}
+        In 'replay' mode (default), only recorded responses are returned
+        and requests that have not been recorded raise
+        `~drms.exceptions.DrmsError`. In 'record' mode, all requests are
+        sent to the server and recorded, replacing existing recordings.
+        In 'auto' mode, recorded responses are replayed and all other
+        requests are recorded.
+    transport : `~drms.transport.Transport` or None
+        Transport used to send requests in 'record' and 'auto' mode.
+        Defaults to a new `~drms.transport.UrllibTransport`.
+    latency : float
+        Simulated latency in seconds, which is added to every replayed
+        request before the response is returned. Defaults to 0.
+    bandwidth : float or None
+        Simulated bandwidth in bytes per second for reading replayed
+        response bodies. If set to None (default), bodies are returned
+        as fast as possible.
+    """
+
+    _modes = ("replay", "record", "auto")
+
+    def __init__(self, directory, *, mode="replay", transport=None, latency=0, bandwidth=None):
+        if mode not in self._modes:
+            raise ValueError(f"Invalid mode {mode!r}, valid modes are: {', '.join(self._modes)}")
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self._transport = UrllibTransport() if transport is None else transport
+        self.latency = float(latency)
+        self.bandwidth = bandwidth
+        self._lock = threading.Lock()
+        self.num_recorded = 0
+        self.num_replayed = 0
+
+    def __repr__(self):
+        return f"<RecordReplayTransport: {self.mode} {self._directory}>"
+
+    @property
+    def directory(self):
+        """
+        (`pathlib.Path`) Cassette directory.
+        """
+        return self._directory
+
+    @staticmethod
+    def _key(method, url, data):
+        h = hashlib.sha256(f"{method} {url}\n".encode())
+        if data is not None:
+            h.update(data)
+        return h.hexdigest()
+
+    def _paths(self, key):
+        return self._directory / f"{key}.json", self._directory / f"{key}.body"
+
+    def _store(self, key, meta, body_path):
+        meta_path, final_body_path = self._paths(key)
+        body_path.replace(final_body_path)
+        # The meta file is written last, a recording without it is
+        # incomplete and is ignored.
+        with tempfile.NamedTemporaryFile("w", dir=self._directory, suffix=".tmp", delete=False) as f:
+            json.dump(meta, f, indent=1)
+        Path(f.name).replace(meta_path)
+        with self._lock:
+            self.num_recorded += 1
+        logger.debug(f"Recorded response for {meta['request_url']}")
+
+    def _replay(self, key):
+        meta_path, body_path = self._paths(key)
+        meta = json.loads(meta_path.read_text())
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.num_replayed += 1
+        response = _ReplayResponse(meta, body_path, self.bandwidth)
+        if response.status >= 400:
+            raise HTTPError(response.url, response.status, response.reason, response.headers, response)
+        return response
+
+    def _record(self, key, method, url, timeout, headers, data):
+        try:
+            if data is None:
+                response = self._transport.get(url, stream=True, timeout=timeout, headers=headers)
+            else:
+                response = self._transport.post(url, data, stream=True, timeout=timeout, headers=headers)
+        except HTTPError as e:
+            body = e.read() if e.fp is not None else b""
+            with tempfile.NamedTemporaryFile(dir=self._directory, suffix=".tmp", delete=False) as f:
+                f.write(body)
+            meta = {
+                "request_url": url,
+                "method": method,
+                "url": e.url,
+                "status": e.code,
+                "reason": str(e.reason),
+                "headers": list(e.headers.items()) if e.headers is not None else [],
+            }
+            self._store(key, meta, Path(f.name))
+            raise
+        meta = {
+            "request_url": url,
+            "method": method,
+            "url": response.url,
+            "status": response.status,
+            "reason": response.reason,
+            "headers": list(response.headers.items()),
+        }
+        return _RecordingResponse(response, self, key, meta)
+
+    def _open(self, method, url, timeout, headers, data):
+        key = self._key(method, url, data)
+        if self.mode != "record" and self._paths(key)[0].exists():
+            return self._replay(key)
+        if self.mode == "replay":
+            raise DrmsError(f"No recorded response for {method} {url} in {self._directory}")
+        return self._record(key, method, url, timeout, headers, data)
+
+    def get(self, url, *, stream=False, timeout=60, headers=None):
+        """
+        Send a GET request, see `~drms.transport.Transport.get`.
+        """
+        response = self._open("GET", url, timeout, headers, None)
+        return response if stream else _buffered(response)
+
+    def post(self, url, data, *, stream=False, timeout=60, headers=None):
+        """
+        Send a POST request, see `~drms.transport.Transport.post`.
+        """
+        response = self._open("POST", url, timeout, headers, data)
+        return response if stream else _buffered(response)
+
+    def clear(self):
+        """
+        Close idle connections of the underlying transport.
+        """
+        self._transport.clear()
@@ -0,0 +1,360 @@
+import time
+import random
+import socket
+import asyncio
+import threading
+import http.client
+from collections import deque
+from urllib.error import URLError, HTTPError
+from urllib.parse import urlsplit
+
+from drms import logger
+from .exceptions import DrmsCircuitOpenError
+
+__all__ = ["CircuitBreaker", "RetryPolicy"]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a single host.
+
+    After ``threshold`` consecutive failures the circuit opens and all
+    requests fail immediately for ``timeout`` seconds. After that, a
+    single trial request is let through: if it succeeds the circuit
+    closes again, otherwise it stays open for another ``timeout``
+    seconds.
+
+    Parameters
+    ----------
+    threshold : int
+        Number of consecutive failures that open the circuit.
+    timeout : float
+        Number of seconds the circuit stays open.
+    """
+
+    closed = "closed"
+    open = "open"
+    half_open = "half-open"
+
+    def __init__(self, *, threshold=5, timeout=30):
+        self.threshold = int(threshold)
+        self.timeout = float(timeout)
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<CircuitBreaker: {self.state}>"
+
+    @property
+    def state(self):
+        """
+        (str) Current state, either 'closed', 'open' or 'half-open'.
+        """
+        if self._opened_at is None:
+            return self.closed
+        if time.monotonic() - self._opened_at < self.timeout:
+            return self.open
+        return self.half_open
+
+    def allow_request(self):
+        """
+        Check if a request may be sent.
+        """
+        with self._lock:
+            state = self.state
+            if state == self.closed:
+                return True
+            if state == self.half_open and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release_trial(self):
+        """
+        Let another trial request through after the trial request of the
+        half-open state was interrupted, e.g. cancelled, without counting
+        it as a success or a failure.
+        """
+        with self._lock:
+            self._trial_running = False
+
+
+class RetryPolicy:
+    """
+    Retry policy for DRMS HTTP requests.
+
+    Failed requests are retried with exponential backoff, if the failure
+    is likely to be transient: connection errors, timeouts and HTTP
+    status codes listed in ``status_forcelist``. The delay before the
+    n-th retry is ``backoff_factor * 2 ** (n - 1)`` seconds, limited to
+    ``backoff_max`` and randomized by ``jitter``. A ``Retry-After``
+    header sent by the server takes precedence.
+
+    To avoid overloading a struggling server, retries are limited by a
+    retry budget: within a sliding window of 60 seconds, at most
+    ``budget_min`` retries plus ``budget_ratio`` times the number of
+    requests are allowed. In addition, a `CircuitBreaker` is kept for
+    each host, which makes requests fail fast with
+    `~drms.exceptions.DrmsCircuitOpenError` while a host keeps failing.
+
+    Requests that are not idempotent, like export requests, are only
+    retried if connecting to the server failed (see `is_connect_error`),
+    because the server may have processed the request otherwise.
+
+    A policy can be shared by several clients, which then also share the
+    retry budget and circuit breakers.
+
+    Parameters
+    ----------
+    total : int
+        Maximum number of retries per request. Set to 0 to disable
+        retries. Defaults to 3.
+    backoff_factor : float
+        Base delay in seconds. Defaults to 0.5 seconds.
+    backoff_max : float
+        Maximum delay between retries in seconds. Defaults to 30 seconds.
+    jitter : float
+        Fraction of the delay that is randomized, between 0 (no jitter)
+        and 1 (the delay is drawn uniformly between 0 and the backoff
+        value). Defaults to 0.5.
+    status_forcelist : tuple of int
+        HTTP status codes that are retried.
+    budget_ratio : float or None
+        Maximum ratio of retries to requests. If set to None, the retry
+        budget is disabled. Defaults to 0.2.
+    budget_min : int
+        Number of retries per window that are always allowed. Defaults
+        to 10.
+    breaker_threshold : int or None
+        Number of consecutive failures after which the circuit breaker
+        of a host opens. If set to None, no circuit breakers are used.
+        Defaults to 5.
+    breaker_timeout : float
+        Number of seconds a circuit breaker stays open. Defaults to 30
+        seconds.
+    """
+
+    _budget_window = 60
+
+    def __init__(
+        self,
+        *,
+        total=3,
+        backoff_factor=0.5,
+        backoff_max=30,
+        jitter=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        budget_ratio=0.2,
+        budget_min=10,
+        breaker_threshold=5,
+        breaker_timeout=30,
+    ):
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+        self.total = int(total)
+        self.backoff_factor = float(backoff_factor)
+        self.backoff_max = float(backoff_max)
+        self.jitter = float(jitter)
+        self.status_forcelist = tuple(status_forcelist)
+        self.budget_ratio = budget_ratio
+        self.budget_min = int(budget_min)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_timeout = float(breaker_timeout)
+        self._requests = deque()
+        self._retries = deque()
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<RetryPolicy: total={self.total}>"
+
+    def circuit_breaker(self, url):
+        """
+        Get the `CircuitBreaker` for the host of a URL, or None if circuit
+        breakers are disabled.
+        """
+        if self.breaker_threshold is None:
+            return None
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(threshold=self.breaker_threshold, timeout=self.breaker_timeout)
+                self._breakers[key] = breaker
+        return breaker
+
+    def is_retryable(self, exc):
+        """
+        Check if an exception is caused by a transient failure.
+        """
+        if isinstance(exc, HTTPError):
+            return exc.code in self.status_forcelist
+        return isinstance(exc, (URLError, socket.timeout, ConnectionError, http.client.HTTPException))
+
+    @staticmethod
+    def is_connect_error(exc):
+        """
+        Check if an exception is caused by a failure to connect to the
+        server, i.e. the request has not been sent.
+        """
+        if isinstance(exc, URLError) and not isinstance(exc, HTTPError):
+            exc = exc.reason
+        return isinstance(exc, (ConnectionRefusedError, socket.gaierror))
+
+    def backoff(self, retry, exc=None):
+        """
+        Delay in seconds before the given retry (starting at 1).
+        """
+        retry_after = None
+        if isinstance(exc, HTTPError) and exc.headers is not None:
+            try:
+                retry_after = float(exc.headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                pass
+        if retry_after is not None:
+            return min(max(retry_after, 0), self.backoff_max)
+        delay = min(self.backoff_factor * 2 ** (retry - 1), self.backoff_max)
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+    def _prune(self, now):
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self._budget_window:
+                events.popleft()
+
+    def _record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            self._requests.append(now)
+
+    def _acquire_retry(self):
+        """
+        Take a retry from the retry budget, return False if it is exhausted.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            if self.budget_ratio is not None:
+                allowed = self.budget_min + self.budget_ratio * len(self._requests)
+                if len(self._retries) >= allowed:
+                    return False
+            self._retries.append(now)
+            return True
+
+    def _before_attempt(self, url, breaker):
+        if breaker is not None and not breaker.allow_request():
+            raise DrmsCircuitOpenError(f"Circuit breaker for {urlsplit(url).netloc} is open, too many failed requests")
+        self._record_request()
+
+    def _after_failure(self, exc, retry, breaker, idempotent):
+        """
+        Record a failure and return the delay before the next retry, or
+        None if the request should not be retried.
+        """
+        if not self.is_retryable(exc):
+            # The server did respond, so this does not count as a failure
+            # for the circuit breaker.
+            if breaker is not None:
+                breaker.record_success()
+            return None
+        if breaker is not None:
+            breaker.record_failure()
+        if retry > self.total:
+            return None
+        if not idempotent and not self.is_connect_error(exc):
+            logger.info(f"Request failed with {exc!r}, not retrying it, because it is not idempotent")
+            return None
+        if not self._acquire_retry():
+            logger.warning("Retry budget exhausted, not retrying request")
+            return None
+        delay = self.backoff(retry, exc)
+        logger.info(f"Request failed with {exc!r}, retry {retry} of {self.total} in {delay:.1f} seconds")
+        return delay
+
+    def call(self, func, url, *, idempotent=True):
+        """
+        Call ``func`` and retry it according to this policy.
+
+        Parameters
+        ----------
+        func : callable
+            Function without arguments that performs the request.
+        url : str
+            URL of the request, used to select the circuit breaker.
+        idempotent : bool
+            If False, the request is only retried if connecting to the
+            server failed. Default is True.
+
+        Returns
+        -------
+        result
+            Return value of ``func``.
+        """
+        breaker = self.circuit_breaker(url)
+        retry = 0
+        while True:
+            self._before_attempt(url, breaker)
+            try:
+                result = func()
+            except Exception as e:
+                retry += 1
+                delay = self._after_failure(e, retry, breaker, idempotent)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # The request was interrupted, e.g. by KeyboardInterrupt or
+                # by cancelling the task.
+                if breaker is not None:
+                    breaker.release_trial()
+                raise
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+    async def acall(self, func, url, *, idempotent=True):
+        """
+        Await ``func()`` and retry it according to this policy.
+
+        This is the asyncio version of `call`; ``func`` has to return an
+        awaitable.
+        """
+        breaker = self.circuit_breaker(url)
+        retry = 0
+        while True:
+            self._before_attempt(url, breaker)
+            try:
+                result = await func()
+            except Exception as e:
+                retry += 1
+                delay = self._after_failure(e, retry, breaker, idempotent)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # The request was interrupted, e.g. by KeyboardInterrupt or
+                # by cancelling the task.
+                if breaker is not None:
+                    breaker.release_trial()
+                raise
+            if breaker is not None:
+                breaker.record_success()
+            return result
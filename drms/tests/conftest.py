@@ -1,10 +1,18 @@
 import os
+import time
+import gzip
+import json
+import zlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.error import URLError, HTTPError
+from urllib.parse import parse_qsl, urlsplit
 from urllib.request import urlopen
 
 import pytest
 
 import drms
+from drms.config import ServerConfig
 from drms.utils import create_request_with_header
 
 # Test URLs, used to check if a online site is reachable
@@ -87,3 +95,170 @@ def kis_client():
     Client fixture for KIS online tests.
     """
     return drms.Client("kis")
+
+
+class _LocalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, d, status=200):
+        body = json.dumps(d).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        compress = self.server.compress
+        if compress is not None and compress in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body) if compress == "gzip" else zlib.compress(body)
+            self.send_header("Content-Encoding", compress)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._handle(self.path)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode()
+        self._handle(f"{self.path}?{body}", method="POST")
+
+    def _handle(self, path, method="GET"):
+        self.server.num_requests += 1
+        self.server.paths.append(path)
+        self.server.methods.append(method)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        parts = urlsplit(path)
+        if parts.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", "/cgi/jsoc_info?op=rs_summary")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if parts.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.send_error(503)
+            return
+        response = self.server.responses.get(parts.path)
+        if response is None:
+            self._send_json({"status": 0, "path": path, "method": method, "agent": self.headers["User-Agent"]})
+        elif callable(response):
+            self._send_json(response(dict(parse_qsl(parts.query))))
+        else:
+            self._send_json(response)
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    """
+    Local HTTP server for offline tests.
+
+    Requests to paths registered in ``responses`` return the given JSON
+    data (or the result of calling it with the query parameters). All
+    other paths return a JSON document describing the request. JSON
+    responses are compressed, if ``compress`` is set to a content coding
+    ('gzip' or 'deflate') that is accepted by the client. POST requests
+    are handled like GET requests with the form-encoded body as query
+    string, ``paths`` and ``methods`` list all requests. The next
+    ``failures`` requests fail with HTTP status 503. Each response is
+    delayed by ``delay`` seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _LocalHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/"
+        self.responses = {}
+        self.compress = None
+        self.failures = 0
+        self.delay = 0
+        self.paths = []
+        self.methods = []
+        self.num_requests = 0
+        self.num_connections = 0
+
+    def get_request(self):
+        self.num_connections += 1
+        return super().get_request()
+
+
+@pytest.fixture()
+def http_server():
+    """
+    Local HTTP server, see `LocalHTTPServer`.
+    """
+    server = LocalHTTPServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+SERIES_STRUCT = {
+    "status": 0,
+    "primekeys": ["T_REC"],
+    "keywords": [
+        {"name": "T_REC", "type": "time"},
+        {"name": "QUALITY", "type": "int"},
+        {"name": "DATAMEAN", "type": "double"},
+    ],
+    "links": [],
+    "segments": [{"name": "image", "type": "int", "protocol": "fits"}],
+}
+
+RS_LIST = {
+    "status": 0,
+    "count": 2,
+    "keywords": [
+        {"name": "T_REC", "values": ["2014.01.01_00:00:00_TAI", "2014.01.01_00:12:00_TAI"]},
+        {"name": "QUALITY", "values": ["0x00000000", "0x00010000"]},
+        {"name": "DATAMEAN", "values": ["1.5", "MISSING"]},
+    ],
+    "segments": [{"name": "image", "values": ["/SUM1/D1/S00000/image.fits", "/SUM1/D2/S00000/image.fits"]}],
+}
+
+
+@pytest.fixture()
+def local_server(http_server):
+    """
+    `~drms.config.ServerConfig` for a minimal DRMS server on `http_server`.
+    """
+    status = {"n": 0}
+
+    def jsoc_info(q):
+        return SERIES_STRUCT if q["op"] == "series_struct" else RS_LIST
+
+    def jsoc_fetch(q):
+        if q["op"] == "exp_request":
+            return {"status": 2, "requestid": "JSOC_1", "method": "url", "protocol": "as-is", "wait": 0}
+        status["n"] += 1
+        if status["n"] < 2:
+            return {"status": 1, "requestid": "JSOC_1", "wait": 0}
+        return {
+            "status": 0,
+            "requestid": "JSOC_1",
+            "method": "url",
+            "protocol": "as-is",
+            "dir": "/SUM1/D1",
+            "data": [
+                {"record": "hmi.test[2014.01.01_00:00:00_TAI]", "filename": "a.fits"},
+                {"record": "hmi.test[2014.01.01_00:12:00_TAI]", "filename": "b.fits"},
+            ],
+        }
+
+    http_server.responses["/cgi/jsoc_info"] = jsoc_info
+    http_server.responses["/cgi/jsoc_fetch"] = jsoc_fetch
+    http_server.responses["/cgi/checkAddress.sh"] = {"status": 2}
+    return ServerConfig(
+        name="LOCAL",
+        cgi_baseurl=f"{http_server.url}cgi/",
+        cgi_jsoc_info="jsoc_info",
+        cgi_jsoc_fetch="jsoc_fetch",
+        cgi_check_address="checkAddress.sh",
+        http_download_baseurl=http_server.url,
+    )
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import drms
+from drms.connection import AsyncPoolManager
+from drms.exceptions import DrmsExportError
+
+
+def test_async_query(local_server):
+    async def query():
+        c = drms.AsyncClient(local_server)
+        return await c.query("hmi.test[2014.01.01/1h]", key="T_REC, QUALITY, DATAMEAN", seg="image")
+
+    keys, segs = asyncio.run(query())
+    sync_keys, sync_segs = drms.Client(local_server).query(
+        "hmi.test[2014.01.01/1h]",
+        key="T_REC, QUALITY, DATAMEAN",
+        seg="image",
+    )
+    assert keys.equals(sync_keys)
+    assert segs.equals(sync_segs)
+    assert list(keys.QUALITY) == [0, 0x10000]
+    assert keys.DATAMEAN.isna().iloc[1]
+
+
+def test_async_query_parsed_in_thread(local_server):
+    threads = []
+    parse_rs_list = drms.AsyncClient._parse_rs_list
+
+    def parse(lres, **kwargs):
+        threads.append(threading.current_thread())
+        return parse_rs_list(lres, **kwargs)
+
+    async def query():
+        c = drms.AsyncClient(local_server)
+        with patch.object(c, "_parse_rs_list", side_effect=parse):
+            return await c.query("hmi.test[2014.01.01/1h]", key="T_REC")
+
+    res = asyncio.run(query())
+    assert list(res.T_REC) == ["2014.01.01_00:00:00_TAI", "2014.01.01_00:12:00_TAI"]
+    # The DataFrames are not created in the thread of the event loop.
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
+
+
+def test_async_json_client_transport(local_server):
+    c = drms.AsyncClient(local_server)
+    assert c._json.transport is None
+    assert isinstance(c._json.pool, AsyncPoolManager)
+
+
+def test_async_info_cached(local_server, http_server):
+    async def info():
+        c = drms.AsyncClient(local_server)
+        await asyncio.gather(*[c.info("hmi.test") for _ in range(3)])
+        return await c.pkeys("hmi.test[2014.01.01]"), await c.keys("hmi.test")
+
+    pkeys, keys = asyncio.run(info())
+    assert pkeys == ["T_REC"]
+    assert keys == ["T_REC", "QUALITY", "DATAMEAN"]
+
+
+def test_async_export_download(local_server, tmp_path):
+    async def export():
+        c = drms.AsyncClient(local_server, email="test@example.com")
+        r = await c.export("hmi.test[2014.01.01/1h]", method="url", requester=False)
+        assert isinstance(r, drms.AsyncExportRequest)
+        with pytest.raises(DrmsExportError, match="has not finished yet"):
+            _ = r.data
+        assert await r.wait(sleep=0)
+        assert await r.has_succeeded()
+        return await r.download(tmp_path)
+
+    res = asyncio.run(export())
+    assert len(res) == 2
+    assert [p.name for p in res.download] == ["a.fits", "b.fits"]
+    assert all(p.exists() for p in res.download)
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_async_export_download_existing_files(local_server, tmp_path):
+    (tmp_path / "a.fits").write_bytes(b"old")
+    (tmp_path / "a.fits.1.part").write_bytes(b"partial")
+    threads = set()
+    rename_part_file = drms.AsyncExportRequest._rename_part_file
+
+    def rename(fpath_tmp, fpath):
+        threads.add(threading.current_thread())
+        return rename_part_file(fpath_tmp, fpath)
+
+    async def download():
+        c = drms.AsyncClient(local_server, email="test@example.com")
+        r = await c.export("hmi.test[2014.01.01/1h]", method="url", requester=False)
+        await r.wait(sleep=0)
+        with patch.object(drms.AsyncExportRequest, "_rename_part_file", side_effect=rename):
+            return await r.download(tmp_path, index=[0, 0])
+
+    res = asyncio.run(download())
+    assert sorted(p.name for p in map(Path, res.download)) == ["a.fits.1", "a.fits.2"]
+    assert (tmp_path / "a.fits").read_bytes() == b"old"
+    # Existing temporary files are not overwritten.
+    assert (tmp_path / "a.fits.1.part").read_bytes() == b"partial"
+    assert sorted(p.name for p in tmp_path.glob("*.part")) == ["a.fits.1.part"]
+    # The files are renamed in worker threads.
+    assert threading.main_thread() not in threads
@@ -0,0 +1,251 @@
+import time
+import asyncio
+
+import pandas as pd
+import pytest
+
+import drms
+from drms.cache import CoverageCache, QueryCache, _normalize_recset
+from drms.fakeserver import FakeDrmsServer, FakeSeries
+
+
+@pytest.fixture(scope="module")
+def fake_server():
+    series = [FakeSeries("fake.euv_12s", num_records=1000, cadence=12, num_keywords=2)]
+    with FakeDrmsServer(series) as server:
+        yield server
+
+
+def test_normalize_recset():
+    assert _normalize_recset(" Fake.EUV_12s[ 2010.05.01/1h ] [171]{image, spikes}") == (
+        "fake.euv_12s[2010.05.01/1h][171]{image,spikes}"
+    )
+    assert _normalize_recset("fake.a[1], fake.b[2]") == "fake.a[1], fake.b[2]"
+
+
+def test_memory_cache(fake_server):
+    cache = QueryCache(max_entries=2)
+    c = drms.Client(fake_server.config, query_cache=cache)
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    expected = c.query(ds, key="T_REC, QUALITY, KEY01", seg="image")
+    assert cache.stats == {"memory_hits": 0, "disk_hits": 0, "misses": 1, "hits": 0}
+
+    num_requests = fake_server.num_requests
+    res = c.query(" FAKE.euv_12s[2010.05.01/1h] ", key=["KEY01", "T_REC", "QUALITY"], seg="image")
+    assert fake_server.num_requests == num_requests
+    assert cache.stats["memory_hits"] == 1
+    # Columns are returned in the requested order.
+    assert res[0].columns.tolist() == ["KEY01", "T_REC", "QUALITY"]
+    pd.testing.assert_frame_equal(res[0][expected[0].columns], expected[0])
+    pd.testing.assert_frame_equal(res[1], expected[1])
+    # Returned results are copies.
+    res[1]["image"] = ""
+    pd.testing.assert_frame_equal(c.query(ds, key="T_REC, QUALITY, KEY01", seg="image")[1], expected[1])
+
+    # Different arguments are different queries.
+    c.query(ds, key="T_REC, QUALITY, KEY01", seg="image", convert_numeric=False)
+    c.query(ds, key="T_REC", n=5)
+    assert len(cache) == 2
+    assert cache.stats["misses"] == 3
+    c.query(ds, key="T_REC, QUALITY, KEY01", seg="image")
+    assert cache.stats["misses"] == 4
+
+    # Other output formats are not cached.
+    c.query(ds, key="T_REC", n=5, output="dict")
+    assert cache.stats["misses"] == 4
+    assert fake_server.num_requests > num_requests + 3
+
+
+def test_memory_cache_ttl(fake_server):
+    cache = QueryCache(ttl=0.1)
+    c = drms.Client(fake_server.config, query_cache=cache)
+    c.query("fake.euv_12s", key="T_REC", n=5)
+    c.query("fake.euv_12s", key="T_REC", n=5)
+    time.sleep(0.1)
+    c.query("fake.euv_12s", key="T_REC", n=5)
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 0, "misses": 2, "hits": 1}
+    cache.reset_stats()
+    assert cache.stats["misses"] == 0
+
+
+def test_disk_cache(fake_server, tmp_path):
+    pytest.importorskip("pyarrow")
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    c = drms.Client(fake_server.config, query_cache=QueryCache(tmp_path))
+    expected = c.query(ds, key="T_REC, QUALITY, KEY01", typed=True, categorical=True, rec_index=True)
+    typed = c.query(ds, key="T_REC, KEY01", seg="image", typed=True)
+
+    # A new cache with the same directory reads the Parquet files.
+    cache = QueryCache(tmp_path)
+    c = drms.Client(fake_server.config, query_cache=cache)
+    num_requests = fake_server.num_requests
+    res = c.query(ds, key="T_REC, QUALITY, KEY01", typed=True, categorical=True, rec_index=True)
+    pd.testing.assert_frame_equal(res, expected)
+    res = c.query(ds, key="T_REC, KEY01", seg="image", typed=True)
+    pd.testing.assert_frame_equal(res[0], typed[0])
+    pd.testing.assert_frame_equal(res[1], typed[1])
+    assert fake_server.num_requests == num_requests
+    assert cache.stats["disk_hits"] == 2
+    c.query(ds, key="T_REC, QUALITY, KEY01", typed=True, categorical=True, rec_index=True)
+    assert cache.stats["memory_hits"] == 1
+
+    cache.clear()
+    assert list(tmp_path.iterdir()) == []
+    c.query(ds, key="T_REC", n=5)
+    assert cache.stats["misses"] == 1
+
+
+def test_disk_cache_limits(fake_server, tmp_path):
+    pytest.importorskip("pyarrow")
+    cache = QueryCache(tmp_path, max_entries=0, disk_ttl=0.2, max_size=0)
+    c = drms.Client(fake_server.config, query_cache=cache)
+    c.query("fake.euv_12s", key="T_REC", n=5)
+    # Results that exceed max_size are not kept.
+    assert list(tmp_path.iterdir()) == []
+
+    cache.max_size = 10**6
+    c.query("fake.euv_12s", key="T_REC", n=5)
+    c.query("fake.euv_12s", key="T_REC", n=5)
+    time.sleep(0.2)
+    c.query("fake.euv_12s", key="T_REC", n=5)
+    assert cache.stats == {"memory_hits": 0, "disk_hits": 1, "misses": 3, "hits": 1}
+
+
+def test_async_query_cache(fake_server):
+    cache = QueryCache()
+    c = drms.AsyncClient(fake_server.config, query_cache=cache)
+
+    async def run():
+        return [await c.query("fake.euv_12s", key="T_REC", n=5) for _ in range(2)]
+
+    res = asyncio.run(run())
+    pd.testing.assert_frame_equal(res[0], res[1])
+    assert cache.stats["hits"] == 1
+
+
+def test_coverage_cache(fake_server):
+    cache = CoverageCache()
+    c = drms.Client(fake_server.config, coverage_cache=cache)
+    plain = drms.Client(fake_server.config)
+    c.query("fake.euv_12s[2010.05.01_00:00/1h]", key="QUALITY, KEY01", seg="image")
+    c.query("fake.euv_12s[2010.05.01_02:00/30m]", key="KEY01, QUALITY", seg="image")
+    assert cache.stats == {"records_returned": 450, "records_fetched": 450}
+    assert len(cache) == 1
+
+    # Only the gap between the cached time ranges is requested.
+    ds = "fake.euv_12s[2010.05.01_00:30/2h]"
+    num_requests = fake_server.num_requests
+    res = c.query(ds, key="QUALITY, KEY01", seg="image")
+    assert fake_server.num_requests == num_requests + 1
+    assert cache.stats == {"records_returned": 1050, "records_fetched": 750}
+    expected = plain.query(ds, key="QUALITY, KEY01", seg="image")
+    pd.testing.assert_frame_equal(res[0], expected[0])
+    pd.testing.assert_frame_equal(res[1], expected[1])
+
+    # Covered time ranges are returned without requests.
+    ds = "fake.euv_12s[2010.05.01_00:10/2h]"
+    expected = plain.query(ds, key="KEY01, QUALITY", seg="image")
+    num_requests = fake_server.num_requests
+    res = c.query(ds, key="KEY01, QUALITY", seg="image")
+    assert fake_server.num_requests == num_requests
+    pd.testing.assert_frame_equal(res[0], expected[0])
+    pd.testing.assert_frame_equal(res[1], expected[1])
+
+    # Other keywords and typed queries are cached separately.
+    pd.testing.assert_frame_equal(c.query(ds, key="T_REC"), plain.query(ds, key="T_REC"))
+    res = c.query(ds, key="QUALITY, KEY01", typed=True)
+    pd.testing.assert_frame_equal(res, plain.query(ds, key="QUALITY, KEY01", typed=True))
+    assert len(cache) == 3
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_coverage_cache_limits(fake_server):
+    cache = CoverageCache(ttl=0.1, max_records=400)
+    c = drms.Client(fake_server.config, coverage_cache=cache)
+    c.query("fake.euv_12s[2010.05.01/1h]", key="T_REC")
+    c.query("fake.euv_12s[2010.05.01/1h]", key="KEY01")
+    # The least recently used record set is removed.
+    assert len(cache) == 1
+    time.sleep(0.1)
+    cache.reset_stats()
+    res = c.query("fake.euv_12s[2010.05.01/1h]", key="KEY01", rec_index=True, chunk_records=100)
+    assert cache.stats == {"records_returned": 300, "records_fetched": 300}
+    pd.testing.assert_frame_equal(
+        res, drms.Client(fake_server.config).query("fake.euv_12s[2010.05.01/1h]", key="KEY01", rec_index=True)
+    )
+
+
+def test_async_coverage_cache(fake_server):
+    cache = CoverageCache()
+    c = drms.AsyncClient(fake_server.config, coverage_cache=cache)
+
+    async def run():
+        await c.query("fake.euv_12s[2010.05.01_01:00/1h]", key="T_REC")
+        return await c.query("fake.euv_12s[2010.05.01/3h]", key="T_REC", chunk_records=100)
+
+    res = asyncio.run(run())
+    pd.testing.assert_frame_equal(
+        res, drms.Client(fake_server.config).query("fake.euv_12s[2010.05.01/3h]", key="T_REC")
+    )
+    assert cache.stats == {"records_returned": 1200, "records_fetched": 900}
+
+
+def test_coverage_cache_add():
+    cache = CoverageCache()
+    t0, t1, t2 = pd.to_datetime(["2010.05.01_00:00", "2010.05.01_01:00", "2010.05.01_02:00"], format="%Y.%m.%d_%H:%M")
+    cache.add("k", [(t0, t1)], (pd.DataFrame({"A": [0, 1]}),), [t0, t0 + (t1 - t0) / 2])
+    gaps = cache.missing("k", t0, t2)
+    assert gaps == [(t1, t2)]
+
+    # The records are removed between looking up and adding the missing
+    # time ranges, so only the fetched time range is cached.
+    cache.clear()
+    cache.add("k", gaps, (pd.DataFrame({"A": [2]}),), [t1])
+    assert cache.missing("k", t0, t2) == [(t0, t1)]
+    assert cache.select("k", t0, t2) is None
+    assert cache.select("k", t1, t2)[0]["A"].tolist() == [2]
+
+
+def test_coverage_cache_evicted(fake_server):
+    class EvictingCache(CoverageCache):
+        def missing(self, key, start, end):
+            gaps = super().missing(key, start, end)
+            self.clear()
+            return gaps
+
+    cache = EvictingCache()
+    c = drms.Client(fake_server.config, coverage_cache=cache)
+    c.query("fake.euv_12s[2010.05.01_00:00/1h]", key="T_REC, KEY01")
+    ds = "fake.euv_12s[2010.05.01_00:00/2h]"
+    pd.testing.assert_frame_equal(
+        c.query(ds, key="T_REC, KEY01"), drms.Client(fake_server.config).query(ds, key="T_REC, KEY01")
+    )
+    # Only the time range that was fetched after the removal is cached.
+    assert [len(c.times) for c in cache._coverages.values()] == [300]
+
+
+def test_coverage_add_missing_times():
+    cache = CoverageCache()
+    time_range = drms.Client._split_time_range("fake.euv_12s[2010.05.01/1h]")
+    _, start, end, _, _ = time_range
+    res = pd.DataFrame({"T_REC": ["2010.05.01_00:00:00_TAI", "MISSING"], "KEY01": [1, 2]})
+    # Results with missing prime key times are returned, but not cached.
+    frames = drms.Client._coverage_add(cache, "k", time_range, [(start, end)], "T_REC", [res])
+    pd.testing.assert_frame_equal(frames[0], res)
+    assert len(cache) == 0
+    mid = start + (end - start) / 2
+    assert drms.Client._coverage_add(cache, "k", time_range, [(start, mid)], "T_REC", [res]) is None
+
+
+def test_coverage_cache_skip_conversion(fake_server):
+    cache = CoverageCache()
+    c = drms.Client(fake_server.config, coverage_cache=cache)
+    plain = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    for skip_conversion in (None, "KEY01", None):
+        for typed in (True, False):
+            kwargs = {"key": "T_REC, KEY01", "typed": typed, "skip_conversion": skip_conversion}
+            pd.testing.assert_frame_equal(c.query(ds, **kwargs), plain.query(ds, **kwargs))
+    # Typed records are cached for each skip_conversion value.
+    assert len(cache) == 3
@@ -0,0 +1,124 @@
+import json
+import asyncio
+from urllib.error import HTTPError
+
+import pytest
+
+from drms.config import ServerConfig
+from drms.connection import AsyncPoolManager, ConnectionPool, PoolManager
+from drms.json import AsyncHttpJsonClient, HttpJsonClient
+
+
+def test_pool_manager_reuses_connections(http_server):
+    pm = PoolManager()
+    for i in range(5):
+        with pm.urlopen(f"{http_server.url}cgi/jsoc_info?i={i}") as r:
+            assert json.loads(r.read())["path"] == f"/cgi/jsoc_info?i={i}"
+    assert http_server.num_requests == 5
+    assert http_server.num_connections == 1
+    assert len(pm._pools) == 1
+    assert pm.connection_pool(http_server.url).num_idle == 1
+
+
+def test_pool_manager_user_agent(http_server):
+    pm = PoolManager()
+    agent = json.loads(pm.urlopen(http_server.url).read())["agent"]
+    assert "drms/" in agent
+    assert "python/" in agent
+
+
+def test_pool_manager_redirect(http_server):
+    pm = PoolManager()
+    r = pm.urlopen(f"{http_server.url}redirect")
+    assert r.url.endswith("/cgi/jsoc_info?op=rs_summary")
+    assert json.loads(r.read())["path"] == "/cgi/jsoc_info?op=rs_summary"
+    assert http_server.num_connections == 1
+
+
+def test_pool_manager_http_error(http_server):
+    pm = PoolManager()
+    with pytest.raises(HTTPError) as e:
+        pm.urlopen(f"{http_server.url}missing")
+    assert e.value.code == 404
+
+
+def test_pool_idle_timeout(http_server):
+    pm = PoolManager(idle_timeout=0)
+    for _ in range(3):
+        pm.urlopen(http_server.url).read()
+    assert http_server.num_connections == 3
+
+
+def test_pool_unread_response_not_reused(http_server):
+    pm = PoolManager()
+    r = pm.urlopen(http_server.url)
+    r.close()
+    assert pm.connection_pool(http_server.url).num_idle == 0
+
+
+def test_pool_maxsize():
+    pool = ConnectionPool("http", "localhost", maxsize=1)
+    pool._put_conn(pool._new_conn(1))
+    pool._put_conn(pool._new_conn(1))
+    assert pool.num_idle == 1
+    pool.clear()
+    assert pool.num_idle == 0
+
+
+def test_pool_invalid_scheme():
+    with pytest.raises(ValueError, match="Unsupported URL scheme"):
+        ConnectionPool("ftp", "localhost")
+
+
+def test_json_client_uses_pool(http_server):
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+    c = HttpJsonClient(cfg, pool_size=2, idle_timeout=30)
+    assert c.pool.maxsize == 2
+    assert c.pool.idle_timeout == 30
+    for _ in range(3):
+        assert c.rs_summary("hmi.v_45s")["status"] == 0
+    assert http_server.num_connections == 1
+
+
+def test_async_pool_manager_reuses_connections(http_server):
+    async def fetch_all():
+        pm = AsyncPoolManager()
+        paths = []
+        for i in range(5):
+            async with await pm.urlopen(f"{http_server.url}cgi/jsoc_info?i={i}") as r:
+                paths.append(json.loads(await r.read())["path"])
+        pm.clear()
+        return paths
+
+    paths = asyncio.run(fetch_all())
+    assert paths == [f"/cgi/jsoc_info?i={i}" for i in range(5)]
+    assert http_server.num_connections == 1
+
+
+def test_async_pool_manager_redirect_and_error(http_server):
+    async def fetch():
+        pm = AsyncPoolManager()
+        r = await pm.urlopen(f"{http_server.url}redirect")
+        data = json.loads(await r.read())
+        with pytest.raises(HTTPError) as e:
+            await pm.urlopen(f"{http_server.url}missing")
+        pm.clear()
+        return r.url, data, e.value.code
+
+    url, data, code = asyncio.run(fetch())
+    assert url.endswith("/cgi/jsoc_info?op=rs_summary")
+    assert data["path"] == "/cgi/jsoc_info?op=rs_summary"
+    assert code == 404
+
+
+def test_async_json_client_concurrent(http_server):
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+
+    async def fetch_all():
+        c = AsyncHttpJsonClient(cfg)
+        return await asyncio.gather(*[c.rs_summary(f"hmi.v_45s[{i}]") for i in range(10)])
+
+    res = asyncio.run(fetch_all())
+    assert len(res) == 10
+    assert all(r["status"] == 0 for r in res)
+    assert http_server.num_requests == 10
@@ -5,7 +5,13 @@ import drms
 
 @pytest.mark.parametrize(
     "exception_class",
-    [drms.DrmsError, drms.DrmsQueryError, drms.DrmsExportError, drms.DrmsOperationNotSupported],
+    [
+        drms.DrmsError,
+        drms.DrmsQueryError,
+        drms.DrmsExportError,
+        drms.DrmsOperationNotSupported,
+        drms.DrmsCircuitOpenError,
+    ],
 )
 def test_exception_class(exception_class):
     with pytest.raises(RuntimeError):
@@ -0,0 +1,85 @@
+import pytest
+
+import drms
+from drms.fakeserver import FakeDrmsServer, FakeSeries
+from drms.retry import RetryPolicy
+
+
+@pytest.fixture()
+def fake_server():
+    series = [
+        FakeSeries("fake.m_720s", num_records=240, cadence=720, start="2014.01.01_00:00:00_TAI"),
+        FakeSeries("fake.v_45s", num_records=50, cadence=45, segments=("Dopplergram", "magnetogram")),
+    ]
+    with FakeDrmsServer(series, file_size=100) as server:
+        yield server
+
+
+def test_series_select():
+    s = FakeSeries("fake.a", num_records=100, cadence=60, start="2010.01.01_00:00:00_TAI")
+    assert s.select("") == range(100)
+    assert s.select("$") == range(99, 100)
+    assert s.select("2010.01.01_00:10:00_TAI") == range(10, 11)
+    assert s.select("2010.01.01_00:10:30_TAI") == range(11, 11)
+    assert s.select("2010.01.01_00:10/30m") == range(10, 40)
+    assert s.select("2010.01.01_00:10/30m@5m") == range(10, 40, 5)
+    assert s.select("2009.12.31/2d") == range(100)
+    with pytest.raises(ValueError, match="Invalid time string"):
+        s.select("yesterday")
+
+
+def test_fake_series_info(fake_server):
+    c = drms.Client(fake_server.config)
+    assert c.series() == ["fake.m_720s", "fake.v_45s"]
+    assert c.series(r"v_45s", full=True).note[0] == "Synthetic series fake.v_45s"
+    assert list(c.series(r"m_720s", full=True).name) == ["fake.m_720s"]
+    si = c.info("fake.v_45s")
+    assert si.primekeys == ["T_REC"]
+    assert list(si.segments.index) == ["Dopplergram", "magnetogram"]
+    assert c.keys("fake.m_720s")[:3] == ["T_REC", "QUALITY", "KEY01"]
+    with pytest.raises(drms.DrmsQueryError, match="Unknown series"):
+        c.info("fake.foo")
+
+
+def test_fake_query(fake_server):
+    c = drms.Client(fake_server.config)
+    keys, segs = c.query("fake.m_720s[2014.01.01/1h]", key="T_REC, QUALITY, KEY01", seg="image", rec_index=True)
+    assert len(keys) == 5
+    assert keys.index[0] == "fake.m_720s[2014.01.01_00:00:00_TAI]"
+    assert keys.T_REC.iloc[-1] == "2014.01.01_00:48:00_TAI"
+    assert keys.QUALITY.dtype.kind == "i"
+    assert keys.KEY01.dtype.kind == "f"
+    assert segs.image.iloc[0] == "/SUM0/D1000/S00000/image.fits"
+    assert len(c.query("fake.m_720s[2014.01.01/1d@2h]", key="T_REC")) == 12
+    assert len(c.query("fake.m_720s", key="T_REC", n=-3)) == 3
+    assert len(c.query("fake.m_720s", key="**ALL**", n=2).columns) == 10
+    assert c._json.rs_summary("fake.m_720s[2014.01.02/1d]")["count"] == 120
+
+
+def test_fake_export(fake_server, tmp_path):
+    c = drms.Client(fake_server.config, email="test@example.com")
+    r = c.export("fake.v_45s[2010.05.01_00:00/3m]{Dopplergram}", method="url", protocol="fits")
+    assert r.status == 2
+    assert r.wait(sleep=0)
+    assert len(r.urls) == 4
+    res = r.download(tmp_path)
+    assert str(res.download[0]).endswith("fake.v_45s.20100501_000000_TAI.Dopplergram.fits")
+    assert [len(open(p, "rb").read()) for p in res.download] == [100] * 4
+
+    r = c.export("fake.v_45s[2010.05.01_00:00/3m]", method="url_quick", protocol="as-is")
+    assert r.status == 0
+    assert len(r.urls) == 8
+    assert r.urls.url[0] == f"{fake_server.url}SUM0/D1000/S00000/Dopplergram.fits"
+
+
+def test_fake_error_injection_and_latency():
+    with FakeDrmsServer(num_records=10, error_rate=0.5, latency=0.01, seed=1) as server:
+        c = drms.Client(server.config, retry_policy=RetryPolicy(total=10, backoff_factor=0, budget_min=100))
+        for _ in range(5):
+            assert c.query("fake.series1", key="T_REC").shape == (10, 1)
+        assert server.num_requests > 6
+
+
+def test_fake_server_main_args():
+    with pytest.raises(SystemExit):
+        drms.fakeserver.main(["--help"])
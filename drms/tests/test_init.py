@@ -11,9 +11,16 @@ import drms
         "__bibtex__",
         "__citation__",
         "__version__",
+        "AsyncClient",
+        "AsyncExportRequest",
+        "AsyncHttpJsonClient",
+        "cache",
+        "CircuitBreaker",
         "client",
         "Client",
         "config",
+        "CoverageCache",
+        "DrmsCircuitOpenError",
         "DrmsError",
         "DrmsExportError",
         "DrmsOperationNotSupported",
@@ -22,14 +29,35 @@ import drms
         "ExportRequest",
         "HttpJsonClient",
         "HttpJsonRequest",
+        "HttpxTransport",
         "JsocInfoConstants",
         "json",
         "main",
+        "metrics",
+        "mirrors",
+        "MirrorSelector",
+        "output",
         "Path",
+        "QueryCache",
+        "ratelimit",
+        "RateLimiter",
+        "RecordReplayTransport",
+        "register_json_decoder",
+        "register_output",
         "register_server",
+        "replay",
+        "RequestMetrics",
+        "ResponseCache",
+        "retry",
+        "RetryPolicy",
         "SeriesInfo",
+        "set_json_decoder",
         "ServerConfig",
         "to_datetime",
+        "transport",
+        "Transport",
+        "Urllib3Transport",
+        "UrllibTransport",
         "utils",
         "version",
     ],
@@ -1,9 +1,35 @@
+import os
+import math
+import gzip
+import time
+import zlib
+import asyncio
+import threading
+import json as _json
+from urllib.error import HTTPError
 from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
+import drms.json as drms_json
 from drms.client import Client
-from drms.json import HttpJsonRequest, JsocInfoConstants
+from drms.config import ServerConfig
+from drms.connection import PoolManager
+from drms.json import (
+    AsyncHttpJsonClient,
+    HttpJsonClient,
+    HttpJsonRequest,
+    JsocInfoConstants,
+    ResponseCache,
+    _decompressor,
+    _get_json_decoder,
+    _loads,
+    _stdlib_decoder,
+    register_json_decoder,
+    set_json_decoder,
+)
+from drms.retry import RetryPolicy
 
 
 @pytest.mark.remote_data()
@@ -22,4 +48,406 @@ def test_request_headers():
     assert actual_request.headers["User-agent"]
     assert "drms/" in actual_request.headers["User-agent"]
     assert "python/" in actual_request.headers["User-agent"]
+    assert "gzip" in actual_request.headers["Accept-encoding"]
     assert actual_request.full_url == "http://example.com"
+
+
+@pytest.mark.parametrize(
+    ("encoding", "compress"),
+    [
+        ("gzip", gzip.compress),
+        ("deflate", zlib.compress),
+        ("deflate", lambda d: zlib.compress(d)[2:-4]),  # raw deflate stream
+    ],
+)
+def test_decompressor(encoding, compress):
+    data = b'{"keywords": [' + b'"2014.01.01_00:00:00_TAI", ' * 1000 + b"]}"
+    decomp = _decompressor(encoding)
+    compressed = compress(data)
+    res = b"".join(decomp.decompress(compressed[i : i + 100]) for i in range(0, len(compressed), 100))
+    assert res + decomp.flush() == data
+
+
+def test_decompressor_identity():
+    assert _decompressor(None) is None
+    assert _decompressor("identity") is None
+    with pytest.raises(ValueError, match="Unsupported content encoding"):
+        _decompressor("br")
+
+
+@pytest.mark.parametrize("compress", ["gzip", "deflate"])
+def test_compressed_response(http_server, compress):
+    http_server.compress = compress
+    http_server.responses["/cgi/jsoc_info"] = {"status": 0, "values": ["MISSING"] * 1000}
+    req = HttpJsonRequest(f"{http_server.url}cgi/jsoc_info", "latin1", pool=PoolManager())
+    assert req.data == {"status": 0, "values": ["MISSING"] * 1000}
+
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+    res = asyncio.run(AsyncHttpJsonClient(cfg).rs_summary("hmi.v_45s"))
+    assert res == {"status": 0, "values": ["MISSING"] * 1000}
+
+
+@pytest.mark.parametrize("decoder", ["json", "orjson", "msgspec"])
+@pytest.mark.parametrize("encoding", ["latin1", "utf-8"])
+def test_json_decoders(decoder, encoding):
+    if decoder != "json":
+        pytest.importorskip(decoder)
+    d = {
+        "status": 0,
+        "runtime": 0.012,
+        "keywords": [{"name": "OBS", "values": ["Bogart", "Hoeksema", "\u00e9t\u00e9"]}],
+    }
+    raw = _json.dumps(d, ensure_ascii=False).encode(encoding)
+    assert _loads(raw, encoding, decoder) == d
+    assert _loads(_json.dumps(d).encode(encoding), encoding, decoder) == d
+
+
+def test_json_decoder_fallback():
+    pytest.importorskip("orjson")
+    # orjson rejects NaN literals, which the standard library accepts.
+    assert math.isnan(_loads(b'{"value": NaN}', "latin1", "orjson")["value"])
+
+
+def test_json_decoder_unknown():
+    with pytest.raises(ValueError, match="Unknown JSON decoder: foo"):
+        _get_json_decoder("foo")
+    with pytest.raises(ValueError, match="Unknown JSON decoder: foo"):
+        set_json_decoder("foo")
+
+
+def test_register_json_decoder(http_server):
+    calls = []
+
+    def decoder(raw_data, encoding):
+        calls.append(encoding)
+        return _stdlib_decoder(raw_data, encoding)
+
+    register_json_decoder("custom", decoder)
+    try:
+        cfg = ServerConfig(
+            name="LOCAL",
+            cgi_baseurl=f"{http_server.url}cgi/",
+            cgi_jsoc_info="jsoc_info",
+            json_decoder="custom",
+        )
+        assert HttpJsonClient(cfg).rs_summary("hmi.v_45s")["status"] == 0
+        assert calls == ["latin1"]
+
+        set_json_decoder("custom")
+        assert _get_json_decoder() is decoder
+    finally:
+        set_json_decoder("auto")
+        del drms_json._json_decoders["custom"]
+    with pytest.raises(ValueError, match="reserved"):
+        register_json_decoder("auto", decoder)
+
+
+RS_LIST = {
+    "keywords": [
+        {"name": "T_REC", "values": ["2014.01.01_00:00:00_TAI", "2014.01.01_00:12:00_TAI", "MISSING"]},
+        {"name": "COMMENT", "values": ['a "quoted", text', "],", '\\",', "été", None]},
+        {"name": "EMPTY", "values": []},
+    ],
+    "segments": [{"name": "image", "values": ["/SUM1/D1/S00000/image.fits"], "dims": ["4096x4096"]}],
+    "links": [],
+    "recinfo": [{"name": "hmi.M_720s[2014.01.01_00:00:00_TAI][2]", "online": 1}],
+    "count": 3,
+    "runtime": 0.025,
+    "status": 0,
+}
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("blocksize", [1, 3, 17, 1_000_000])
+def test_rs_list_parser(indent, blocksize):
+    raw = _json.dumps(RS_LIST, indent=indent, ensure_ascii=False).encode("latin1")
+    parser = drms_json._RsListParser("latin1")
+    for i in range(0, len(raw), blocksize):
+        parser.feed(raw[i : i + blocksize])
+    assert parser.close() == RS_LIST
+
+
+def test_rs_list_parser_batch_fallback():
+    # The last string terminator before the end of the array is inside the
+    # last value, so every batch ends inside a string and cannot be decoded.
+    values = [str(i) for i in range(1000)] + ['quoted ", text']
+    raw = _json.dumps({"keywords": [{"name": "A", "values": values}], "status": 0}).encode("latin1")
+    parser = drms_json._RsListParser("latin1")
+    with patch.object(drms_json._json, "loads", wraps=_json.loads) as loads:
+        parser.feed(raw)
+        assert parser.close()["keywords"][0]["values"] == values
+    # The batch is not retried for every value.
+    assert loads.call_count <= 2
+
+
+@pytest.mark.parametrize(
+    ("raw", "match"),
+    [
+        (b'{"status": 0, "keywords": [{"name": "A", "values": ["a", "b"', "Unexpected end"),
+        (b'{"status": 0} {', "Extra data"),
+        (b"<html></html>", "Expecting one of"),
+    ],
+)
+def test_rs_list_parser_invalid(raw, match):
+    def parse(raw):
+        parser = drms_json._RsListParser("latin1")
+        parser.feed(raw)
+        return parser.close()
+
+    with pytest.raises(ValueError, match=match):
+        parse(raw)
+
+
+@pytest.mark.parametrize("stream_rs_list", [True, False])
+def test_rs_list_streaming(http_server, stream_rs_list):
+    http_server.compress = "gzip"
+    http_server.responses["/cgi/jsoc_info"] = RS_LIST
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+    c = HttpJsonClient(cfg, stream_rs_list=stream_rs_list)
+    assert c.rs_list("hmi.M_720s[2014.01.01]", key="T_REC") == RS_LIST
+    ac = AsyncHttpJsonClient(cfg, stream_rs_list=stream_rs_list)
+    assert asyncio.run(ac.rs_list("hmi.M_720s[2014.01.01]", key="T_REC")) == RS_LIST
+
+
+@pytest.mark.parametrize("stream_rs_list", [True, False])
+def test_rs_list_parsed_off_event_loop(http_server, stream_rs_list):
+    http_server.responses["/cgi/jsoc_info"] = RS_LIST
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+    ac = AsyncHttpJsonClient(cfg, stream_rs_list=stream_rs_list)
+    feed = drms_json._RsListParser.feed
+    loads = drms_json._loads
+
+    def slow_feed(self, data):
+        time.sleep(0.2)
+        return feed(self, data)
+
+    def slow_loads(*args):
+        time.sleep(0.2)
+        return loads(*args)
+
+    async def run():
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(tick())
+        res = await ac.rs_list("hmi.M_720s[2014.01.01]", key="T_REC")
+        task.cancel()
+        return res, len(ticks)
+
+    with patch.object(drms_json._RsListParser, "feed", slow_feed), patch.object(drms_json, "_loads", slow_loads):
+        res, num_ticks = asyncio.run(run())
+    assert res == RS_LIST
+    # Other tasks keep running while the response is parsed.
+    assert num_ticks > 5
+
+
+def test_post_oversized_requests(http_server):
+    cfg = ServerConfig(
+        name="LOCAL",
+        cgi_baseurl=f"{http_server.url}cgi/",
+        cgi_jsoc_info="jsoc_info",
+        cgi_jsoc_fetch="jsoc_fetch",
+        max_url_length=1000,
+    )
+    keys = [f"KEY{i:03d}" for i in range(300)]
+    c = HttpJsonClient(cfg)
+    res = c.rs_list("hmi.M_720s[2014.01.01]", key=keys)
+    assert res["method"] == "POST"
+    assert res["path"] == c._rs_list_url("hmi.M_720s[2014.01.01]", key=keys)[len(http_server.url) - 1 :]
+    assert c.exp_request("hmi.M_720s[2014.01.01]", "a@b.c", process={"im_patch": {"t": "x" * 1000}})["method"] == "POST"
+    assert c.rs_list("hmi.M_720s[2014.01.01]", key=keys[:10])["method"] == "GET"
+
+    ac = AsyncHttpJsonClient(cfg)
+    res = asyncio.run(ac.rs_list("hmi.M_720s[2014.01.01]", key=keys))
+    assert res["method"] == "POST"
+    assert http_server.methods == ["POST", "POST", "GET", "POST"]
+
+
+def test_post_args():
+    url = "http://example.com/cgi/jsoc_info?op=rs_list&ds=a%5B%5D"
+    assert drms_json._post_args(url) == (url, None)
+    assert drms_json._post_args(url, 20) == ("http://example.com/cgi/jsoc_info", b"op=rs_list&ds=a%5B%5D")
+    assert drms_json._post_args("http://example.com/cgi/show_series", 20) == (
+        "http://example.com/cgi/show_series",
+        None,
+    )
+
+
+@pytest.mark.parametrize("coalesce", [True, False])
+def test_coalesce_requests(http_server, coalesce):
+    http_server.delay = 0.2
+    http_server.responses["/cgi/jsoc_info"] = {"status": 0, "keywords": [{"name": "T_REC"}]}
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+    c = HttpJsonClient(cfg, coalesce=coalesce)
+    with ThreadPoolExecutor(5) as executor:
+        res = list(executor.map(lambda _: c.series_struct("hmi.v_45s"), range(5)))
+    assert all(r == res[0] for r in res)
+    assert http_server.num_requests == (1 if coalesce else 5)
+    # Every caller gets its own copy of the result.
+    assert len({id(r) for r in res}) == 5
+    assert len({id(r["keywords"]) for r in res}) == 5
+
+    # Requests of different clients are not combined.
+    clients = [HttpJsonClient(cfg, coalesce=coalesce) for _ in range(2)]
+    num_requests = http_server.num_requests
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda c: c.series_struct("hmi.v_45s"), clients))
+    assert http_server.num_requests == num_requests + 2
+
+
+def test_single_flight_copies():
+    flight = drms_json._SingleFlight()
+    result = {"values": [1, 2]}
+    started = threading.Event()
+    release = threading.Event()
+
+    def func():
+        started.set()
+        release.wait()
+        return result
+
+    # The result is not copied for a single caller.
+    assert flight.do("k", lambda: result) is result
+    with ThreadPoolExecutor(3) as executor:
+        leader = executor.submit(flight.do, "k", func)
+        started.wait()
+        waiters = [executor.submit(flight.do, "k", func) for _ in range(2)]
+        while flight._flights["k"].waiters < 2:
+            time.sleep(0.01)
+        release.set()
+        res = [leader.result(), *(w.result() for w in waiters)]
+    assert all(r == result for r in res)
+    # None of the callers gets the object that is shared with the others.
+    assert all(r is not result for r in res)
+
+
+def test_async_single_flight_copies():
+    flight = drms_json._AsyncSingleFlight()
+    result = {"values": [1, 2]}
+
+    async def func():
+        await asyncio.sleep(0.05)
+        return result
+
+    async def leader():
+        res = await flight.do("k", func)
+        # Changing the result does not change the results of the others.
+        res["values"].append(3)
+        return res
+
+    async def run():
+        single = await flight.do("k", func)
+        return single, await asyncio.gather(leader(), flight.do("k", func), flight.do("k", func))
+
+    single, res = asyncio.run(run())
+    assert single is result
+    assert res[0]["values"] == [1, 2, 3]
+    assert res[1] == res[2] == {"values": [1, 2]}
+    assert all(r is not result for r in res)
+
+
+def test_coalesce_requests_error(http_server):
+    http_server.delay = 0.2
+    http_server.failures = 1
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+    c = HttpJsonClient(cfg, retry_policy=RetryPolicy(total=0))
+
+    def rs_summary(_):
+        with pytest.raises(HTTPError):
+            c.rs_summary("hmi.v_45s")
+
+    with ThreadPoolExecutor(3) as executor:
+        list(executor.map(rs_summary, range(3)))
+    assert http_server.num_requests == 1
+
+
+def test_coalesce_requests_async(http_server):
+    http_server.delay = 0.1
+    cfg = ServerConfig(
+        name="LOCAL",
+        cgi_baseurl=f"{http_server.url}cgi/",
+        cgi_jsoc_info="jsoc_info",
+        cgi_jsoc_fetch="jsoc_fetch",
+    )
+    c = AsyncHttpJsonClient(cfg)
+
+    async def fetch_all():
+        status = await asyncio.gather(*[c.exp_status("JSOC_1") for _ in range(5)])
+        requests = await asyncio.gather(*[c.exp_request("hmi.v_45s", "a@b.c") for _ in range(2)])
+        return status, requests
+
+    status, requests = asyncio.run(fetch_all())
+    assert all(s["status"] == 0 for s in status)
+    assert len({id(s) for s in status}) == 5
+    assert len(requests) == 2
+    # Export requests are never combined.
+    assert http_server.num_requests == 3
+
+
+def test_response_cache(http_server, tmp_path):
+    http_server.responses["/cgi/jsoc_info"] = lambda q: {"status": 0, "ds": q["ds"]}
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+    cache = ResponseCache(tmp_path)
+    assert cache.directory == tmp_path
+    c = HttpJsonClient(cfg, cache=cache)
+    assert c.cache is cache
+    assert c.series_struct("hmi.v_45s") == {"status": 0, "ds": "hmi.v_45s"}
+    # A new client (e.g. in another process) uses the cached response.
+    c = HttpJsonClient(cfg, cache=ResponseCache(tmp_path))
+    assert c.series_struct("hmi.v_45s") == {"status": 0, "ds": "hmi.v_45s"}
+    ac = AsyncHttpJsonClient(cfg, cache=ResponseCache(tmp_path))
+    assert asyncio.run(ac.series_struct("hmi.v_45s")) == {"status": 0, "ds": "hmi.v_45s"}
+    assert http_server.num_requests == 1
+    # Other endpoints are not cached.
+    c.rs_summary("hmi.v_45s")
+    c.rs_summary("hmi.v_45s")
+    assert http_server.num_requests == 3
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_response_cache_errors_not_cached(http_server, tmp_path):
+    http_server.responses["/cgi/jsoc_info"] = {"status": 1, "error": "unknown series"}
+    cfg = ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+    c = HttpJsonClient(cfg, cache=ResponseCache(tmp_path))
+    c.series_struct("hmi.foo")
+    c.series_struct("hmi.foo")
+    assert http_server.num_requests == 2
+    assert not list(tmp_path.iterdir())
+
+
+def test_response_cache_ttl(tmp_path):
+    cache = ResponseCache(tmp_path, ttl={"series_struct": 0})
+    assert cache.ttl("show_series") == ResponseCache.default_ttl["show_series"]
+    cache.put("http://a/", {"status": 0})
+    assert cache.get("http://a/", "show_series") == {"status": 0}
+    time.sleep(0.01)
+    assert cache.get("http://a/", "series_struct") is None
+    assert ResponseCache(tmp_path, ttl=5).ttl("series_struct") == 5
+
+
+def test_response_cache_lru(tmp_path):
+    cache = ResponseCache(tmp_path, max_size=250)
+    data = {"status": 0, "data": "x" * 80}
+    for i, url in enumerate(["http://a/", "http://b/"]):
+        cache.put(url, data)
+        os.utime(cache._path(url), (1000 + i, time.time()))
+    # Accessing a makes b the least recently used response.
+    assert cache.get("http://a/", "series_struct") == data
+    cache.put("http://c/", data)
+    assert cache.get("http://b/", "series_struct") is None
+    assert cache.get("http://a/", "series_struct") == data
+    assert cache.get("http://c/", "series_struct") == data
+    cache.clear()
+    assert not list(tmp_path.iterdir())
+
+
+def test_response_cache_corrupt_file(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("http://a/", {"status": 0})
+    cache._path("http://a/").write_bytes(b'{"status": ')
+    assert cache.get("http://a/", "series_struct") is None
+    assert not cache._path("http://a/").exists()
@@ -0,0 +1,94 @@
+import asyncio
+from urllib.error import HTTPError
+
+import drms
+from drms.config import ServerConfig
+from drms.connection import PoolManager
+from drms.json import AsyncHttpJsonClient, HttpJsonClient
+from drms.metrics import RequestMetrics
+from drms.retry import RetryPolicy
+
+
+def _config(http_server):
+    return ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+
+
+def test_pool_timings(http_server):
+    pm = PoolManager()
+    with pm.urlopen(http_server.url) as r:
+        r.read()
+    assert r.timings["reused"] is False
+    assert r.timings["dns"] >= 0
+    assert r.timings["connect"] > 0
+    with pm.urlopen(http_server.url) as r:
+        r.read()
+    assert r.timings == {"reused": True}
+
+
+def test_json_metrics(http_server):
+    http_server.compress = "gzip"
+    http_server.responses["/cgi/jsoc_info"] = {"status": 0, "runtime": 0.25, "values": list(range(1000))}
+    metrics = []
+    c = HttpJsonClient(_config(http_server), metrics_hook=metrics.append)
+    c.series_struct("hmi.v_45s")
+    c.rs_list("hmi.v_45s", key="T_REC")
+    assert len(metrics) == 2
+    m1, m2 = metrics
+    assert isinstance(m1, RequestMetrics)
+    assert m1.kind == "json"
+    assert m1.method == "GET"
+    assert m1.status == 200
+    assert m1.error is None
+    assert m1.reused is False
+    assert m1.connect is not None
+    assert 0 < m1.ttfb <= m1.total
+    assert m1.decode is not None
+    assert 0 < m1.bytes_received < m1.bytes_decoded
+    assert m1.server_runtime == 0.25
+    # The streaming rs_list parser is measured the same way.
+    assert m2.reused is True
+    assert m2.connect is None
+    assert m2.bytes_decoded == m1.bytes_decoded
+    assert m2.server_runtime == 0.25
+    assert set(m2.to_dict()) >= {"url", "ttfb", "transfer", "decode", "total", "bytes_received"}
+
+
+def test_json_metrics_retries(http_server):
+    http_server.failures = 1
+    metrics = []
+    c = HttpJsonClient(_config(http_server), metrics_hook=metrics.append, retry_policy=RetryPolicy(backoff_factor=0))
+    c.rs_summary("hmi.v_45s")
+    assert [m.status for m in metrics] == [503, 200]
+    assert isinstance(metrics[0].error, HTTPError)
+    assert metrics[1].error is None
+
+
+def test_metrics_hook_errors_ignored(http_server, caplog):
+    def hook(metrics):
+        raise RuntimeError("broken hook")
+
+    c = HttpJsonClient(_config(http_server), metrics_hook=hook)
+    assert c.rs_summary("hmi.v_45s")["status"] == 0
+    assert "broken hook" in caplog.text
+
+
+def test_download_metrics(local_server, tmp_path):
+    metrics = []
+    c = drms.Client(local_server, email="test@example.com", metrics_hook=metrics.append)
+    r = c.export("hmi.test[2014.01.01/1h]", method="url", requester=False)
+    assert r.wait(sleep=0)
+    del metrics[:]
+    r.download(tmp_path)
+    assert [m.kind for m in metrics] == ["download"] * len(r.urls)
+    assert all(m.status == 200 and m.bytes_received > 0 and m.total >= m.ttfb for m in metrics)
+
+
+def test_async_metrics(http_server):
+    http_server.responses["/cgi/jsoc_info"] = {"status": 0, "runtime": 0.5}
+    metrics = []
+    c = AsyncHttpJsonClient(_config(http_server), metrics_hook=metrics.append)
+    asyncio.run(c.rs_list("hmi.v_45s", key="T_REC"))
+    assert len(metrics) == 1
+    assert metrics[0].kind == "json"
+    assert metrics[0].server_runtime == 0.5
+    assert metrics[0].bytes_received == metrics[0].bytes_decoded > 0
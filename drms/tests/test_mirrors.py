@@ -0,0 +1,172 @@
+import time
+import asyncio
+
+import pytest
+
+import drms
+from drms.config import ServerConfig
+from drms.fakeserver import FakeDrmsServer
+from drms.metrics import RequestMetrics
+from drms.mirrors import MirrorSelector
+from drms.retry import RetryPolicy
+
+
+def _mirror_config(*servers):
+    cfg = servers[0].config.to_dict()
+    cfg.update(
+        name="MIRRORS",
+        cgi_baseurl=[s.config.cgi_baseurl for s in servers],
+        http_download_baseurl=[s.url for s in servers],
+    )
+    return ServerConfig(**cfg)
+
+
+def test_selector_ranking():
+    s = MirrorSelector(["http://a/", "http://b/", "http://c/"], alpha=0.5, cooldown=0.2)
+    # Unmeasured mirrors are tried first, in order of preference.
+    assert s.ranked() == ["http://a/", "http://b/", "http://c/"]
+    s.record_latency("http://a/", 0.3)
+    s.record_latency("http://b/", 0.1)
+    assert s.ranked() == ["http://c/", "http://b/", "http://a/"]
+    s.record_latency("http://c/", 0.2)
+    assert s.ranked() == ["http://b/", "http://c/", "http://a/"]
+    s.record_latency("http://b/", 0.5)
+    assert s.latency("http://b/") == pytest.approx(0.3)
+    assert s.ranked() == ["http://c/", "http://a/", "http://b/"]
+
+    s.record_failure("http://c/")
+    assert not s.is_healthy("http://c/")
+    assert s.ranked() == ["http://a/", "http://b/", "http://c/"]
+    assert s.candidates("http://c/cgi?op=x") == ["http://a/cgi?op=x", "http://b/cgi?op=x", "http://c/cgi?op=x"]
+    assert s.candidates("http://d/cgi") == []
+    time.sleep(0.2)
+    assert s.is_healthy("http://c/")
+    assert s.ranked()[0] == "http://c/"
+
+
+def test_selector_max_age():
+    s = MirrorSelector(["http://a/", "http://b/"], max_age=0.1)
+    s.record_latency("http://a/", 0.1)
+    s.record_latency("http://b/", 0.2)
+    assert s.ranked() == ["http://a/", "http://b/"]
+    time.sleep(0.1)
+    s.record_latency("http://a/", 0.1)
+    # The stale measurement of b is refreshed by the next request.
+    assert s.ranked() == ["http://b/", "http://a/"]
+
+
+def test_selector_observe():
+    s = MirrorSelector(["http://a/", "http://b/"])
+    retry = RetryPolicy()
+    m = RequestMetrics("http://b/cgi?op=x")
+    m.ttfb = 0.05
+    s.observe(m, retry.is_retryable)
+    assert s.latency("http://b/") == 0.05
+    m = RequestMetrics("http://a/cgi?op=x")
+    m.error = ConnectionResetError()
+    s.observe(m, retry.is_retryable)
+    assert not s.is_healthy("http://a/")
+    m = RequestMetrics("http://b/cgi?op=x")
+    m.error = ValueError("invalid JSON")
+    s.observe(m, retry.is_retryable)
+    assert s.is_healthy("http://b/")
+
+
+def test_config_mirrors():
+    cfg = ServerConfig(name="TEST", cgi_baseurl=["http://a/cgi/", "http://b/cgi/"], cgi_jsoc_info="jsoc_info")
+    assert cfg.cgi_baseurl == "http://a/cgi/"
+    assert cfg.cgi_mirrors == ["http://a/cgi/", "http://b/cgi/"]
+    assert cfg.url_jsoc_info == "http://a/cgi/jsoc_info"
+    selector = cfg.mirror_selector("cgi")
+    assert selector.base_urls == cfg.cgi_mirrors
+    assert cfg.mirror_selector("cgi") is selector
+    assert cfg.mirror_selector("http_download") is None
+    assert cfg.mirror_selectors() == [selector]
+    assert cfg.copy().cgi_mirrors == cfg.cgi_mirrors
+
+    cfg.http_download_mirrors = ["http://a/", "http://b/"]
+    assert cfg.mirror_selector("http_download").base_urls == ["http://a/", "http://b/"]
+    with pytest.raises(ValueError, match="non-empty list of strings"):
+        cfg.cgi_mirrors = "http://a/"
+    with pytest.raises(ValueError, match="non-empty list of strings"):
+        ServerConfig(name="TEST", http_download_mirrors=[])
+    with pytest.raises(ValueError, match="Invalid mirror role"):
+        cfg.mirror_selector("foo")
+
+
+def test_failover():
+    with FakeDrmsServer(num_records=10, error_rate=1) as bad, FakeDrmsServer(num_records=10) as good:
+        cfg = _mirror_config(bad, good)
+        c = drms.Client(cfg, email="test@example.com", retry_policy=RetryPolicy(total=0))
+        assert len(c.query("fake.series1", key="T_REC")) == 10
+        assert bad.num_requests == 1
+        assert not cfg.mirror_selector("cgi").is_healthy(f"{bad.url}cgi-bin/ajax/")
+        # Failed mirrors are avoided.
+        assert c.series() == ["fake.series1", "fake.series2", "fake.series3"]
+        assert bad.num_requests == 1
+
+        r = c.export("fake.series1[2010.05.01_00:00/1h]", method="url_quick", protocol="as-is")
+        # Download URLs returned by one mirror can be fetched from the others.
+        urls = drms.HttpJsonClient(cfg)._mirror_urls(r.urls.url[0])
+        assert sorted(u.split("SUM")[0] for u in urls) == sorted([bad.url, good.url])
+
+        ac = drms.AsyncClient(_mirror_config(bad, good), retry_policy=RetryPolicy(total=0))
+        assert len(asyncio.run(ac.query("fake.series1", key="T_REC"))) == 10
+
+
+def test_export_mirror(tmp_path):
+    with FakeDrmsServer(num_records=10, file_size=10) as a, FakeDrmsServer(num_records=10, file_size=10) as b:
+        cfg = _mirror_config(a, b)
+        selector = cfg.mirror_selector("cgi")
+        base_a, base_b = cfg.cgi_mirrors
+
+        def prefer(fast, slow):
+            selector.record_latency(fast, 0.001)
+            selector.record_latency(slow, 1)
+
+        prefer(base_b, base_a)
+        c = drms.Client(cfg, email="test@example.com", retry_policy=RetryPolicy(total=0))
+        r = c.export("fake.series1[2010.05.01_00:00/1h]", method="url", protocol="fits")
+        assert list(b.exports) == [r.id]
+
+        # The status requests and downloads are sent to the mirror that
+        # accepted the export request, even if another mirror is faster.
+        prefer(base_a, base_b)
+        num_requests = a.num_requests
+        assert r.wait(sleep=0)
+        assert all(url.startswith(b.url) for url in r.urls.url)
+        assert all(p is not None for p in r.download(tmp_path).download)
+        assert a.num_requests == num_requests
+
+        ac = drms.AsyncClient(cfg, email="test@example.com", retry_policy=RetryPolicy(total=0))
+
+        async def run():
+            prefer(base_b, base_a)
+            ar = await ac.export("fake.series1[2010.05.01_00:00/1h]", method="url", protocol="fits")
+            prefer(base_a, base_b)
+            await ar.wait(sleep=0)
+            return ar, await ar.download(tmp_path)
+
+        num_requests = a.num_requests
+        ar, res = asyncio.run(run())
+        assert sorted(b.exports) == sorted([r.id, ar.id])
+        assert all(p is not None for p in res.download)
+        assert a.num_requests == num_requests
+
+        # Failed downloads are not repeated on other mirrors.
+        b.error_rate = 1
+        assert all(p is None for p in r.download(tmp_path).download)
+        assert a.num_requests == num_requests
+
+
+def test_latency_based_selection():
+    with FakeDrmsServer(num_records=10, latency=0.1) as slow, FakeDrmsServer(num_records=10) as fast:
+        cfg = _mirror_config(slow, fast)
+        c = drms.Client(cfg)
+        c.probe_mirrors()
+        selector = cfg.mirror_selector("cgi")
+        assert selector.latency(f"{slow.url}cgi-bin/ajax/") > selector.latency(f"{fast.url}cgi-bin/ajax/")
+        num_requests = slow.num_requests
+        for _ in range(3):
+            c.series()
+        assert slow.num_requests == num_requests
@@ -0,0 +1,128 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import drms
+from drms.fakeserver import FakeDrmsServer, FakeSeries
+from drms.output import _outputs, register_output
+
+
+@pytest.fixture(scope="module")
+def fake_server():
+    series = [FakeSeries("fake.euv_12s", num_records=500, cadence=12, num_keywords=2)]
+    with FakeDrmsServer(series) as server:
+        yield server
+
+
+def test_arrow_output(fake_server):
+    pa = pytest.importorskip("pyarrow")
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    keys, segs = c.query(ds, key="T_REC, QUALITY, KEY01, KEY02, *recnum*", seg="image", output="arrow")
+    assert isinstance(keys, pa.Table)
+    assert keys.schema.types == [pa.timestamp("ns"), pa.int32(), pa.float64(), pa.float64(), pa.int64()]
+    assert keys.num_rows == segs.num_rows == 300
+    assert segs.schema.types == [pa.string()]
+    assert keys.column("QUALITY")[5].as_py() == 0x10000
+
+    expected = c.query(ds, key="T_REC, QUALITY, KEY01, KEY02", typed=True)
+    assert keys.drop_columns("*recnum*").to_pandas().equals(expected.astype({"QUALITY": "int32"}))
+
+    keys = c.query(ds, key="T_REC, QUALITY", rec_index=True, convert_numeric=False, output="arrow")
+    assert keys.column_names == ["record", "T_REC", "QUALITY"]
+    assert keys.schema.types == [pa.string()] * 3
+
+
+def test_arrow_output_chunks(fake_server):
+    pytest.importorskip("pyarrow")
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    expected = c.query(ds, key="T_REC, KEY01", output="arrow").to_pandas()
+    assert c.query(ds, key="T_REC, KEY01", output="arrow", chunk_records=50).to_pandas().equals(expected)
+    chunks = list(c.iter_query(ds, key="T_REC, KEY01", output="arrow", chunk_records=100))
+    assert len(chunks) == 3
+    assert sum(t.num_rows for t in chunks) == len(expected)
+
+    ac = drms.AsyncClient(fake_server.config)
+    res = asyncio.run(ac.query(ds, key="T_REC, KEY01", output="arrow", chunk_records=50))
+    assert res.to_pandas().equals(expected)
+
+
+def test_register_output(fake_server, monkeypatch):
+    monkeypatch.setitem(_outputs, "dummy", None)
+
+    def table(names, columns, kinds):
+        return list(zip(names, kinds, (len(c) for c in columns), strict=True))
+
+    register_output("dummy", table, lambda tables: tables)
+    c = drms.Client(fake_server.config)
+    res = c.query("fake.euv_12s[2010.05.01/1h]", key="T_REC, KEY01", seg="image", output="dummy")
+    assert res == ([("T_REC", "time", 300), ("KEY01", "double", 300)], [("image", None, 300)])
+
+    with pytest.raises(ValueError, match="Unknown output format"):
+        c.query("fake.euv_12s", key="T_REC", output="foo")
+    with pytest.raises(ValueError, match="reserved"):
+        register_output("pandas", table, list)
+    monkeypatch.setitem(_outputs, "missing", None)
+    register_output("missing", table, list, module="drms_missing_module")
+    with pytest.raises(ImportError, match="requires the drms_missing_module package"):
+        c.query("fake.euv_12s", key="T_REC", output="missing")
+
+
+def test_numpy_output(fake_server):
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    res = c.query(ds, key="T_REC, QUALITY, KEY01", rec_index=True, output="numpy")
+    assert res.dtype.names == ("record", "T_REC", "QUALITY", "KEY01")
+    assert [res.dtype[i].kind for i in range(4)] == ["U", "M", "i", "f"]
+    assert res.dtype["QUALITY"] == "int32"
+    assert res["QUALITY"][5] == 0x10000
+    assert res.view(np.recarray).record[0] == "fake.euv_12s[2010.05.01_00:00:00_TAI]"
+
+    chunked = c.query(ds, key="T_REC, QUALITY, KEY01", rec_index=True, output="numpy", chunk_records=50)
+    assert chunked.dtype == res.dtype
+    for name in res.dtype.names:
+        np.testing.assert_array_equal(chunked[name], res[name])
+
+
+def test_dict_output(fake_server):
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    keys, segs = c.query(ds, key="QUALITY, KEY02", seg="image", output="dict")
+    assert list(keys) == ["QUALITY", "KEY02"]
+    assert keys["QUALITY"].dtype == "int32"
+    assert keys["KEY02"].dtype == "float64"
+    assert segs["image"][0] == "/SUM0/D1000/S00000/image.fits"
+    chunks = list(c.iter_query(ds, key="QUALITY, KEY02", output="dict", chunk_records=100))
+    assert [len(chunk["QUALITY"]) for chunk in chunks] == [100, 100, 100]
+    np.testing.assert_array_equal(np.concatenate([chunk["KEY02"] for chunk in chunks]), keys["KEY02"])
+
+
+def test_polars_output(fake_server):
+    pl = pytest.importorskip("polars")
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    res = c.query(ds, key="T_REC, QUALITY, KEY01, *recnum*", output="polars")
+    assert isinstance(res, pl.DataFrame)
+    assert res.dtypes == [pl.Datetime("ns"), pl.Int32, pl.Float64, pl.Int64]
+    assert res["*recnum*"].null_count() == len(res)
+    expected = c.query(ds, key="T_REC, QUALITY, KEY01", typed=True)
+    assert res["QUALITY"].to_list() == expected.QUALITY.tolist()
+    assert res.equals(c.query(ds, key="T_REC, QUALITY, KEY01, *recnum*", output="polars", chunk_records=50))
+
+
+def test_categorical_output(fake_server):
+    pa = pytest.importorskip("pyarrow")
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/1h]"
+    keys = c.query(ds, key="T_REC, QUALITY", skip_conversion="QUALITY", categorical=True, output="arrow")
+    assert keys.schema.types == [pa.timestamp("ns"), pa.dictionary(pa.int32(), pa.string())]
+    assert keys.column("QUALITY").to_pylist() == c.query(ds, key="QUALITY", convert_numeric=False).QUALITY.tolist()
+    # Chunks are encoded consistently.
+    chunked = c.query(ds, key="QUALITY", skip_conversion="QUALITY", categorical=True, output="arrow", chunk_records=50)
+    assert chunked.column("QUALITY").type == pa.dictionary(pa.int32(), pa.string())
+
+    pl = pytest.importorskip("polars")
+    keys = c.query(ds, key="T_REC, QUALITY", skip_conversion="QUALITY", categorical=True, output="polars")
+    assert keys.dtypes == [pl.Datetime("ns"), pl.Categorical]
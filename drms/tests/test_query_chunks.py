@@ -0,0 +1,263 @@
+import json
+import asyncio
+
+import pandas as pd
+import pytest
+
+import drms
+from drms.client import Client
+from drms.fakeserver import FakeDrmsServer, FakeSeries
+
+
+@pytest.fixture(scope="module")
+def fake_server():
+    series = [
+        FakeSeries("fake.euv_12s", num_records=1000, cadence=12),
+        FakeSeries("fake.gaps", num_records=100, cadence=3600),
+    ]
+    with FakeDrmsServer(series) as server:
+        yield server
+
+
+@pytest.mark.parametrize(
+    "ds",
+    [
+        "fake.euv_12s",
+        "fake.euv_12s[]",
+        "fake.euv_12s[2010.05.01_00:10/2h]",
+    ],
+)
+def test_chunked_query(fake_server, ds):
+    c = drms.Client(fake_server.config)
+    expected = c.query(ds, key="T_REC, QUALITY, KEY01")
+    num_requests = fake_server.num_requests
+    res = c.query(ds, key="T_REC, QUALITY, KEY01", chunk_records=70, max_workers=3)
+    assert fake_server.num_requests - num_requests > 3
+    pd.testing.assert_frame_equal(res, expected)
+
+
+def test_chunked_query_segments_and_index(fake_server):
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/1h]{image}"
+    expected = c.query(ds, key="QUALITY", seg="image", rec_index=True)
+    res = c.query(ds, key="QUALITY", seg="image", rec_index=True, chunk_records=50)
+    assert len(res) == 2
+    pd.testing.assert_frame_equal(res[0], expected[0])
+    pd.testing.assert_frame_equal(res[1], expected[1])
+
+
+def test_chunked_query_not_split(fake_server):
+    c = drms.Client(fake_server.config)
+    for ds in ["fake.euv_12s[2010.05.01/1h@1m]", "fake.euv_12s[$]"]:
+        c.info(ds)
+        num_requests = fake_server.num_requests
+        c.query(ds, key="T_REC", chunk_records=10)
+        assert fake_server.num_requests == num_requests + 1
+    # Small record sets and queries with n are not split either.
+    num_requests = fake_server.num_requests
+    c.query("fake.euv_12s[2010.05.01/2m]", key="T_REC", chunk_records=10)
+    assert fake_server.num_requests == num_requests + 2
+    assert len(c.query("fake.euv_12s", key="T_REC", n=5, chunk_records=1)) == 5
+
+
+def test_time_chunks():
+    first = {"keywords": [{"name": "T_REC", "values": ["2014.01.01_00:00:00_TAI"]}]}
+    last = {"keywords": [{"name": "T_REC", "values": ["2014.01.01_00:59:48_TAI"]}]}
+    chunks = Client._time_chunks("aia.lev1[2014.01.01/1h][171]{image}", 300, first, last, 100)
+    assert chunks == [
+        "aia.lev1[2014.01.01_00:00:00_TAI/1197s][171]{image}",
+        "aia.lev1[2014.01.01_00:19:57_TAI/1197s][171]{image}",
+        "aia.lev1[2014.01.01_00:39:54_TAI/1197s][171]{image}",
+    ]
+    assert Client._time_chunks("aia.lev1", 300, first, first, 100) is None
+
+
+def test_async_chunked_query(fake_server):
+    ds = "fake.gaps[2010.05.01/3d]"
+    expected = drms.Client(fake_server.config).query(ds, key="T_REC, KEY02")
+    c = drms.AsyncClient(fake_server.config)
+    res = asyncio.run(c.query(ds, key="T_REC, KEY02", chunk_records=10, max_workers=2))
+    pd.testing.assert_frame_equal(res, expected)
+
+
+def test_iter_query(fake_server):
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01_00:10/2h]"
+    expected = c.query(ds, key="T_REC, QUALITY, KEY01", seg="image")
+    chunks = list(c.iter_query(ds, key="T_REC, QUALITY, KEY01", seg="image", chunk_records=100))
+    assert len(chunks) == 6
+    assert all(len(keys) <= 100 for keys, _ in chunks)
+    assert chunks[0][0].QUALITY.dtype.kind == "i"
+    pd.testing.assert_frame_equal(pd.concat([keys for keys, _ in chunks]), expected[0])
+    pd.testing.assert_frame_equal(pd.concat([segs for _, segs in chunks]), expected[1])
+
+    # Only the next chunk is prefetched, after the count and the time span
+    # of the record set have been requested.
+    it = c.iter_query(ds, key="T_REC", chunk_records=100)
+    num_requests = fake_server.num_requests
+    next(it)
+    it.close()
+    assert fake_server.num_requests == num_requests + 3 + 2
+
+    # Record sets that cannot be split are returned in a single chunk.
+    assert [len(r) for r in c.iter_query("fake.euv_12s[$]", key="T_REC")] == [1]
+
+
+def test_async_iter_query(fake_server):
+    ds = "fake.gaps[2010.05.01/3d]"
+    expected = drms.Client(fake_server.config).query(ds, key="T_REC", rec_index=True)
+    c = drms.AsyncClient(fake_server.config)
+
+    async def collect():
+        return [r async for r in c.iter_query(ds, key="T_REC", rec_index=True, chunk_records=10)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+def test_typed_query(fake_server):
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/2h]"
+    keys = c.query(ds, key="T_REC, QUALITY, KEY01, KEY02, *recnum*", typed=True, skip_conversion="KEY02")
+    assert keys.dtypes.astype(str).tolist() == ["datetime64[ns]", "Int32", "float64", "object", "Int64"]
+    assert keys.T_REC[1] == pd.Timestamp("2010-05-01 00:00:12")
+    assert keys.QUALITY[5] == 0x10000
+    assert keys.KEY01.isna().sum() > 0
+    expected = c.query(ds, key="QUALITY, KEY01")
+    pd.testing.assert_series_equal(keys.QUALITY.astype("int64"), expected.QUALITY)
+    pd.testing.assert_series_equal(keys.KEY01, expected.KEY01)
+
+    chunked = c.query(ds, key="T_REC, QUALITY, KEY01, KEY02, *recnum*", typed=True, chunk_records=100)
+    pd.testing.assert_frame_equal(chunked, c.query(ds, key="T_REC, QUALITY, KEY01, KEY02, *recnum*", typed=True))
+
+
+def test_typed_keyword_values():
+    keywords = [{"name": name, "type": kind} for name, kind in [("S", "short"), ("F", "float"), ("I", "int")]]
+    si = drms.SeriesInfo({"keywords": keywords, "links": [], "segments": []})
+    res = Client._typed_keyword_values(si, "S", ["1", "-2", "MISSING"])
+    assert str(res.dtype) == "Int16"
+    assert res[2] is pd.NA
+    res = Client._typed_keyword_values(si, "F", ["1.5", "nan"])
+    assert res.dtype == "float32"
+    # Values that do not fit into the dtype are kept as int64.
+    assert Client._typed_keyword_values(si, "I", ["0x100000000"]).dtype == "int64"
+
+
+def test_categorical_query(fake_server):
+    c = drms.Client(fake_server.config)
+    ds = "fake.euv_12s[2010.05.01/2h]"
+    keys = c.query(ds, key="T_REC, QUALITY, KEY01", convert_numeric=False, categorical=True)
+    # QUALITY only has a few distinct values, T_REC and KEY01 are unique.
+    assert keys.dtypes.astype(str).tolist() == ["object", "category", "object"]
+    expected = c.query(ds, key="T_REC, QUALITY, KEY01", convert_numeric=False)
+    pd.testing.assert_frame_equal(keys.astype({"QUALITY": object}), expected)
+    # Converted keywords are not encoded.
+    assert c.query(ds, key="QUALITY", categorical=True).QUALITY.dtype.kind == "i"
+    assert c.query(ds, key="QUALITY", convert_numeric=False, categorical=0.001).QUALITY.dtype == object
+
+    chunked = c.query(ds, key="T_REC, QUALITY, KEY01", convert_numeric=False, categorical=True, chunk_records=100)
+    pd.testing.assert_frame_equal(chunked, keys)
+    chunks = list(c.iter_query(ds, key="QUALITY", skip_conversion="QUALITY", categorical=True, chunk_records=200))
+    assert all(chunk.QUALITY.dtype == "category" for chunk in chunks)
+
+
+def test_query_since(fake_server):
+    c = drms.Client(fake_server.config)
+    res, state = c.query_since("fake.euv_12s[2010.05.01_00:00_TAI/1h]", key="KEY01", seg="image")
+    assert len(res[0]) == 300
+    assert res[0].columns.tolist() == ["KEY01"]
+    assert state == {"series": "fake.euv_12s", "cursor": "T_REC", "last": "2010.05.01_00:59:48_TAI", "seen": [[]]}
+
+    # The state survives a restart of the pipeline.
+    state = json.loads(json.dumps(state))
+    ds = "fake.euv_12s[2010.05.01_00:30_TAI/1h]"
+    res, state = c.query_since(ds, key="T_REC, KEY01", state=state, rec_index=True)
+    expected = c.query("fake.euv_12s[2010.05.01_01:00_TAI/30m]", key="T_REC, KEY01", rec_index=True)
+    pd.testing.assert_frame_equal(res, expected)
+    assert state["last"] == "2010.05.01_01:29:48_TAI"
+    res, state = c.query_since(ds, key="T_REC", state=state, typed=True)
+    assert len(res) == 0
+    assert res.T_REC.dtype.kind == "M"
+    assert state["last"] == "2010.05.01_01:29:48_TAI"
+
+    # Record sets without a time range are filtered after the query.
+    res, state = c.query_since("fake.euv_12s", key="T_REC", state=state)
+    assert res.T_REC.iloc[0] == "2010.05.01_01:30:00_TAI"
+    assert len(res) == 1000 - 450
+
+    with pytest.raises(ValueError, match="different series or cursor"):
+        c.query_since("fake.gaps", key="T_REC", state=state)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        c.query_since("fake.euv_12s", key="T_REC", cursor="foo")
+
+
+def test_since_recset():
+    last = "2014.01.01_12:00:00_TAI"
+    ds = "hmi.m_720s[2014.01.01_TAI/1d]{magnetogram}"
+    assert Client._since_recset(ds, "T_REC", None) == ds
+    assert Client._since_recset(ds, "T_REC", last) == "hmi.m_720s[2014.01.01_12:00:00_TAI/43200s]{magnetogram}"
+    # Other time zones and record sets without time ranges are not changed.
+    assert Client._since_recset("hmi.m_720s[2014.01.01/1d]", "T_REC", last) == "hmi.m_720s[2014.01.01/1d]"
+    assert Client._since_recset("hmi.m_720s[$]", "T_REC", last) == "hmi.m_720s[$]"
+    assert Client._since_recset(ds, "*recnum*", 42) == "hmi.m_720s[2014.01.01_TAI/1d][? recnum > 42 ?]{magnetogram}"
+
+
+def test_since_records():
+    lres = {
+        "count": 4,
+        "keywords": [
+            {"name": "*recnum*", "values": ["7", "9", "Invalid KeyLink", "8"]},
+            {"name": "T_REC", "values": ["a", "b", "c", "d"]},
+        ],
+        "segments": [{"name": "image", "values": ["1", "2", "3", "4"], "dims": ["1", "2", "3", "4"]}],
+        "recinfo": [{"name": name} for name in "abcd"],
+    }
+    res, last, seen = Client._since_records(lres, "*recnum*", 7, drop={"*recnum*"})
+    assert (last, seen) == (9, [])
+    # Records with missing cursor values are removed.
+    assert res["count"] == 2
+    assert res["keywords"] == [{"name": "T_REC", "values": ["b", "d"]}]
+    assert res["segments"][0]["dims"] == ["2", "4"]
+    assert res["recinfo"] == [{"name": "b"}, {"name": "d"}]
+    assert Client._since_records(lres, "*recnum*", 9)[1] == 9
+    assert Client._since_records(lres, "*recnum*", None)[0]["count"] == 3
+
+
+def test_since_records_same_time():
+    def rs_list(records):
+        return {
+            "count": len(records),
+            "keywords": [
+                {"name": "T_REC", "values": [t for t, _ in records]},
+                {"name": "WAVELNTH", "values": [w for _, w in records]},
+            ],
+        }
+
+    t0, t1 = "2010.05.01_00:00:00_TAI", "2010.05.01_00:00:12_TAI"
+    res, last, seen = Client._since_records(rs_list([(t0, 171), (t0, 193)]), "T_REC", None, [], ["WAVELNTH"])
+    assert (res["count"], last, seen) == (2, t0, [[171], [193]])
+
+    # Records of other wavelengths with the same time are returned once.
+    lres = rs_list([(t0, 171), (t0, 193), (t0, 211), ("MISSING", 304)])
+    res, last, seen = Client._since_records(lres, "T_REC", last, seen, ["WAVELNTH"], drop={"WAVELNTH"})
+    assert res["keywords"] == [{"name": "T_REC", "values": [t0]}]
+    assert (last, seen) == (t0, [[171], [193], [211]])
+    lres = rs_list([(t0, 171), (t0, 193), (t0, 211), (t1, 171)])
+    res, last, seen = Client._since_records(lres, "T_REC", last, seen, ["WAVELNTH"])
+    assert res["keywords"][1]["values"] == [171]
+    assert (last, seen) == (t1, [[171]])
+    res, last, seen = Client._since_records(lres, "T_REC", last, seen, ["WAVELNTH"])
+    assert (res["count"], last, seen) == (0, t1, [[171]])
+
+
+def test_async_query_since(fake_server):
+    c = drms.AsyncClient(fake_server.config)
+
+    async def run():
+        _, state = await c.query_since("fake.gaps[2010.05.01/1d]", key="KEY01")
+        return await c.query_since("fake.gaps[2010.05.01/2d]", key="KEY01", state=state)
+
+    res, state = asyncio.run(run())
+    pd.testing.assert_frame_equal(res, drms.Client(fake_server.config).query("fake.gaps[2010.05.02/1d]", key="KEY01"))
+    assert state["last"] == "2010.05.02_23:00:00_TAI"
@@ -0,0 +1,157 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from drms.config import ServerConfig
+from drms.json import AsyncHttpJsonClient, HttpJsonClient
+from drms.ratelimit import RateLimiter
+
+
+def test_rate_limit():
+    limiter = RateLimiter(rate=50, burst=5)
+    t_start = time.monotonic()
+    for _ in range(10):
+        with limiter:
+            pass
+    # The first five requests use the burst, the other five take 0.1 s.
+    assert 0.08 <= time.monotonic() - t_start < 1
+    assert limiter.in_flight == 0
+
+
+def test_max_in_flight():
+    limiter = RateLimiter(max_in_flight=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with limiter:
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) == 2
+
+
+def test_max_in_flight_async():
+    limiter = RateLimiter(max_in_flight=3)
+    peak = []
+
+    async def work():
+        async with limiter:
+            peak.append(limiter.in_flight)
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(*[work() for _ in range(9)])
+
+    asyncio.run(run())
+    assert max(peak) == 3
+    assert limiter.in_flight == 0
+
+
+def test_fifo_order():
+    limiter = RateLimiter(max_in_flight=1)
+    order = []
+    attempts = []
+    next_attempt = limiter._next_attempt
+    limiter._next_attempt = lambda waiter: attempts.append(1) or next_attempt(waiter)
+
+    def work_thread():
+        with limiter:
+            order.append("thread")
+            time.sleep(0.01)
+
+    async def work(i):
+        async with limiter:
+            order.append(i)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        limiter.acquire()
+        thread = threading.Thread(target=work_thread)
+        thread.start()
+        await asyncio.sleep(0.02)
+        tasks = [asyncio.create_task(work(i)) for i in range(5)]
+        await asyncio.sleep(0.1)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        thread.join()
+
+    asyncio.run(run())
+    assert order == ["thread", 0, 1, 2, 3, 4]
+    # Waiting tasks are woken instead of polling the limiter.
+    assert len(attempts) < 20
+    assert limiter.in_flight == 0
+
+
+def test_cancel_waiting_task():
+    limiter = RateLimiter(max_in_flight=1)
+
+    async def run():
+        limiter.acquire()
+        task = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        limiter.release()
+        # The cancelled task does not block the queue.
+        await asyncio.wait_for(limiter.aacquire(), 1)
+        limiter.release()
+
+    asyncio.run(run())
+    assert limiter.in_flight == 0
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError, match="rate must be positive"):
+        RateLimiter(rate=0)
+    with pytest.raises(ValueError, match="max_in_flight"):
+        RateLimiter(max_in_flight=0)
+    with pytest.raises(RuntimeError, match="release"):
+        RateLimiter().release()
+
+
+def test_server_config_limiter():
+    cfg = ServerConfig(name="TEST", rate_limit=10, max_in_flight=4)
+    assert cfg.limiter is cfg.limiter
+    assert cfg.limiter.rate == 10
+    assert cfg.limiter.max_in_flight == 4
+    cfg.max_in_flight = 2
+    assert cfg.limiter.max_in_flight == 2
+    with pytest.raises(ValueError, match="must be a number"):
+        cfg.rate_limit = "fast"
+    assert cfg.copy().limiter is not cfg.limiter
+
+
+def test_json_clients_share_limiter(http_server):
+    cfg = ServerConfig(
+        name="LOCAL",
+        cgi_baseurl=f"{http_server.url}cgi/",
+        cgi_jsoc_info="jsoc_info",
+        max_in_flight=1,
+    )
+    c1 = HttpJsonClient(cfg)
+    c2 = AsyncHttpJsonClient(cfg)
+    assert c1.limiter is c2.limiter is cfg.limiter
+
+    async def fetch_all():
+        return await asyncio.gather(*[c2.rs_summary(f"hmi.v_45s[{i}]") for i in range(5)])
+
+    assert all(r["status"] == 0 for r in asyncio.run(fetch_all()))
+    assert c1.rs_summary("hmi.v_45s")["status"] == 0
+    assert cfg.limiter.in_flight == 0
+    # With at most one request in flight, each client needs only one
+    # connection.
+    assert http_server.num_connections == 2
@@ -0,0 +1,88 @@
+import time
+from urllib.error import HTTPError
+
+import pytest
+
+import drms
+from drms.exceptions import DrmsError
+from drms.replay import RecordReplayTransport
+
+
+def _workflow(client, directory):
+    keys, segs = client.query("hmi.test[2014.01.01/1h]", key="T_REC, QUALITY, DATAMEAN", seg="image")
+    info = client.info("hmi.test")
+    r = client.export("hmi.test[2014.01.01/1h]", method="url", requester=False)
+    assert r.wait(sleep=0)
+    directory.mkdir()
+    res = r.download(directory)
+    return keys, segs, info.primekeys, [p.read_bytes() for p in res.download]
+
+
+def test_record_replay(local_server, http_server, tmp_path):
+    cassette = tmp_path / "cassette"
+    recorder = RecordReplayTransport(cassette, mode="record")
+    client = drms.Client(local_server, email="test@example.com", transport=recorder)
+    recorded = _workflow(client, tmp_path / "recorded")
+    assert recorder.num_recorded > 0
+    num_requests = http_server.num_requests
+
+    player = RecordReplayTransport(cassette)
+    client = drms.Client(local_server, email="test@example.com", transport=player)
+    replayed = _workflow(client, tmp_path / "replayed")
+    assert http_server.num_requests == num_requests
+    assert player.num_replayed > 0
+    assert replayed[0].equals(recorded[0])
+    assert replayed[1].equals(recorded[1])
+    assert replayed[2:] == recorded[2:]
+
+
+def test_replay_missing(local_server, tmp_path):
+    client = drms.Client(local_server, transport=RecordReplayTransport(tmp_path))
+    with pytest.raises(DrmsError, match="No recorded response"):
+        client.info("hmi.test")
+
+
+def test_record_replay_http_error(http_server, tmp_path):
+    url = f"{http_server.url}missing"
+    recorder = RecordReplayTransport(tmp_path, mode="auto")
+    with pytest.raises(HTTPError):
+        recorder.get(url)
+    with pytest.raises(HTTPError) as e:
+        RecordReplayTransport(tmp_path).get(url)
+    assert e.value.code == 404
+    assert http_server.num_requests == 1
+
+
+def test_record_replay_post(http_server, tmp_path):
+    recorder = RecordReplayTransport(tmp_path, mode="record")
+    with recorder.post(http_server.url, b"a=1") as r:
+        body = r.read()
+    player = RecordReplayTransport(tmp_path)
+    assert player.post(http_server.url, b"a=1").read() == body
+    with pytest.raises(DrmsError):
+        player.post(http_server.url, b"a=2")
+    with pytest.raises(DrmsError):
+        player.get(f"{http_server.url}?a=1")
+    assert http_server.methods == ["POST"]
+
+
+def test_replay_latency_and_bandwidth(http_server, tmp_path):
+    recorder = RecordReplayTransport(tmp_path, mode="record")
+    with recorder.get(http_server.url, stream=True) as r:
+        body = r.read()
+    # Incompletely read responses are not recorded.
+    recorder.get(f"{http_server.url}partial", stream=True).close()
+    assert recorder.num_recorded == 1
+
+    player = RecordReplayTransport(tmp_path, latency=0.1, bandwidth=len(body) * 10)
+    t_start = time.monotonic()
+    with player.get(http_server.url, stream=True) as r:
+        assert r.read() == body
+    assert time.monotonic() - t_start >= 0.2
+    with pytest.raises(DrmsError):
+        player.get(f"{http_server.url}partial")
+
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(ValueError, match="Invalid mode"):
+        RecordReplayTransport(tmp_path, mode="foo")
@@ -0,0 +1,225 @@
+import asyncio
+from email.message import Message
+from urllib.error import URLError, HTTPError
+
+import pytest
+
+import drms
+from drms.config import ServerConfig
+from drms.exceptions import DrmsCircuitOpenError
+from drms.json import AsyncHttpJsonClient, HttpJsonClient
+from drms.retry import CircuitBreaker, RetryPolicy
+
+
+def _http_error(code, headers=None):
+    msg = Message()
+    for k, v in (headers or {}).items():
+        msg[k] = v
+    return HTTPError("http://example.com/", code, "error", msg, None)
+
+
+@pytest.fixture()
+def local_config(http_server):
+    return ServerConfig(name="LOCAL", cgi_baseurl=f"{http_server.url}cgi/", cgi_jsoc_info="jsoc_info")
+
+
+def test_backoff():
+    policy = RetryPolicy(backoff_factor=1, backoff_max=5, jitter=0)
+    assert [policy.backoff(i) for i in range(1, 5)] == [1, 2, 4, 5]
+    policy = RetryPolicy(backoff_factor=1, jitter=0.5)
+    for _ in range(20):
+        assert 2 <= policy.backoff(3) <= 4
+
+
+def test_backoff_retry_after():
+    policy = RetryPolicy(backoff_max=10)
+    assert policy.backoff(1, _http_error(503, {"Retry-After": "3"})) == 3
+    assert policy.backoff(1, _http_error(503, {"Retry-After": "120"})) == 10
+
+
+def test_invalid_jitter():
+    with pytest.raises(ValueError, match="jitter"):
+        RetryPolicy(jitter=2)
+
+
+def test_is_retryable():
+    policy = RetryPolicy()
+    assert policy.is_retryable(_http_error(503))
+    assert not policy.is_retryable(_http_error(404))
+    assert policy.is_retryable(URLError("refused"))
+    assert policy.is_retryable(ConnectionResetError())
+    assert not policy.is_retryable(ValueError())
+
+
+def test_call_retries():
+    policy = RetryPolicy(total=3, backoff_factor=0)
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise URLError("refused")
+        return "ok"
+
+    assert policy.call(func, "http://example.com/") == "ok"
+    assert len(calls) == 3
+
+
+def test_call_gives_up():
+    policy = RetryPolicy(total=2, backoff_factor=0)
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise _http_error(503)
+
+    with pytest.raises(HTTPError):
+        policy.call(func, "http://example.com/")
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(ValueError, match="invalid literal"):
+        policy.call(lambda: calls.append(1) or int("x"), "http://example.com/")
+    assert len(calls) == 1
+
+
+def test_call_not_idempotent():
+    policy = RetryPolicy(total=2, backoff_factor=0)
+    assert policy.is_connect_error(URLError(ConnectionRefusedError()))
+    assert not policy.is_connect_error(URLError(ConnectionResetError()))
+    assert not policy.is_connect_error(_http_error(503))
+    errors = [URLError(ConnectionRefusedError()), _http_error(503)]
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise errors[len(calls) - 1]
+
+    # Only the failure to connect is retried.
+    with pytest.raises(HTTPError):
+        policy.call(func, "http://example.com/", idempotent=False)
+    assert len(calls) == 2
+
+
+def test_retry_budget():
+    policy = RetryPolicy(total=10, backoff_factor=0, budget_ratio=0, budget_min=2, breaker_threshold=None)
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise URLError("refused")
+
+    with pytest.raises(URLError):
+        policy.call(func, "http://example.com/")
+    assert len(calls) == 3
+    calls.clear()
+    with pytest.raises(URLError):
+        policy.call(func, "http://example.com/")
+    assert len(calls) == 1
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(threshold=2, timeout=60)
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    # Pretend the timeout has passed.
+    breaker._opened_at -= 60
+    assert breaker.state == "half-open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    breaker._opened_at -= 60
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_trial_cancelled():
+    policy = RetryPolicy(total=0, breaker_threshold=1, breaker_timeout=60)
+    url = "http://example.com/"
+    breaker = policy.circuit_breaker(url)
+    breaker.record_failure()
+    breaker._opened_at -= 60
+    assert breaker.state == "half-open"
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def ok():
+        return 1
+
+    async def run():
+        task = asyncio.ensure_future(policy.acall(hang, url))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The cancelled trial request does not block the next one.
+        return await policy.acall(ok, url)
+
+    assert asyncio.run(run()) == 1
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_per_host():
+    policy = RetryPolicy(total=0, breaker_threshold=1)
+
+    def func():
+        raise URLError("refused")
+
+    with pytest.raises(URLError):
+        policy.call(func, "http://a.example.com/x")
+    with pytest.raises(DrmsCircuitOpenError):
+        policy.call(func, "http://a.example.com/y")
+    assert policy.circuit_breaker("http://b.example.com/").state == "closed"
+    assert RetryPolicy(breaker_threshold=None).circuit_breaker("http://a.example.com/") is None
+
+
+def test_json_client_retries(http_server, local_config):
+    http_server.failures = 2
+    c = HttpJsonClient(local_config, retry_policy=RetryPolicy(backoff_factor=0))
+    assert c.rs_summary("hmi.v_45s")["status"] == 0
+    assert http_server.num_requests == 3
+
+    http_server.failures = 2
+    c = HttpJsonClient(local_config, retry_policy=RetryPolicy(total=0))
+    with pytest.raises(HTTPError) as e:
+        c.rs_summary("hmi.v_45s")
+    assert e.value.code == 503
+
+
+def test_async_json_client_retries(http_server, local_config):
+    http_server.failures = 2
+    c = AsyncHttpJsonClient(local_config, retry_policy=RetryPolicy(backoff_factor=0))
+    res = asyncio.run(c.rs_list("hmi.v_45s", key="T_REC"))
+    assert res["status"] == 0
+    assert http_server.num_requests == 3
+
+
+def test_exp_request_not_retried(http_server, local_config):
+    local_config.url_jsoc_fetch = f"{http_server.url}cgi/jsoc_fetch"
+    http_server.responses["/cgi/jsoc_fetch"] = {"status": 2, "requestid": "JSOC_1"}
+    c = HttpJsonClient(local_config, retry_policy=RetryPolicy(backoff_factor=0))
+    ac = AsyncHttpJsonClient(local_config, retry_policy=RetryPolicy(backoff_factor=0))
+    for exp_request in (c.exp_request, lambda *args: asyncio.run(ac.exp_request(*args))):
+        http_server.failures = 1
+        num_requests = http_server.num_requests
+        with pytest.raises(HTTPError):
+            exp_request("hmi.v_45s", "test@example.com")
+        assert http_server.num_requests == num_requests + 1
+    # Status requests are retried.
+    http_server.failures = 1
+    assert c.exp_status("JSOC_1")["requestid"] == "JSOC_1"
+
+
+def test_client_retry_policy(local_config):
+    policy = RetryPolicy(total=1)
+    c = drms.Client(local_config, retry_policy=policy)
+    assert c._json.retry_policy is policy
+    assert drms.AsyncClient(local_config, retry_policy=policy)._json.retry_policy is policy
+    assert isinstance(drms.Client(local_config)._json.retry_policy, RetryPolicy)
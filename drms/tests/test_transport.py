@@ -0,0 +1,73 @@
+from urllib.error import URLError, HTTPError
+
+import pytest
+
+import drms
+from drms.transport import HttpxTransport, Urllib3Transport, UrllibTransport
+
+
+def _urllib3_transport():
+    pytest.importorskip("urllib3")
+    return Urllib3Transport()
+
+
+def _httpx_transport():
+    pytest.importorskip("httpx")
+    return HttpxTransport()
+
+
+@pytest.fixture(params=[UrllibTransport, _urllib3_transport, _httpx_transport])
+def transport(request):
+    transport = request.param()
+    yield transport
+    transport.clear()
+
+
+def test_get(transport, http_server):
+    http_server.compress = "gzip"
+    with transport.get(f"{http_server.url}foo?a=1") as r:
+        assert r.status == 200
+        data = r.read()
+    assert b'"path": "/foo?a=1"' in data
+    assert b"drms/" in data
+
+    # The body is returned as sent, decompression is left to drms.
+    with transport.get(http_server.url, stream=True, headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers.get("Content-Encoding") == "gzip"
+        assert r.read(2) == b"\x1f\x8b"
+
+
+def test_post(transport, http_server):
+    with transport.post(f"{http_server.url}foo", b"a=1&b=%5B2%5D") as r:
+        data = r.read()
+    assert b'"method": "POST"' in data
+    assert b'"path": "/foo?a=1&b=%5B2%5D"' in data
+
+
+def test_get_redirect(transport, http_server):
+    with transport.get(f"{http_server.url}redirect") as r:
+        assert r.url.endswith("/cgi/jsoc_info?op=rs_summary")
+
+
+def test_get_errors(transport, http_server):
+    with pytest.raises(HTTPError) as e:
+        transport.get(f"{http_server.url}missing")
+    assert e.value.code == 404
+    e.value.close()
+    with pytest.raises(URLError):
+        transport.get("http://127.0.0.1:1/", timeout=1)
+
+
+def test_client_transport(transport, local_server):
+    c = drms.Client(local_server, transport=transport)
+    assert c._json.transport is transport
+    keys = c.query("hmi.test[2014.01.01/1h]", key="T_REC, QUALITY")
+    assert keys.QUALITY.dtype.kind == "i"
+    assert len(keys) > 0
+
+
+def test_default_transport():
+    c = drms.HttpJsonClient(pool_size=3)
+    assert isinstance(c.transport, UrllibTransport)
+    assert c.pool is c.transport.pool
+    assert c.pool.maxsize == 3
@@ -1,7 +1,16 @@
+import numpy as np
 import pandas as pd
 import pytest
 
-from drms.utils import _extract_series_name, _pd_to_datetime_coerce, _pd_to_numeric_coerce, _split_arg
+from drms.utils import (
+    _extract_series_name,
+    _parse_hex,
+    _parse_time_range,
+    _pd_to_datetime_coerce,
+    _pd_to_numeric_coerce,
+    _split_arg,
+    _to_numeric,
+)
 
 
 @pytest.mark.parametrize(
@@ -50,6 +59,31 @@ def test_pd_to_numeric_coerce(arg, exp):
     assert _pd_to_numeric_coerce(arg).equals(exp)
 
 
+@pytest.mark.parametrize(
+    ("arg", "exp"),
+    [
+        (["0x00000000", "0x00010000", "0xFF", "12"], pd.Series([0, 0x10000, 0xFF, 12])),
+        (["0x00000400", "MISSING", "0xzz", "0x", "nan"], pd.Series([0x400, *[float("nan")] * 4])),
+        (["1.5", "nan", "-inf", "0x10"], pd.Series([1.5, float("nan"), float("-inf"), 16.0])),
+        (["0xffffffffffffffff", "1"], pd.Series([2**64 - 1, 1], dtype="uint64")),
+        (["0x1", None, "\u00fc"], pd.Series([1.0, float("nan"), float("nan")])),
+        (["1", "2"], pd.Series([1, 2])),
+    ],
+)
+def test_to_numeric(arg, exp):
+    res = _to_numeric(pd.Series(arg, dtype=object, index=range(10, 10 + len(arg))), parse_hex=True)
+    pd.testing.assert_series_equal(res, exp.set_axis(res.index))
+
+
+def test_parse_hex():
+    res, valid, big = _parse_hex(np.array([b"0x1f", b"0x", b"0xg1", b"12", b"0x1000000000000000"]))
+    assert res[0] == 0x1F
+    assert valid.tolist() == [True, False, False, False, True]
+    assert big.tolist() == [False, False, False, False, True]
+    # Hexadecimal strings are only parsed if requested.
+    assert _to_numeric(pd.Series(["0x1", "1"]), parse_hex=False).tolist()[1] == 1
+
+
 @pytest.mark.parametrize(
     ("arg", "exp"),
     [
@@ -61,3 +95,17 @@ def test_pd_to_numeric_coerce(arg, exp):
 )
 def test_pd_to_datetime_coerce(arg, exp):
     assert _pd_to_datetime_coerce(arg).equals(exp)
+
+
+@pytest.mark.parametrize(
+    ("flt", "exp"),
+    [
+        ("2014.01.01_TAI/7d", (pd.Timestamp("2014-01-01"), pd.Timestamp("2014-01-08"), "_TAI")),
+        (" 2014.01.01_12:00 / 1.5h ", (pd.Timestamp("2014-01-01 12:00"), pd.Timestamp("2014-01-01 13:30"), "")),
+        ("2014.01.01/1h@1m", None),
+        ("$", None),
+        ("171", None),
+    ],
+)
+def test_parse_time_range(flt, exp):
+    assert _parse_time_range(flt) == exp
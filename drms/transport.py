@@ -0,0 +1,354 @@
+import io
+from urllib.error import URLError, HTTPError
+
+from .connection import PoolManager
+from .utils import _user_agent
+
+__all__ = ["HttpxTransport", "Transport", "Urllib3Transport", "UrllibTransport"]
+
+# Block size used to read response bodies of the adapters.
+_blocksize = 64 * 1024
+
+_form_content_type = "application/x-www-form-urlencoded"
+
+
+class Transport:
+    """
+    Interface of HTTP transports used by `~drms.json.HttpJsonClient`.
+
+    A transport sends GET and POST requests and returns file-like
+    responses. Custom
+    transports do not need to inherit from this class, they only have to
+    provide the same methods.
+
+    Responses must provide the attributes ``url`` (the final URL, after
+    redirects), ``status`` and ``headers`` (a mapping with a ``get``
+    method), a ``read(amt=None)`` method that returns the body as it was
+    sent by the server (i.e. without removing a content coding like
+    gzip), a ``close()`` method and support the context manager protocol.
+    Responses with an HTTP status code of 400 or above must raise
+    `~urllib.error.HTTPError`, and network errors must raise
+    `~urllib.error.URLError`, so that failed requests are handled (and
+    retried) consistently.
+    """
+
+    def get(self, url, *, stream=False, timeout=60, headers=None):
+        """
+        Send a GET request.
+
+        Parameters
+        ----------
+        url : str
+            URL of the request.
+        stream : bool
+            If False (default), the response body is read completely
+            before this method returns. If True, the body is read on
+            demand from the connection.
+        timeout : float
+            Timeout in seconds.
+        headers : dict or None
+            Additional request headers.
+
+        Returns
+        -------
+        response : file-like
+        """
+        raise NotImplementedError
+
+    def post(self, url, data, *, stream=False, timeout=60, headers=None):
+        """
+        Send a POST request with a form-encoded body.
+
+        Parameters
+        ----------
+        url : str
+            URL of the request.
+        data : bytes
+            Form-encoded request body.
+        stream : bool
+            If False (default), the response body is read completely
+            before this method returns. If True, the body is read on
+            demand from the connection.
+        timeout : float
+            Timeout in seconds.
+        headers : dict or None
+            Additional request headers.
+
+        Returns
+        -------
+        response : file-like
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """
+        Close idle connections.
+        """
+
+
+class _BufferedResponse:
+    """
+    Response whose body has already been read completely.
+    """
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._body = io.BytesIO(body)
+
+    def __repr__(self):
+        return f"<BufferedResponse: {self.status} {self.url}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def getcode(self):
+        return self.status
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        return self._body.read(amt)
+
+    def close(self):
+        self._body.close()
+
+
+def _buffered(response):
+    with response:
+        body = response.read()
+    return _BufferedResponse(response.url, response.status, response.reason, response.headers, body)
+
+
+def _default_headers(headers, data=None):
+    # Content codings are handled by drms, so only plain responses are
+    # requested unless the caller asks for compression.
+    default = {"User-Agent": _user_agent(), "Accept-Encoding": "identity"}
+    if data is not None:
+        default["Content-Type"] = _form_content_type
+    return {**default, **(headers or {})}
+
+
+class UrllibTransport(Transport):
+    """
+    Default transport, based on the standard library.
+
+    Requests are sent over keep-alive connections of a
+    `~drms.connection.PoolManager`; requests that need a proxy configured
+    in the environment are sent with `urllib.request.urlopen`.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of idle connections kept open per host.
+    idle_timeout : float
+        Number of seconds after which idle connections are closed.
+    """
+
+    def __init__(self, *, maxsize=10, idle_timeout=60):
+        self._pool = PoolManager(maxsize=maxsize, idle_timeout=idle_timeout)
+
+    def __repr__(self):
+        return "<UrllibTransport>"
+
+    @property
+    def pool(self):
+        """
+        (`~drms.connection.PoolManager`) Keep-alive connection pools.
+        """
+        return self._pool
+
+    def get(self, url, *, stream=False, timeout=60, headers=None):
+        response = self._pool.urlopen(url, timeout=timeout, headers=headers)
+        return response if stream else _buffered(response)
+
+    def post(self, url, data, *, stream=False, timeout=60, headers=None):
+        response = self._pool.urlopen(url, timeout=timeout, headers=headers, data=data)
+        return response if stream else _buffered(response)
+
+    def clear(self):
+        self._pool.clear()
+
+
+class _Urllib3Response:
+    def __init__(self, response, url):
+        self._response = response
+        self._done = False
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def __repr__(self):
+        return f"<Urllib3Response: {self.status} {self.url}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, amt=None):
+        try:
+            data = self._response.read(amt, decode_content=False)
+        except self._errors as e:
+            raise URLError(e) from e
+        if not data or amt is None:
+            self._done = True
+        return data
+
+    def close(self):
+        if self._done:
+            self._response.release_conn()
+        else:
+            self._response.close()
+
+
+class Urllib3Transport(Transport):
+    """
+    Transport adapter for `urllib3 <https://urllib3.readthedocs.io>`__.
+
+    Parameters
+    ----------
+    pool_manager : urllib3.PoolManager or None
+        Pool manager (or proxy manager) used to send requests, which can
+        be configured with custom connection pooling, retries, TLS or
+        proxy settings. If set to None (default), a new
+        ``urllib3.PoolManager`` is created with ``kwargs``.
+    """
+
+    def __init__(self, pool_manager=None, **kwargs):
+        try:
+            import urllib3  # NOQA: PLC0415
+        except ImportError:
+            raise ImportError("Urllib3Transport requires the urllib3 package") from None
+        self._urllib3 = urllib3
+        self._pool = urllib3.PoolManager(**kwargs) if pool_manager is None else pool_manager
+
+    def __repr__(self):
+        return "<Urllib3Transport>"
+
+    def _request(self, method, url, data, stream, timeout, headers):
+        urllib3 = self._urllib3
+        try:
+            r = self._pool.request(
+                method,
+                url,
+                body=data,
+                headers=_default_headers(headers, data),
+                timeout=timeout,
+                preload_content=False,
+                decode_content=False,
+                redirect=True,
+            )
+        except urllib3.exceptions.HTTPError as e:
+            raise URLError(e) from e
+        final_url = r.geturl() or url
+        response = _Urllib3Response(r, final_url)
+        response._errors = urllib3.exceptions.HTTPError
+        if r.status >= 400:
+            raise HTTPError(final_url, r.status, r.reason, r.headers, response)
+        return response if stream else _buffered(response)
+
+    def get(self, url, *, stream=False, timeout=60, headers=None):
+        return self._request("GET", url, None, stream, timeout, headers)
+
+    def post(self, url, data, *, stream=False, timeout=60, headers=None):
+        return self._request("POST", url, data, stream, timeout, headers)
+
+    def clear(self):
+        self._pool.clear()
+
+
+class _HttpxResponse:
+    def __init__(self, response, errors):
+        self._response = response
+        self._errors = errors
+        self._chunks = response.iter_raw(_blocksize)
+        self._buffer = b""
+        self.url = str(response.url)
+        self.status = response.status_code
+        self.reason = response.reason_phrase
+        self.headers = response.headers
+
+    def __repr__(self):
+        return f"<HttpxResponse: {self.status} {self.url}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, amt=None):
+        try:
+            while amt is None or len(self._buffer) < amt:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+        except self._errors as e:
+            raise URLError(e) from e
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        self._response.close()
+
+
+class HttpxTransport(Transport):
+    """
+    Transport adapter for `httpx <https://www.python-httpx.org>`__.
+
+    This allows to use HTTP/2 (``httpx.Client(http2=True)``) and the
+    connection pooling, proxy and event hook features of httpx.
+
+    Parameters
+    ----------
+    client : httpx.Client or None
+        Client used to send requests. If set to None (default), a new
+        ``httpx.Client`` is created with ``kwargs``.
+    """
+
+    def __init__(self, client=None, **kwargs):
+        try:
+            import httpx  # NOQA: PLC0415
+        except ImportError:
+            raise ImportError("HttpxTransport requires the httpx package") from None
+        self._httpx = httpx
+        self._client = httpx.Client(**kwargs) if client is None else client
+
+    def __repr__(self):
+        return "<HttpxTransport>"
+
+    def _request(self, method, url, data, stream, timeout, headers):
+        httpx = self._httpx
+        headers = _default_headers(headers, data)
+        request = self._client.build_request(method, url, content=data, headers=headers, timeout=timeout)
+        try:
+            r = self._client.send(request, stream=True, follow_redirects=True)
+        except httpx.TransportError as e:
+            raise URLError(e) from e
+        response = _HttpxResponse(r, httpx.TransportError)
+        if r.status_code >= 400:
+            raise HTTPError(response.url, response.status, response.reason, response.headers, response)
+        return response if stream else _buffered(response)
+
+    def get(self, url, *, stream=False, timeout=60, headers=None):
+        return self._request("GET", url, None, stream, timeout, headers)
+
+    def post(self, url, data, *, stream=False, timeout=60, headers=None):
+        return self._request("POST", url, data, stream, timeout, headers)
+
+    def clear(self):
+        # httpx does not provide a way to close idle connections only.
+        pass
@@ -1,5 +1,6 @@
 import re
 import sys
+import contextlib
 from urllib.request import Request
 
 import numpy as np
@@ -13,9 +14,13 @@ __all__ = ["create_request_with_header", "to_datetime"]
 PD_VERSION = Version(pd.__version__)
 
 
+def _user_agent():
+    return f"drms/{drms.__version__}, python/{sys.version[:5]}"
+
+
 def create_request_with_header(url):
     request = Request(url)
-    request.add_header("User-Agent", f"drms/{drms.__version__}, python/{sys.version[:5]}")
+    request.add_header("User-Agent", _user_agent())
     return request
 
 
@@ -29,6 +34,92 @@ def _pd_to_numeric_coerce(arg):
     return pd.to_numeric(arg, errors="coerce")
 
 
+# Values of hexadecimal digits by ASCII code, -1 for other characters.
+_hex_digits = np.full(256, -1, dtype=np.int64)
+for _i, _c in enumerate("0123456789abcdef"):
+    _hex_digits[ord(_c)] = _hex_digits[ord(_c.upper())] = _i
+
+
+def _parse_hex(values):
+    """
+    Parse hexadecimal integer strings with a '0x' prefix in bulk.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Array of byte strings (dtype 'S').
+
+    Returns
+    -------
+    result : numpy.ndarray
+        Parsed values as int64.
+    valid : numpy.ndarray
+        Boolean mask of the values that are valid hexadecimal integers.
+    big : numpy.ndarray
+        Boolean mask of valid values that might not fit into an int64.
+    """
+    n = len(values)
+    width = values.dtype.itemsize
+    # Byte strings are padded with NUL bytes to the width of the array.
+    chars = values.view(np.uint8).reshape(n, width)
+    valid = (chars[:, 0] == ord("0")) & (chars[:, 1] == ord("x")) if width >= 2 else np.zeros(n, dtype=bool)
+    result = np.zeros(n, dtype=np.int64)
+    num_digits = np.zeros(n, dtype=np.int64)
+    for j in range(2, width):
+        active = chars[:, j] != 0
+        digits = _hex_digits[chars[:, j]]
+        valid &= ~active | (digits >= 0)
+        result = np.where(active, (result << 4) | np.maximum(digits, 0), result)
+        num_digits += active
+    valid &= num_digits > 0
+    return result, valid, valid & (num_digits > 15)
+
+
+def _parse_hex_value(value):
+    """
+    Parse a single hexadecimal integer string, other values are returned
+    unchanged.
+    """
+    if isinstance(value, str) and value.startswith("0x"):
+        with contextlib.suppress(ValueError):
+            return int(value, 16)
+    return value
+
+
+def _to_numeric(arg, *, parse_hex=False):
+    """
+    Convert a Series of keyword values to numbers.
+
+    Decimal integers and floats, including 'nan' and 'inf', are parsed by
+    `pandas.to_numeric`. If ``parse_hex`` is True, hexadecimal integers
+    with a '0x' prefix, like QUALITY values, are parsed with vectorized
+    NumPy operations. Other values, e.g. 'MISSING', are converted to NaN.
+    The result has an integer dtype, if all values are valid integers.
+    """
+    if not parse_hex or arg.dtype != np.dtype(object) or len(arg) == 0:
+        return _pd_to_numeric_coerce(arg)
+    try:
+        raw = arg.to_numpy(dtype="S")
+    except (UnicodeError, ValueError, TypeError):
+        return _pd_to_numeric_coerce(arg.map(_parse_hex_value))
+    is_hex = raw.astype("S2") == b"0x"
+    if not is_hex.any():
+        return _pd_to_numeric_coerce(arg)
+    hex_values, valid, big = _parse_hex(raw[is_hex])
+    if big.any():
+        # Python integers are used for values that may not fit into int64.
+        return _pd_to_numeric_coerce(arg.map(_parse_hex_value))
+    other = _pd_to_numeric_coerce(arg[~is_hex]).to_numpy()
+    if valid.all() and (len(other) == 0 or other.dtype.kind == "i"):
+        res = np.empty(len(arg), dtype=np.int64)
+        res[is_hex] = hex_values
+    else:
+        res = np.empty(len(arg), dtype=np.float64)
+        res[is_hex] = np.where(valid, hex_values, np.nan)
+    res[~is_hex] = other
+    return pd.Series(res, index=arg.index, name=arg.name)
+
+
 def _split_arg(arg):
     """
     Split a comma-separated string into a list.
@@ -46,6 +137,61 @@ def _extract_series_name(ds):
     return m.group(1) if m is not None else None
 
 
+def _split_recset(ds):
+    """
+    Split a record set into series name, list of filters and the
+    remainder (e.g. a segment list).
+
+    Returns None for record sets that cannot be split, e.g. lists of
+    record sets.
+    """
+    m = re.match(r"^\s*([\w\.]+)\s*((?:\[[^\[\]]*\]\s*)*)(\{[^{}]*\})?\s*$", ds)
+    if m is None:
+        return None
+    filters = re.findall(r"\[([^\]]*)\]", m.group(2))
+    return m.group(1), filters, m.group(3) or ""
+
+
+def _split_time_suffix(tstr):
+    """
+    Split a DRMS time string into the time and its time zone suffix,
+    e.g. '_TAI'.
+    """
+    m = re.match(r"^(.*?)(_[A-Za-z]+|Z)?$", tstr.strip())
+    return m.group(1), m.group(2) or ""
+
+
+_duration_units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _parse_time_range(flt):
+    """
+    Parse a time range filter like '2014.01.01_TAI/7d' into its start
+    and end timestamps and the time zone suffix of the start time.
+
+    Returns None for other filters.
+    """
+    m = re.match(r"^\s*([^/]+?)\s*/\s*(\d+(?:\.\d*)?)([smhd])\s*$", flt)
+    if m is None:
+        return None
+    tstr, suffix = _split_time_suffix(m.group(1))
+    start = to_datetime(tstr, force=True)
+    if pd.isna(start):
+        return None
+    end = start + pd.Timedelta(seconds=float(m.group(2)) * _duration_units[m.group(3)])
+    return start, end, suffix
+
+
+def _format_time(t, suffix=""):
+    """
+    Format a timestamp as DRMS time string.
+    """
+    res = t.strftime("%Y.%m.%d_%H:%M:%S")
+    if t.microsecond:
+        res += f".{t.microsecond:06d}".rstrip("0")
+    return res + suffix
+
+
 def to_datetime(tstr, *, force=False):
     """
     Parse JSOC time strings.